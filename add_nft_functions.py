@@ -1,28 +1,10 @@
 #!/usr/bin/env python3
+import sys
 
-# Read the file
-with open('index.html', 'r', encoding='utf-8') as f:
-    content = f.read()
+from patch_engine import InsertAfterFunction, main
 
-# Find where to insert new functions (after claimNFTRewards function)
-insert_pos = content.find('function claimNFTRewards() {')
-if insert_pos != -1:
-    # Find the end of claimNFTRewards function
-    brace_count = 0
-    pos = content.find('{', insert_pos)
-    i = pos
-    while i < len(content):
-        if content[i] == '{':
-            brace_count += 1
-        elif content[i] == '}':
-            brace_count -= 1
-            if brace_count == 0:
-                insert_pos = i + 1
-                break
-        i += 1
-    
-    # Insert comprehensive NFT Web3 functions
-    new_functions = '''
+# Comprehensive NFT Web3 functions, inserted after the claimNFTRewards function
+NEW_FUNCTIONS = '''
 
     // === NFT Web3 Integration Functions ===
     
@@ -321,11 +303,14 @@ if insert_pos != -1:
         showNotification("Failed to mint NFT: " + error.message, true);
       }
     }'''
-    
-    content = content[:insert_pos] + new_functions + content[insert_pos:]
 
-# Save
-with open('index.html', 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    InsertAfterFunction("claimNFTRewards", NEW_FUNCTIONS,
+                        skip_if="async function loadUserNFTs() {"),
+]
 
-print("NFT Web3 functions added successfully")
+if __name__ == "__main__":
+    status = main([*sys.argv[1:], __file__])
+    if status == 0:
+        print("NFT Web3 functions added successfully")
+    raise SystemExit(status)
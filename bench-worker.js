@@ -0,0 +1,486 @@
+/**
+ * Mogaland – local load test / latency benchmark for worker.js
+ *
+ * Runs the worker's `fetch` handler in-process under Node (18+) with
+ * stand-ins for everything Cloudflare provides:
+ *   KV            in-memory namespaces (LOGIN_HISTORY_KV, USER_DATA_KV) with
+ *                 configurable per-operation latency
+ *   caches.default in-memory Cache API (disable with --no-edge-cache)
+ *   fetch         fake GeckoTerminal / CoinGecko / Bybit / Binance / Twitter
+ *                 upstreams with configurable latency and 429 rate
+ *   env.ASSETS    static-asset stub
+ * `concurrency` virtual clients send a weighted, seeded mix of requests
+ * until `requests` are done.  Every upstream call and KV operation is
+ * attributed to the route that caused it (AsyncLocalStorage), background
+ * revalidations (ctx.waitUntil) included.
+ *
+ * Usage:
+ *   node bench-worker.js
+ *   node bench-worker.js --requests 20000 --concurrency 64 \
+ *     --mix live-markets=4,ohlcv=4,login-history=2,user-data-put=1 \
+ *     --kv-latency 8 --upstream-latency 60 --json bench.json
+ *   node bench-worker.js --baseline bench.json --max-regression 0.25
+ *
+ * Options (defaults in DEFAULTS):
+ *   --requests N          total requests (after --warmup)
+ *   --warmup N            requests sent first and left out of the report
+ *   --concurrency N       concurrent clients
+ *   --mix a=w,b=w         route weights (routes: see ROUTES)
+ *   --users N             distinct addresses for login-history / user-data
+ *   --pools N             distinct pool / token addresses
+ *   --put-bytes N         size of a user-data PUT body (limit is 256 KB)
+ *   --kv-latency MS       mean KV get/put latency (±50 % jitter); 0 leaves only
+ *                         the worker's own CPU time, e.g. parsing 256 KB PUTs
+ *   --cache-latency MS    mean Cache API match/put latency
+ *   --upstream-latency MS mean fake upstream latency
+ *   --upstream-429 P      probability an upstream call answers 429
+ *   --no-edge-cache       run without caches.default (every miss goes upstream)
+ *   --seed N              PRNG seed for the request mix and payloads
+ *   --json FILE           write the report as JSON ('-' for stdout)
+ *   --baseline FILE       compare p95 per route with an earlier --json report
+ *   --max-regression R    with --baseline: exit 1 if a p95 grew by more than R
+ *   --verbose             let the worker's console output through
+ *   --help, -h            print this usage and exit
+ */
+
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+const { AsyncLocalStorage } = require('async_hooks');
+const { performance } = require('perf_hooks');
+
+const DEFAULTS = {
+  requests: 5000,
+  warmup: 200,
+  concurrency: 32,
+  mix: 'live-markets=3,new-tokens=1,token=1,ohlcv=3,snapshot=1,login-history=2,login-history-get=0.5,user-data-get=2,user-data-put=1,twitter-me=0.5',
+  users: 500,
+  pools: 50,
+  putBytes: 250 * 1024,
+  kvLatency: 5,
+  cacheLatency: 1,
+  upstreamLatency: 40,
+  upstream429: 0,
+  edgeCache: true,
+  seed: 7,
+  json: null,
+  baseline: null,
+  maxRegression: null,
+  verbose: false,
+};
+
+// ── Deterministic helpers ──────────────────────────────────────────────────
+
+function mulberry32(seed) {
+  return function () {
+    seed |= 0; seed = seed + 0x6D2B79F5 | 0;
+    let t = Math.imul(seed ^ seed >>> 15, 1 | seed);
+    t = t + Math.imul(t ^ t >>> 7, 61 | t) ^ t;
+    return ((t ^ t >>> 14) >>> 0) / 4294967296;
+  };
+}
+
+const sleep = ms => (ms > 0 ? new Promise(r => setTimeout(r, ms)) : Promise.resolve());
+const hexAddress = (rand) => '0x' + Array.from({ length: 40 }, () => Math.floor(rand() * 16).toString(16)).join('');
+
+// ── Per-route accounting ───────────────────────────────────────────────────
+
+const scope = new AsyncLocalStorage();
+
+function routeStats() {
+  return { latencies: [], status: {}, edgeCache: {}, upstream: {}, kv: { get: 0, put: 0, list: 0, delete: 0 }, cache: { match: 0, put: 0 } };
+}
+
+function count(kind, key) {
+  const stats = scope.getStore();
+  if (!stats) return;
+  if (kind === 'upstream') stats.upstream[key] = (stats.upstream[key] || 0) + 1;
+  else stats[kind][key]++;
+}
+
+// ── Stand-ins ──────────────────────────────────────────────────────────────
+
+class MemoryKV {
+  constructor(latencyMs, rand) {
+    this.latency = latencyMs;
+    this.rand = rand;
+    this.store = new Map();
+  }
+
+  delay() {
+    return sleep(this.latency * (0.5 + this.rand()));
+  }
+
+  async get(key, options) {
+    count('kv', 'get');
+    await this.delay();
+    const value = this.store.has(key) ? this.store.get(key) : null;
+    const type = typeof options === 'string' ? options : options && options.type;
+    return value !== null && type === 'json' ? JSON.parse(value) : value;
+  }
+
+  async put(key, value) {
+    count('kv', 'put');
+    await this.delay();
+    this.store.set(key, String(value));
+  }
+
+  async delete(key) {
+    count('kv', 'delete');
+    await this.delay();
+    this.store.delete(key);
+  }
+
+  // Keys in lexicographic order, like KV list()
+  async list({ prefix = '', limit = 1000 } = {}) {
+    count('kv', 'list');
+    await this.delay();
+    const names = [...this.store.keys()].filter(k => k.startsWith(prefix)).sort().slice(0, limit);
+    return { keys: names.map(name => ({ name })), list_complete: true };
+  }
+}
+
+class MemoryCache {
+  constructor(latencyMs) {
+    this.latency = latencyMs;
+    this.entries = new Map();
+  }
+
+  async match(key) {
+    count('cache', 'match');
+    await sleep(this.latency);
+    const e = this.entries.get(String(key));
+    return e ? new Response(e.body, { headers: e.headers }) : undefined;
+  }
+
+  async put(key, response) {
+    count('cache', 'put');
+    await sleep(this.latency);
+    this.entries.set(String(key), { body: await response.text(), headers: Object.fromEntries(response.headers) });
+  }
+}
+
+// Upstream bodies shaped like the real APIs, as far as worker.js reads them
+function upstreamBody(url, rand) {
+  const pool = () => ({
+    attributes: {
+      address: hexAddress(rand), name: 'MOGA / WETH',
+      base_token_price_usd: String(rand()), reserve_in_usd: String(rand() * 1e6),
+      price_change_percentage: { h24: String(rand() * 20 - 10) },
+      volume_usd: { h24: String(rand() * 1e5) }, fdv_usd: String(rand() * 1e7),
+    },
+  });
+  const p = url.pathname;
+  if (url.host === 'api.geckoterminal.com') {
+    if (p.includes('/ohlcv/')) {
+      const limit = parseInt(url.searchParams.get('limit') || '24', 10);
+      const now = Math.floor(Date.now() / 1000);
+      return { data: { attributes: { ohlcv_list: Array.from({ length: limit }, (_, i) =>
+        [now - i * 3600, 1 + rand(), 1.1 + rand(), 0.9 + rand(), 1 + rand(), rand() * 1e4]) } } };
+    }
+    if (p.includes('/tokens/')) {
+      const token = () => ({ attributes: { address: hexAddress(rand), name: 'Mogaland', symbol: 'MOGA',
+        price_usd: String(rand()), total_reserve_in_usd: String(rand() * 1e6), volume_usd: { h24: String(rand() * 1e5) } } });
+      return p.includes('/multi/') ? { data: p.split('/multi/')[1].split(',').map(token) } : { data: token() };
+    }
+    return { data: Array.from({ length: 20 }, pool) };
+  }
+  if (url.host === 'api.coingecko.com') {
+    return Object.fromEntries((url.searchParams.get('ids') || '').split(',').map(id =>
+      [id, { usd: rand() * 1e4, usd_24h_change: rand() * 10 - 5 }]));
+  }
+  if (url.host === 'api.bybit.com') {
+    return { retCode: 0, result: { list: ['BTCUSDT', 'ETHUSDT', 'SOLUSDT'].map(symbol => ({ symbol, lastPrice: String(rand() * 1e4) })) } };
+  }
+  if (url.host === 'fapi.binance.com') {
+    // /fapi/v1/ticker/price: one object for `symbol`, every pair without it
+    const symbol = url.searchParams.get('symbol');
+    const tick = (sym) => ({ symbol: sym, price: String(rand() * 1e4) });
+    return symbol ? tick(symbol) : ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'DOGEUSDT'].map(tick);
+  }
+  if (p.endsWith('/oauth2/token')) return { access_token: 'token', token_type: 'bearer', scope: 'users.read' };
+  if (p.endsWith('/users/me')) return { data: { id: '1', name: 'Moga', username: 'moga', profile_image_url: '' } };
+  return {};
+}
+
+function fakeFetch(options, rand) {
+  return async function fetch(input) {
+    const url = new URL(typeof input === 'string' ? input : input.url);
+    count('upstream', url.host);
+    await sleep(options.upstreamLatency * (0.5 + rand()));
+    if (options.upstream429 && rand() < options.upstream429) {
+      return new Response('{}', { status: 429, headers: { 'Retry-After': '1' } });
+    }
+    return new Response(JSON.stringify(upstreamBody(url, rand)), { headers: { 'Content-Type': 'application/json' } });
+  };
+}
+
+// ── Request mix ────────────────────────────────────────────────────────────
+
+const ORIGIN = 'https://bench.local';
+
+// Route name → (state) => Request
+const ROUTES = {
+  'live-markets': () => new Request(`${ORIGIN}/api/live-markets`),
+  'new-tokens': () => new Request(`${ORIGIN}/api/new-tokens`),
+  'token': (s) => new Request(`${ORIGIN}/api/token/${s.pick(s.pools)}`),
+  'ohlcv': (s) => new Request(`${ORIGIN}/api/ohlcv/${s.pick(s.pools)}?timeframe=${s.pick(['minute', 'hour', 'day'])}&limit=24`),
+  'snapshot': (s) => new Request(`${ORIGIN}/api/snapshot?coins=bitcoin,ethereum&symbols=BTCUSDT,ETHUSDT,XRPUSDT` +
+    `&pools=${s.pick(s.pools)},${s.pick(s.pools)}&timeframes=hour&markets=trending`),
+  'login-history': (s) => new Request(`${ORIGIN}/api/login-history`, {
+    method: 'POST', body: JSON.stringify({ address: s.pick(s.users), method: 'metamask' }),
+  }),
+  'login-history-get': (s) => new Request(`${ORIGIN}/api/login-history?address=${s.pick(s.users)}`),
+  'user-data-get': (s) => new Request(`${ORIGIN}/api/user-data/${s.pick(s.users)}`),
+  'user-data-put': (s) => new Request(`${ORIGIN}/api/user-data/${s.pick(s.users)}`, { method: 'PUT', body: s.putBody() }),
+  'twitter-me': () => new Request(`${ORIGIN}/api/twitter/me`, { headers: { Authorization: 'Bearer bench' } }),
+  'twitter-token': () => new Request(`${ORIGIN}/api/twitter/token`, {
+    method: 'POST', body: JSON.stringify({ code: 'c', code_verifier: 'v', redirect_uri: `${ORIGIN}/` }),
+  }),
+  'static': () => new Request(`${ORIGIN}/index.html`),
+};
+
+function parseMix(spec) {
+  const mix = spec.split(',').filter(Boolean).map(part => {
+    const [name, weight = '1'] = part.split('=');
+    if (!ROUTES[name]) throw new Error(`Unknown route "${name}" (routes: ${Object.keys(ROUTES).join(', ')})`);
+    return [name, parseFloat(weight)];
+  }).filter(([, w]) => w > 0);
+  if (!mix.length) throw new Error('Empty --mix');
+  return mix;
+}
+
+// A user-data patch of about `bytes` bytes with fresh values, so every PUT writes
+function makePutBody(bytes, rand) {
+  const chunk = 1024;
+  const patch = {};
+  for (let i = 0; i * chunk < bytes - 64; i++) {
+    patch[`k${i}`] = Math.floor(rand() * 36 ** 8).toString(36).padEnd(8, '0').repeat(chunk / 8 - 4);
+  }
+  return JSON.stringify(patch);
+}
+
+// ── Report ─────────────────────────────────────────────────────────────────
+
+function percentile(sorted, p) {
+  if (!sorted.length) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.ceil(p / 100 * sorted.length) - 1)];
+}
+
+function summarize(stats, elapsedMs) {
+  const sorted = Float64Array.from(stats.latencies).sort();
+  const n = sorted.length;
+  const round = x => Math.round(x * 1000) / 1000;
+  return {
+    requests: n,
+    rps: round(n / (elapsedMs / 1000)),
+    latencyMs: {
+      mean: round(n ? sorted.reduce((a, b) => a + b, 0) / n : 0),
+      p50: round(percentile(sorted, 50)),
+      p95: round(percentile(sorted, 95)),
+      p99: round(percentile(sorted, 99)),
+      max: round(n ? sorted[n - 1] : 0),
+    },
+    status: stats.status,
+    edgeCache: stats.edgeCache,
+    upstreamCalls: stats.upstream,
+    kvOps: stats.kv,
+    cacheOps: stats.cache,
+  };
+}
+
+// Width of the route column: the longest route name plus a gap
+function routeWidth(names) {
+  return Math.max('route'.length, ...names.map(n => n.length)) + 2;
+}
+
+function printReport(report) {
+  const pad = (s, n) => String(s).padStart(n);
+  const width = routeWidth(Object.keys(report.routes));
+  console.log(`${report.totals.requests} requests, concurrency ${report.config.concurrency}, ` +
+    `${report.elapsedMs.toFixed(0)} ms → ${report.totals.rps.toFixed(0)} req/s`);
+  console.log(`${'route'.padEnd(width)}${pad('n', 7)}${pad('req/s', 9)}${pad('p50', 9)}${pad('p95', 9)}${pad('p99', 9)}` +
+    `${pad('upstream', 10)}${pad('kv get', 8)}${pad('kv put', 8)}${pad('kv list', 9)}  status / edge cache`);
+  Object.entries(report.routes).forEach(([name, r]) => {
+    const upstream = Object.values(r.upstreamCalls).reduce((a, b) => a + b, 0);
+    const tags = [...Object.entries(r.status), ...Object.entries(r.edgeCache)].map(([k, v]) => `${k}:${v}`).join(' ');
+    console.log(`${name.padEnd(width)}${pad(r.requests, 7)}${pad(r.rps.toFixed(0), 9)}${pad(r.latencyMs.p50.toFixed(2), 9)}` +
+      `${pad(r.latencyMs.p95.toFixed(2), 9)}${pad(r.latencyMs.p99.toFixed(2), 9)}${pad(upstream, 10)}` +
+      `${pad(r.kvOps.get, 8)}${pad(r.kvOps.put, 8)}${pad(r.kvOps.list, 9)}  ${tags}`);
+  });
+}
+
+// p95 change per route against an earlier report; returns the worst ratio
+function compareBaseline(report, baseline) {
+  let worst = 0;
+  const width = routeWidth(Object.keys(report.routes));
+  console.log('\np95 vs baseline:');
+  Object.entries(report.routes).forEach(([name, r]) => {
+    const before = baseline.routes && baseline.routes[name];
+    if (!before || !before.latencyMs.p95) return;
+    const change = r.latencyMs.p95 / before.latencyMs.p95 - 1;
+    worst = Math.max(worst, change);
+    console.log(`  ${name.padEnd(width)}${before.latencyMs.p95.toFixed(2)} → ${r.latencyMs.p95.toFixed(2)} ms ` +
+      `(${change >= 0 ? '+' : ''}${(change * 100).toFixed(1)} %)`);
+  });
+  return worst;
+}
+
+// ── Runner ─────────────────────────────────────────────────────────────────
+
+async function loadWorker(file) {
+  // worker.js is an ES module in a CommonJS package: import it from a data: URL
+  const source = fs.readFileSync(file, 'utf8');
+  const mod = await import('data:text/javascript;base64,' + Buffer.from(source).toString('base64'));
+  return mod.default;
+}
+
+async function run(options) {
+  const rand = mulberry32(options.seed);
+  const mix = parseMix(options.mix);
+  const totalWeight = mix.reduce((a, [, w]) => a + w, 0);
+  const pickRoute = () => {
+    let x = rand() * totalWeight;
+    for (const [name, w] of mix) { if ((x -= w) < 0) return name; }
+    return mix[mix.length - 1][0];
+  };
+
+  const state = {
+    users: Array.from({ length: options.users }, () => hexAddress(rand)),
+    pools: Array.from({ length: options.pools }, () => hexAddress(rand)),
+    pick: list => list[Math.floor(rand() * list.length)],
+    putBody: () => makePutBody(options.putBytes, rand),
+  };
+  const env = {
+    LOGIN_HISTORY_KV: new MemoryKV(options.kvLatency, rand),
+    USER_DATA_KV: new MemoryKV(options.kvLatency, rand),
+    ASSETS: { fetch: async () => new Response('<!DOCTYPE html>', { headers: { 'Content-Type': 'text/html' } }) },
+  };
+  globalThis.fetch = fakeFetch(options, rand);
+  if (options.edgeCache) globalThis.caches = { default: new MemoryCache(options.cacheLatency) };
+  else delete globalThis.caches;
+
+  const worker = await loadWorker(path.join(__dirname, 'worker.js'));
+  const background = [];
+  const ctx = { waitUntil: p => background.push(p), passThroughOnException() {} };
+  const routes = {};
+  const total = routeStats();
+  let logged = 0;
+  const quiet = () => { logged++; };
+  const saved = { log: console.log, warn: console.warn, error: console.error };
+
+  async function send(name, record) {
+    const stats = record ? (routes[name] = routes[name] || routeStats()) : routeStats();
+    const request = ROUTES[name](state);
+    const t0 = performance.now();
+    const res = await scope.run(stats, () => worker.fetch(request, env, ctx));
+    await res.arrayBuffer();
+    const ms = performance.now() - t0;
+    if (!record) return;
+    stats.latencies.push(ms);
+    total.latencies.push(ms);
+    stats.status[res.status] = (stats.status[res.status] || 0) + 1;
+    const edge = res.headers.get('X-Edge-Cache');
+    if (edge) stats.edgeCache[edge] = (stats.edgeCache[edge] || 0) + 1;
+  }
+
+  async function phase(n, record) {
+    let issued = 0;
+    const client = async () => {
+      while (issued < n) {
+        issued++;
+        await send(pickRoute(), record);
+      }
+    };
+    await Promise.all(Array.from({ length: Math.min(options.concurrency, n) }, client));
+  }
+
+  if (!options.verbose) { console.log = console.warn = console.error = quiet; }
+  let elapsedMs;
+  try {
+    await phase(options.warmup, false);
+    await Promise.allSettled(background.splice(0));
+    const t0 = performance.now();
+    await phase(options.requests, true);
+    await Promise.allSettled(background.splice(0));
+    elapsedMs = performance.now() - t0;
+  } finally {
+    Object.assign(console, saved);
+  }
+
+  const report = {
+    generatedAt: new Date().toISOString(),
+    node: process.version,
+    config: options,
+    elapsedMs,
+    totals: summarize(total, elapsedMs),
+    routes: Object.fromEntries(Object.keys(routes).sort().map(name => [name, summarize(routes[name], elapsedMs)])),
+    workerLogLines: logged,
+  };
+  ['upstreamCalls', 'kvOps', 'cacheOps'].forEach(key => {
+    const sum = {};
+    Object.values(report.routes).forEach(r => Object.entries(r[key]).forEach(([k, v]) => { sum[k] = (sum[k] || 0) + v; }));
+    report.totals[key] = sum;
+  });
+  return report;
+}
+
+// The Usage / Options part of the header comment above
+function usage() {
+  const header = fs.readFileSync(__filename, 'utf8').split('*/')[0];
+  return header.slice(header.indexOf(' * Usage:')).split('\n')
+    .map(line => line.replace(/^ \* ?/, '')).join('\n').trimEnd() +
+    `\n\nRoutes: ${Object.keys(ROUTES).join(', ')}`;
+}
+
+function parseArgs(argv) {
+  const options = { ...DEFAULTS };
+  const camel = s => s.replace(/-([a-z0-9])/g, (_, c) => c.toUpperCase());
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === '--help' || arg === '-h') return { ...options, help: true };
+    if (!arg.startsWith('--')) throw new Error(`Unexpected argument "${arg}"`);
+    if (arg === '--no-edge-cache') { options.edgeCache = false; continue; }
+    if (arg === '--verbose') { options.verbose = true; continue; }
+    const key = camel(arg.slice(2));
+    if (!(key in DEFAULTS)) throw new Error(`Unknown option ${arg}`);
+    const value = argv[++i];
+    if (value === undefined) throw new Error(`Missing value for ${arg}`);
+    options[key] = typeof DEFAULTS[key] === 'number' || ['maxRegression'].includes(key) ? Number(value) : value;
+  }
+  return options;
+}
+
+if (require.main === module) {
+  (async () => {
+    const options = parseArgs(process.argv.slice(2));
+    if (options.help) {
+      console.log(usage());
+      return;
+    }
+    const report = await run(options);
+    if (options.json === '-') {
+      process.stdout.write(JSON.stringify(report, null, 2) + '\n');
+    } else {
+      printReport(report);
+      if (options.json) {
+        fs.writeFileSync(options.json, JSON.stringify(report, null, 2));
+        console.log(`Report written to ${options.json}`);
+      }
+    }
+    if (options.baseline) {
+      const worst = compareBaseline(report, JSON.parse(fs.readFileSync(options.baseline, 'utf8')));
+      if (options.maxRegression !== null && worst > options.maxRegression) {
+        console.log(`p95 regression ${(worst * 100).toFixed(1)} % exceeds ${(options.maxRegression * 100).toFixed(1)} %`);
+        process.exitCode = 1;
+      }
+    }
+  })().catch(err => {
+    console.error(err.message || err);
+    console.error('Run with --help for the options.');
+    process.exitCode = 2;
+  });
+}
+
+module.exports = { run, ROUTES, MemoryKV, MemoryCache };
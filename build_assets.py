@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+build_assets.py
+Build stage that moves the large inline <script>/<style> blocks of the
+built HTML pages into content-hashed, minified, precompressed files.
+
+Run by ``npm run build`` after the pages have been copied into dist/:
+
+    python3 build_assets.py dist
+    python3 build_assets.py dist --no-split
+
+For every page in PAGES the stage
+- extracts each inline <script> / <style> block bigger than INLINE_MAX_BYTES
+  (small, render-critical blocks such as the WalletConnect polyfill stay
+  inline) into ``dist/assets/<sha256[:12]>.js|.css``,
+- minifies it (JS with the string/template/regex-aware tokenizer from
+  js_index.py, CSS with a comment/whitespace pass),
+- writes ``.gz`` and, when the optional ``brotli`` package is installed,
+  ``.br`` siblings,
+- replaces the block with ``<script src>`` / ``<link rel="stylesheet">``.
+
+Before that, index.html is passed through split_sections.py: heavy
+showSection branches become lazily loaded ``assets/<hash>.js`` section
+modules and their URLs are written into the page's SECTION_MODULES map
+(``--no-split`` skips this step).
+
+It then appends an immutable Cache-Control rule for /assets/* to
+dist/_headers, so only the small HTML shell stays no-cache, and prints a
+size report before and after.
+"""
+
+import gzip
+import hashlib
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from js_index import iter_tokens
+from split_sections import SplitError, inject_manifest, split_page
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always produced
+    brotli = None
+
+PAGES = ["index.html", "game.html", "mogalandplumesimulator.html"]
+SPLIT_PAGES = ["index.html"]
+ASSET_DIR = "assets"
+INLINE_MAX_BYTES = 4096
+HASH_LEN = 12
+
+IMMUTABLE_HEADERS = f"""
+/{ASSET_DIR}/*
+  Cache-Control: public, max-age=31536000, immutable
+"""
+
+# Scripts first in the alternation so a <style> inside a JS template literal
+# stays part of its script block.
+BLOCK_RE = re.compile(
+    r"<(?P<tag>script|style)\b(?P<attrs>[^>]*)>(?P<body>.*?)</(?P=tag)\s*>",
+    re.DOTALL | re.IGNORECASE,
+)
+SRC_ATTR_RE = re.compile(r"\bsrc\s*=", re.IGNORECASE)
+TYPE_ATTR_RE = re.compile(r"""\btype\s*=\s*["']?([^"'\s>]+)""", re.IGNORECASE)
+EXEC_ATTR_RE = re.compile(r"\s+(?:async|defer)\b(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s>]+))?", re.IGNORECASE)
+JS_TYPES = {"", "text/javascript", "application/javascript", "module"}
+
+# Whitespace next to these characters can always be dropped.
+JS_TIGHT = set("{}()[];,:?=")
+# A newline after these characters can never trigger automatic semicolon insertion.
+JS_NEWLINE_SAFE = set("{([;,")
+
+CSS_TOKEN_RE = re.compile(
+    r"""(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')"""
+    r"""|(?P<comment>/\*.*?\*/)|(?P<punct>\s*[{};,]\s*)|(?P<ws>\s+)""",
+    re.DOTALL,
+)
+
+
+def minify_js(code: str) -> str:
+    """Drop comments and redundant whitespace; literals are copied verbatim."""
+    out: List[str] = []
+    gap = ""          # collapsed whitespace waiting to be emitted
+    for kind, start, end in iter_tokens(code):
+        if kind in ("ws", "line_comment", "block_comment"):
+            text = code[start:end]
+            if kind == "line_comment" or "\n" in text:
+                gap = "\n"
+            elif not gap:
+                gap = " "
+            continue
+        tok = code[start:end]
+        if gap and out:
+            last = out[-1][-1]
+            if gap == "\n" and last not in JS_NEWLINE_SAFE and tok[0] not in ")]}":
+                out.append("\n")
+            elif gap == " " and last not in JS_TIGHT and tok[0] not in JS_TIGHT:
+                out.append(" ")
+        gap = ""
+        out.append(tok)
+    return "".join(out).strip() + "\n"
+
+
+def minify_css(css: str) -> str:
+    """Drop comments, collapse whitespace and trim it around ``{};,``."""
+    def repl(m: "re.Match[str]") -> str:
+        kind = m.lastgroup
+        if kind == "string":
+            return m.group(0)
+        if kind == "punct":
+            return m.group(0).strip()
+        return "" if kind == "comment" else " "
+    return CSS_TOKEN_RE.sub(repl, css).replace(";}", "}").strip() + "\n"
+
+
+def _hashed_name(data: bytes, ext: str) -> str:
+    return f"{hashlib.sha256(data).hexdigest()[:HASH_LEN]}.{ext}"
+
+
+def write_asset(asset_dir: Path, data: bytes, ext: str) -> Tuple[str, Dict[str, int]]:
+    """Write ``data`` plus compressed siblings; return (name, sizes)."""
+    name = _hashed_name(data, ext)
+    path = asset_dir / name
+    sizes = {"min": len(data)}
+    if not path.exists():
+        path.write_bytes(data)
+        with gzip.GzipFile(path.with_name(name + ".gz"), "wb", compresslevel=9, mtime=0) as gz:
+            gz.write(data)
+        if brotli is not None:
+            path.with_name(name + ".br").write_bytes(brotli.compress(data, quality=11))
+    sizes["gz"] = path.with_name(name + ".gz").stat().st_size
+    br = path.with_name(name + ".br")
+    sizes["br"] = br.stat().st_size if br.exists() else 0
+    return name, sizes
+
+
+def extract_page(page: Path, asset_dir: Path) -> dict:
+    html = page.read_text(encoding="utf-8")
+    stats = {"page": page.name, "html_before": len(html.encode("utf-8")),
+             "raw": 0, "min": 0, "gz": 0, "br": 0, "assets": 0}
+
+    def replace(m: "re.Match[str]") -> str:
+        tag = m.group("tag").lower()
+        attrs = m.group("attrs")
+        body = m.group("body")
+        raw = body.encode("utf-8")
+        if len(raw) <= INLINE_MAX_BYTES:
+            return m.group(0)
+        if tag == "script":
+            tm = TYPE_ATTR_RE.search(attrs)
+            if SRC_ATTR_RE.search(attrs) or (tm and tm.group(1).lower() not in JS_TYPES):
+                return m.group(0)
+            data = minify_js(body).encode("utf-8")
+            name, sizes = write_asset(asset_dir, data, "js")
+            # async/defer are ignored on inline scripts; keep the original
+            # execution order once the block becomes external.
+            new = f'<script{EXEC_ATTR_RE.sub("", attrs)} src="/{ASSET_DIR}/{name}"></script>'
+        else:
+            data = minify_css(body).encode("utf-8")
+            name, sizes = write_asset(asset_dir, data, "css")
+            new = f'<link rel="stylesheet" href="/{ASSET_DIR}/{name}">'
+        stats["raw"] += len(raw)
+        stats["assets"] += 1
+        for key in ("min", "gz", "br"):
+            stats[key] += sizes[key]
+        return new
+
+    new_html = BLOCK_RE.sub(replace, html)
+    page.write_text(new_html, encoding="utf-8")
+    encoded = new_html.encode("utf-8")
+    stats["html_after"] = len(encoded)
+    stats["html_after_gz"] = len(gzip.compress(encoded, compresslevel=9, mtime=0))
+    stats["html_before_gz"] = len(gzip.compress(html.encode("utf-8"), compresslevel=9, mtime=0))
+    return stats
+
+
+def split_page_sections(page: Path, asset_dir: Path) -> None:
+    """Move heavy showSection branches of ``page`` into lazy section modules."""
+    html = page.read_text(encoding="utf-8")
+    try:
+        new_html, modules, report = split_page(html)
+    except SplitError as err:
+        raise SystemExit(f"[build_assets] Section split of {page.name} failed: {err}")
+    for line in report:
+        print(f"    {line}")
+    urls = {}
+    for section, module in modules.items():
+        data = minify_js(module.code).encode("utf-8")
+        name, sizes = write_asset(asset_dir, data, "js")
+        urls[section] = f"/{ASSET_DIR}/{name}"
+        print(f"    {section:<12} → {urls[section]}   min {_kb(sizes['min'])}   gz {_kb(sizes['gz'])}")
+    if urls:
+        page.write_text(inject_manifest(new_html, urls), encoding="utf-8")
+
+
+def write_headers(dist: Path) -> None:
+    headers = dist / "_headers"
+    text = headers.read_text(encoding="utf-8") if headers.exists() else ""
+    if f"/{ASSET_DIR}/*" not in text:
+        headers.write_text(text.rstrip("\n") + "\n" + IMMUTABLE_HEADERS, encoding="utf-8")
+
+
+def _kb(n: int) -> str:
+    return f"{n / 1024:8.1f} KB"
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    split = "--no-split" not in argv
+    args = [a for a in argv if a != "--no-split"]
+    dist = Path(args[0] if args else "dist")
+    if not dist.is_dir():
+        raise SystemExit(f"[build_assets] {dist}/ not found – run the copy step first.")
+
+    asset_dir = dist / ASSET_DIR
+    shutil.rmtree(asset_dir, ignore_errors=True)
+    asset_dir.mkdir(parents=True)
+
+    if brotli is None:
+        print("[build_assets] brotli not installed – writing .gz only (pip install brotli for .br)")
+    if split:
+        for name in SPLIT_PAGES:
+            page = dist / name
+            if page.exists():
+                print(f"[build_assets] Splitting showSection branches of {name} into lazy modules…")
+                split_page_sections(page, asset_dir)
+    print("[build_assets] Extracting inline <script>/<style> blocks…")
+    for name in PAGES:
+        page = dist / name
+        if not page.exists():
+            continue
+        s = extract_page(page, asset_dir)
+        print(f"  {s['page']}: {s['assets']} block(s) extracted")
+        print(f"    HTML        {_kb(s['html_before'])} → {_kb(s['html_after'])}"
+              f"   (gzip {_kb(s['html_before_gz'])} → {_kb(s['html_after_gz'])})")
+        if s["assets"]:
+            br = f"   br {_kb(s['br'])}" if s["br"] else ""
+            print(f"    assets raw  {_kb(s['raw'])} → min {_kb(s['min'])}   gz {_kb(s['gz'])}{br}")
+
+    write_headers(dist)
+    print(f"[build_assets] Added immutable Cache-Control for /{ASSET_DIR}/* to {dist}/_headers")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,659 @@
+/**
+ * Mogaland – columnar candle store with streaming indicators
+ *
+ * Loaded by index.html as a plain script (globals `CandleRing`,
+ * `IndicatorFeed`, `CandlePyramid`, `CandleStore`, `aggregateCandles`, `lttb`)
+ * and usable from Node (`module.exports`).
+ *
+ * CandleRing keeps OHLCV + time in six Float64Arrays used as a fixed-capacity
+ * ring: appending to a full ring overwrites the oldest bar, nothing is
+ * allocated per update.
+ *
+ * The indicators (EMA, Bollinger Bands, Wilder RSI) are incremental.  Each
+ * one keeps the state it had *before* the newest bar, so
+ *   append(close)  – a new bar opened:          O(1)
+ *   amend(close)   – the newest bar changed:    O(1), restore + re-apply
+ * which is exactly what a kline socket produces (many amends of the open
+ * bar, then one append).  Values match the full-array formulas that
+ * calculateEMA / calculateBollingerBands / updateRSIDisplay used.
+ *
+ * IndicatorFeed ties a ring to an indicator set.  update(bar) returns the
+ * delta for the newest bar ({ time, kind, ema20, ema50, bb, rsi }) so chart
+ * series can be updated with series.update() instead of setData(); replay()
+ * rebuilds full series only when an indicator is switched on.
+ *
+ * CandlePyramid keeps the candles of one asset at every chart timeframe
+ * (1m → 5m → 15m → 1h → 4h → 1d), rolled up from finer levels as klines
+ * are loaded and streamed; lttb() downsamples a line to the pixel width.
+ *
+ * CandleStore.feed(symbol, timeframe, capacity) / CandleStore.pyramid(symbol)
+ * return the feed of one asset and timeframe (re-created larger when a
+ * bigger capacity is asked for) / the pyramid of one asset (small LRU,
+ * STORE_MAX of each).
+ */
+
+(function (root) {
+  'use strict';
+
+  const DEFAULT_CAPACITY = 1024;
+  const STORE_MAX = 8;
+  const BB_RESYNC_EVERY = 4096;   // appends between exact recomputes of the BB sums
+
+  class CandleRing {
+    constructor(capacity = DEFAULT_CAPACITY) {
+      this.capacity = capacity;
+      this.time = new Float64Array(capacity);
+      this.open = new Float64Array(capacity);
+      this.high = new Float64Array(capacity);
+      this.low = new Float64Array(capacity);
+      this.close = new Float64Array(capacity);
+      this.volume = new Float64Array(capacity);
+      this.start = 0;
+      this.length = 0;
+    }
+
+    clear() {
+      this.start = 0;
+      this.length = 0;
+    }
+
+    // Physical slot of logical index i (0 = oldest bar kept).
+    slot(i) {
+      return (this.start + i) % this.capacity;
+    }
+
+    get lastTime() {
+      return this.length ? this.time[this.slot(this.length - 1)] : -Infinity;
+    }
+
+    _write(j, t, o, h, l, c, v) {
+      this.time[j] = t; this.open[j] = o; this.high[j] = h;
+      this.low[j] = l; this.close[j] = c; this.volume[j] = v;
+    }
+
+    /**
+     * Insert or amend the newest bar.  Returns 'append' (new bar),
+     * 'update' (same time as the newest bar) or 'stale' (older: ignored).
+     */
+    upsert(t, o, h, l, c, v = 0) {
+      const last = this.lastTime;
+      if (t === last) {
+        this._write(this.slot(this.length - 1), t, o, h, l, c, v);
+        return 'update';
+      }
+      if (t < last) return 'stale';
+      if (this.length < this.capacity) {
+        this._write(this.slot(this.length), t, o, h, l, c, v);
+        this.length++;
+      } else {
+        this._write(this.start, t, o, h, l, c, v);
+        this.start = (this.start + 1) % this.capacity;
+      }
+      return 'append';
+    }
+  }
+
+  // ── Incremental indicators ────────────────────────────────────────────────
+  // append(c) saves the pre-bar state, amend(c) restores it and re-applies.
+
+  class EMA {
+    constructor(period) {
+      this.period = period;
+      this.k = 2 / (period + 1);
+      this.reset();
+    }
+    reset() {
+      this.count = 0; this.seed = 0; this.value = NaN;
+      this._count = 0; this._seed = 0; this._value = NaN;
+    }
+    _apply(c) {
+      if (this.count < this.period) {
+        this.seed += c;
+        if (++this.count === this.period) this.value = this.seed / this.period;
+      } else {
+        this.value = c * this.k + this.value * (1 - this.k);
+        this.count++;
+      }
+      return this.value;
+    }
+    append(c) {
+      this._count = this.count; this._seed = this.seed; this._value = this.value;
+      return this._apply(c);
+    }
+    amend(c) {
+      this.count = this._count; this.seed = this._seed; this.value = this._value;
+      return this._apply(c);
+    }
+  }
+
+  class BollingerBands {
+    constructor(period = 20, multiplier = 2) {
+      this.period = period;
+      this.multiplier = multiplier;
+      this.window = new Float64Array(period);
+      this.reset();
+    }
+    reset() {
+      this.n = 0; this.head = 0; this.sum = 0; this.sumSq = 0; this.appends = 0;
+      this._n = 0; this._head = 0; this._sum = 0; this._sumSq = 0; this._evicted = 0;
+      this.upper = this.middle = this.lower = NaN;
+    }
+    _apply(c) {
+      if (this.n === this.period) {
+        const old = this.window[this.head];
+        this.sum -= old;
+        this.sumSq -= old * old;
+      } else {
+        this.n++;
+      }
+      this.window[this.head] = c;
+      this.head = (this.head + 1) % this.period;
+      this.sum += c;
+      this.sumSq += c * c;
+      if (this.n < this.period) {
+        this.upper = this.middle = this.lower = NaN;
+        return;
+      }
+      const mean = this.sum / this.period;
+      const sd = Math.sqrt(Math.max(0, this.sumSq / this.period - mean * mean));
+      this.middle = mean;
+      this.upper = mean + this.multiplier * sd;
+      this.lower = mean - this.multiplier * sd;
+    }
+    _resync() {
+      let sum = 0, sumSq = 0;
+      for (let i = 0; i < this.n; i++) { const x = this.window[i]; sum += x; sumSq += x * x; }
+      this.sum = sum;
+      this.sumSq = sumSq;
+    }
+    append(c) {
+      if (++this.appends % BB_RESYNC_EVERY === 0) this._resync();
+      this._n = this.n; this._head = this.head; this._sum = this.sum; this._sumSq = this.sumSq;
+      this._evicted = this.window[this.head];
+      this._apply(c);
+    }
+    amend(c) {
+      this.n = this._n; this.head = this._head; this.sum = this._sum; this.sumSq = this._sumSq;
+      this.window[this.head] = this._evicted;
+      this._apply(c);
+    }
+  }
+
+  class RSI {
+    constructor(period = 14) {
+      this.period = period;
+      this.reset();
+    }
+    reset() {
+      this.count = 0; this.prevClose = NaN; this.lastClose = NaN;
+      this.gain = 0; this.loss = 0; this.value = NaN;
+      this._count = 0; this._gain = 0; this._loss = 0; this._value = NaN;
+    }
+    _apply(c) {
+      this.lastClose = c;
+      if (this.count++ === 0) return this.value;
+      const diff = c - this.prevClose;
+      const g = diff > 0 ? diff : 0;
+      const l = diff < 0 ? -diff : 0;
+      const p = this.period;
+      if (this.count <= p + 1) {
+        // Seed: simple average of the first `period` gains / losses
+        this.gain += g;
+        this.loss += l;
+        if (this.count < p + 1) return this.value;
+        this.gain /= p;
+        this.loss /= p;
+      } else {
+        this.gain = (this.gain * (p - 1) + g) / p;
+        this.loss = (this.loss * (p - 1) + l) / p;
+      }
+      this.value = this.loss === 0 ? 100 : 100 - 100 / (1 + this.gain / this.loss);
+      return this.value;
+    }
+    append(c) {
+      this.prevClose = this.lastClose;
+      this._count = this.count; this._gain = this.gain; this._loss = this.loss; this._value = this.value;
+      return this._apply(c);
+    }
+    amend(c) {
+      this.count = this._count; this.gain = this._gain; this.loss = this._loss; this.value = this._value;
+      return this._apply(c);
+    }
+  }
+
+  // ── Feed: ring + indicators of one asset / timeframe ──────────────────────
+
+  class IndicatorFeed {
+    constructor(capacity = DEFAULT_CAPACITY, rsiPeriod = 14) {
+      this.ring = new CandleRing(capacity);
+      this.rsiPeriod = rsiPeriod;
+      this._makeIndicators();
+    }
+
+    _makeIndicators() {
+      this.ema20 = new EMA(20);
+      this.ema50 = new EMA(50);
+      this.bb = new BollingerBands(20, 2);
+      this.rsi = new RSI(this.rsiPeriod);
+    }
+
+    get length() {
+      return this.ring.length;
+    }
+
+    // Replace the content with `bars` ({ time, open, high, low, close, volume }).
+    load(bars) {
+      this.ring.clear();
+      this._makeIndicators();
+      for (let i = 0; i < bars.length; i++) this.update(bars[i]);
+    }
+
+    /**
+     * Apply one bar (new or amended newest bar).  Returns the indicator delta
+     * for that bar, or null for bars older than the newest one.
+     */
+    update(bar) {
+      const c = +bar.close;
+      if (!Number.isFinite(c) || bar.time == null) return null;
+      const kind = this.ring.upsert(+bar.time, +bar.open, +bar.high, +bar.low, c, +(bar.volume || 0));
+      if (kind === 'stale') return null;
+      const op = kind === 'append' ? 'append' : 'amend';
+      this.ema20[op](c);
+      this.ema50[op](c);
+      this.bb[op](c);
+      this.rsi[op](c);
+      return this.delta(kind);
+    }
+
+    delta(kind = 'update') {
+      const bb = this.bb;
+      return {
+        time: this.ring.lastTime,
+        kind,
+        ema20: this.ema20.value,
+        ema50: this.ema50.value,
+        bb: { upper: bb.upper, middle: bb.middle, lower: bb.lower },
+        rsi: this.rsi.value,
+      };
+    }
+
+    // Change the RSI period: one O(n) rebuild of the RSI state only.
+    setRSIPeriod(period) {
+      if (period === this.rsiPeriod) return;
+      this.rsiPeriod = period;
+      this.rsi = new RSI(period);
+      const r = this.ring;
+      for (let i = 0; i < r.length; i++) this.rsi.append(r.close[r.slot(i)]);
+    }
+
+    /**
+     * Full line-series data ({ time, value } arrays) for every indicator,
+     * rebuilt from the ring.  Used when an indicator is switched on or the
+     * chart reloads; streaming updates use update() deltas instead.
+     */
+    replay() {
+      const r = this.ring;
+      const ema20 = new EMA(20), ema50 = new EMA(50), bb = new BollingerBands(20, 2);
+      const out = { ema20: [], ema50: [], bbUpper: [], bbMiddle: [], bbLower: [] };
+      for (let i = 0; i < r.length; i++) {
+        const j = r.slot(i);
+        const time = r.time[j], c = r.close[j];
+        const e20 = ema20.append(c), e50 = ema50.append(c);
+        bb.append(c);
+        if (!Number.isNaN(e20)) out.ema20.push({ time, value: e20 });
+        if (!Number.isNaN(e50)) out.ema50.push({ time, value: e50 });
+        if (!Number.isNaN(bb.middle)) {
+          out.bbUpper.push({ time, value: bb.upper });
+          out.bbMiddle.push({ time, value: bb.middle });
+          out.bbLower.push({ time, value: bb.lower });
+        }
+      }
+      return out;
+    }
+  }
+
+  // ── Multi-resolution candle pyramid ───────────────────────────────────────
+  // One sorted bar array per timeframe.  Fetched history is merged per level
+  // and complete buckets are rolled up into the coarser levels; streamed bars
+  // cascade up level by level (each step touches at most step/fineStep bars),
+  // so a coarser timeframe can be drawn from memory instead of refetched.
+
+  const PYRAMID_LEVELS = [['1m', 60], ['5m', 300], ['15m', 900], ['1h', 3600], ['4h', 14400], ['1d', 86400]];
+  const PYRAMID_LEVEL_MAX = 5000;   // bars kept per level
+  const PYRAMID_TRIM = 256;         // bars dropped at once when a level overflows
+
+  function toBar(b) {
+    return { time: +b.time, open: +b.open, high: +b.high, low: +b.low, close: +b.close, volume: +(b.volume || 0) };
+  }
+
+  // Index of the first bar with time >= t in a time-sorted array.
+  function lowerBound(bars, t) {
+    let lo = 0, hi = bars.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (bars[mid].time < t) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+  }
+
+  // OHLCV of bars[from, to) as one bar at `time`.
+  function aggregateRange(bars, from, to, time) {
+    const out = { time, open: bars[from].open, high: -Infinity, low: Infinity, close: bars[to - 1].close, volume: 0 };
+    for (let i = from; i < to; i++) {
+      const b = bars[i];
+      if (b.high > out.high) out.high = b.high;
+      if (b.low < out.low) out.low = b.low;
+      out.volume += b.volume;
+    }
+    return out;
+  }
+
+  /**
+   * Roll time-sorted `bars` of `fineStep` seconds up into `step` buckets.
+   * Only buckets whose children start at the bucket start and have no gaps
+   * are returned, and only the newest one may be partially filled.
+   */
+  function aggregateCandles(bars, step, fineStep) {
+    const out = [];
+    let i = 0;
+    while (i < bars.length) {
+      const bucket = Math.floor(bars[i].time / step) * step;
+      let j = i + 1;
+      while (j < bars.length && bars[j].time < bucket + step) j++;
+      const count = j - i;
+      const contiguous = bars[i].time === bucket && bars[j - 1].time === bucket + (count - 1) * fineStep;
+      if (contiguous && (count === step / fineStep || j === bars.length)) out.push(aggregateRange(bars, i, j, bucket));
+      i = j;
+    }
+    return out;
+  }
+
+  class CandlePyramid {
+    constructor(levels = PYRAMID_LEVELS, maxBars = PYRAMID_LEVEL_MAX) {
+      this.levels = levels.map(([name, step]) => ({ name, step, bars: [] }));
+      this.maxBars = maxBars;
+    }
+
+    _index(name) {
+      return this.levels.findIndex(l => l.name === name);
+    }
+
+    bars(name) {
+      const i = this._index(name);
+      return i === -1 ? [] : this.levels[i].bars;
+    }
+
+    // Bars of `name` with time < beforeTime, newest `limit` of them.
+    page(name, beforeTime, limit) {
+      const bars = this.bars(name);
+      const end = lowerBound(bars, beforeTime);
+      return bars.slice(Math.max(0, end - limit), end);
+    }
+
+    /**
+     * Merge fetched history (any overlap, newer values win) into level `name`
+     * and fill the coarser levels with buckets they do not have yet.
+     */
+    load(name, bars) {
+      const i = this._index(name);
+      if (i === -1 || !bars.length) return;
+      this._merge(this.levels[i], bars.map(toBar));
+      for (let j = i + 1; j < this.levels.length; j++) {
+        const fine = this.levels[j - 1], coarse = this.levels[j];
+        const have = new Set(coarse.bars.map(b => b.time));
+        const missing = aggregateCandles(fine.bars, coarse.step, fine.step).filter(b => !have.has(b.time));
+        if (missing.length) this._merge(coarse, missing);
+      }
+    }
+
+    _merge(level, bars) {
+      const byTime = new Map(level.bars.map(b => [b.time, b]));
+      bars.forEach(b => byTime.set(b.time, b));
+      level.bars = [...byTime.values()].sort((a, b) => a.time - b.time);
+      if (level.bars.length > this.maxBars) level.bars = level.bars.slice(-this.maxBars);
+    }
+
+    /**
+     * Apply one streamed bar of level `name` (the open bar or a new one) and
+     * cascade it into every coarser level.  A coarse bar fetched before the
+     * stream started keeps its own open/volume and only widens high/low and
+     * takes the latest close.
+     */
+    ingest(name, bar) {
+      const i = this._index(name);
+      if (i === -1 || !this._upsert(this.levels[i], toBar(bar))) return;
+      for (let j = i + 1; j < this.levels.length; j++) {
+        const fine = this.levels[j - 1], coarse = this.levels[j];
+        const bucket = Math.floor(bar.time / coarse.step) * coarse.step;
+        const from = lowerBound(fine.bars, bucket);
+        const agg = aggregateRange(fine.bars, from, fine.bars.length, bucket);
+        const k = lowerBound(coarse.bars, bucket);
+        const existing = coarse.bars[k] && coarse.bars[k].time === bucket ? coarse.bars[k] : null;
+        if (fine.bars[from].time === bucket) {
+          if (!this._upsert(coarse, agg)) return;
+        } else if (existing) {
+          existing.high = Math.max(existing.high, agg.high);
+          existing.low = Math.min(existing.low, agg.low);
+          existing.close = agg.close;
+        } else {
+          return;
+        }
+      }
+    }
+
+    // Replace the newest bar or append a newer one; false for older bars.
+    _upsert(level, bar) {
+      const bars = level.bars;
+      const last = bars[bars.length - 1];
+      if (last && bar.time === last.time) {
+        bars[bars.length - 1] = bar;
+      } else if (!last || bar.time > last.time) {
+        bars.push(bar);
+        if (bars.length > this.maxBars + PYRAMID_TRIM) bars.splice(0, PYRAMID_TRIM);
+      } else {
+        return false;
+      }
+      return true;
+    }
+  }
+
+  /**
+   * Largest-Triangle-Three-Buckets downsampling of a line to `threshold`
+   * points (first and last kept).  `x` / `y` read a point's coordinates.
+   */
+  function lttb(points, threshold, x = p => p.x, y = p => p.y) {
+    const n = points.length;
+    if (threshold >= n || threshold < 3) return points.slice();
+    const out = [points[0]];
+    const every = (n - 2) / (threshold - 2);
+    let a = 0;
+    for (let i = 0; i < threshold - 2; i++) {
+      // Average of the next bucket is the third triangle vertex
+      const avgStart = Math.floor((i + 1) * every) + 1;
+      const avgEnd = Math.min(Math.floor((i + 2) * every) + 1, n);
+      let avgX = 0, avgY = 0;
+      for (let j = avgStart; j < avgEnd; j++) { avgX += x(points[j]); avgY += y(points[j]); }
+      avgX /= (avgEnd - avgStart) || 1;
+      avgY /= (avgEnd - avgStart) || 1;
+
+      const start = Math.floor(i * every) + 1;
+      const end = Math.floor((i + 1) * every) + 1;
+      const ax = x(points[a]), ay = y(points[a]);
+      let maxArea = -1, next = start;
+      for (let j = start; j < end; j++) {
+        const area = Math.abs((ax - avgX) * (y(points[j]) - ay) - (ax - x(points[j])) * (avgY - ay));
+        if (area > maxArea) { maxArea = area; next = j; }
+      }
+      out.push(points[next]);
+      a = next;
+    }
+    out.push(points[n - 1]);
+    return out;
+  }
+
+  // One feed per asset and timeframe, least recently used evicted first.
+  const CandleStore = {
+    feeds: new Map(),
+    pyramids: new Map(),
+    feed(symbol, timeframe, capacity = DEFAULT_CAPACITY) {
+      const key = `${symbol}|${timeframe}`;
+      let f = this.feeds.get(key);
+      if (f) {
+        this.feeds.delete(key);
+        // A ring smaller than the requested window would drop the oldest bars
+        if (f.ring.capacity < capacity) f = new IndicatorFeed(capacity, f.rsiPeriod);
+      } else {
+        f = new IndicatorFeed(capacity);
+        if (this.feeds.size >= STORE_MAX) this.feeds.delete(this.feeds.keys().next().value);
+      }
+      this.feeds.set(key, f);
+      return f;
+    },
+    // Candle pyramid of one asset (all timeframes), same LRU bound as feeds.
+    pyramid(symbol) {
+      let p = this.pyramids.get(symbol);
+      if (p) {
+        this.pyramids.delete(symbol);
+      } else {
+        p = new CandlePyramid();
+        if (this.pyramids.size >= STORE_MAX) this.pyramids.delete(this.pyramids.keys().next().value);
+      }
+      this.pyramids.set(symbol, p);
+      return p;
+    },
+  };
+
+  // ── Reference (full recompute) and micro-benchmark ─────────────────────────
+  // Same formulas as the original calculateEMA / calculateBollingerBands /
+  // updateRSIDisplay in index.html: every call walks the whole history.
+
+  const reference = {
+    ema(data, period) {
+      if (data.length < period) return [];
+      const k = 2 / (period + 1);
+      let ema = data.slice(0, period).reduce((sum, d) => sum + d.close, 0) / period;
+      const result = [{ time: data[period - 1].time, value: ema }];
+      for (let i = period; i < data.length; i++) {
+        ema = data[i].close * k + ema * (1 - k);
+        result.push({ time: data[i].time, value: ema });
+      }
+      return result;
+    },
+    bollinger(data, period = 20, multiplier = 2) {
+      const result = [];
+      for (let i = period - 1; i < data.length; i++) {
+        const slice = data.slice(i - period + 1, i + 1);
+        const mean = slice.reduce((s, d) => s + d.close, 0) / period;
+        const variance = slice.reduce((s, d) => s + Math.pow(d.close - mean, 2), 0) / period;
+        const sd = Math.sqrt(variance);
+        result.push({ time: data[i].time, upper: mean + multiplier * sd, middle: mean, lower: mean - multiplier * sd });
+      }
+      return result;
+    },
+    rsi(data, period = 14) {
+      const closes = data.map(d => d.close);
+      if (closes.length < period + 1) return NaN;
+      let avgGain = 0, avgLoss = 0;
+      for (let i = 1; i <= period; i++) {
+        const diff = closes[i] - closes[i - 1];
+        if (diff > 0) avgGain += diff; else avgLoss -= diff;
+      }
+      avgGain /= period;
+      avgLoss /= period;
+      for (let i = period + 1; i < closes.length; i++) {
+        const diff = closes[i] - closes[i - 1];
+        avgGain = (avgGain * (period - 1) + (diff > 0 ? diff : 0)) / period;
+        avgLoss = (avgLoss * (period - 1) + (diff < 0 ? -diff : 0)) / period;
+      }
+      return avgLoss === 0 ? 100 : 100 - 100 / (1 + avgGain / avgLoss);
+    },
+  };
+
+  function mulberry32(seed) {
+    return function () {
+      seed |= 0; seed = seed + 0x6D2B79F5 | 0;
+      let t = Math.imul(seed ^ seed >>> 15, 1 | seed);
+      t = t + Math.imul(t ^ t >>> 7, 61 | t) ^ t;
+      return ((t ^ t >>> 14) >>> 0) / 4294967296;
+    };
+  }
+
+  /**
+   * Seeded kline stream: `bars` history bars, then `ticks` socket updates of
+   * the open bar with a new bar every `ticksPerBar`.  Both implementations
+   * consume it; returns per-tick timings and the largest relative difference
+   * of the last-bar values.
+   */
+  function bench({ seed = 7, bars = 500, ticks = 20000, ticksPerBar = 60 } = {}) {
+    const now = () => (typeof performance !== 'undefined' ? performance.now() : Date.now());
+    const rand = mulberry32(seed);
+    let price = 60000, time = 1700000000;
+    const history = [];
+    for (let i = 0; i < bars; i++) {
+      price *= 1 + (rand() - 0.5) * 0.004;
+      history.push({ time: time += 60, open: price, high: price, low: price, close: price, volume: 1 });
+    }
+    const stream = [];
+    for (let i = 0; i < ticks; i++) {
+      if (i % ticksPerBar === 0) time += 60;
+      price *= 1 + (rand() - 0.5) * 0.001;
+      stream.push({ time, open: price, high: price, low: price, close: price, volume: 1 });
+    }
+    const capacity = bars + Math.ceil(ticks / ticksPerBar) + 1;
+
+    // Incremental: one upsert + O(1) indicator step per tick
+    const feed = new IndicatorFeed(capacity);
+    feed.load(history);
+    const incremental = new Float64Array(ticks * 6);
+    let t0 = now();
+    for (let i = 0; i < ticks; i++) {
+      const d = feed.update(stream[i]);
+      incremental.set([d.ema20, d.ema50, d.bb.upper, d.bb.middle, d.bb.lower, d.rsi], i * 6);
+    }
+    const incrementalMs = now() - t0;
+
+    // Full recompute over the whole array on every tick
+    const data = history.slice();
+    const full = new Float64Array(ticks * 6);
+    t0 = now();
+    for (let i = 0; i < ticks; i++) {
+      const bar = stream[i];
+      if (bar.time === data[data.length - 1].time) data[data.length - 1] = bar; else data.push(bar);
+      const e20 = reference.ema(data, 20), e50 = reference.ema(data, 50), bb = reference.bollinger(data, 20, 2);
+      const b = bb[bb.length - 1];
+      full.set([e20[e20.length - 1].value, e50[e50.length - 1].value, b.upper, b.middle, b.lower,
+        reference.rsi(data, 14)], i * 6);
+    }
+    const fullMs = now() - t0;
+
+    let maxRelDiff = 0;
+    for (let i = 0; i < full.length; i++) {
+      maxRelDiff = Math.max(maxRelDiff, Math.abs(incremental[i] - full[i]) / Math.max(1, Math.abs(full[i])));
+    }
+    return {
+      bars, ticks, incrementalMs, fullMs, maxRelDiff,
+      perTickUs: { incremental: incrementalMs * 1000 / ticks, full: fullMs * 1000 / ticks },
+    };
+  }
+
+  const api = {
+    CandleRing, EMA, BollingerBands, RSI, IndicatorFeed, CandlePyramid, CandleStore,
+    aggregateCandles, lttb, reference, bench,
+  };
+  if (typeof module !== 'undefined' && module.exports) {
+    module.exports = api;
+    if (typeof require !== 'undefined' && require.main === module) {
+      const r = bench();
+      console.log(`${r.bars} bars + ${r.ticks} ticks: incremental ${r.incrementalMs.toFixed(1)} ms ` +
+        `(${r.perTickUs.incremental.toFixed(2)} µs/tick), full recompute ${r.fullMs.toFixed(1)} ms ` +
+        `(${r.perTickUs.full.toFixed(2)} µs/tick)`);
+      console.log(`max relative difference ${r.maxRelDiff.toExponential(2)}`);
+      process.exitCode = r.maxRelDiff < 1e-9 ? 0 : 1;
+    }
+  } else {
+    Object.assign(root, {
+      CandleRing, IndicatorFeed, CandlePyramid, CandleStore, aggregateCandles, lttb,
+      CandleBench: { reference, bench },
+    });
+  }
+})(typeof self !== 'undefined' ? self : this);
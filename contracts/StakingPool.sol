@@ -55,6 +55,14 @@ import "@openzeppelin/contracts/utils/ReentrancyGuard.sol";
  *       – wMOGA/ETH LP:    addPool("wMOGA/ETH LP",       <LP_addr>,    <reward>, <rate>)
  *  5. After deployment, update `index.html`: set `stakingContractAddress` in the
  *     appropriate network entry inside the NETWORKS map.
+ *
+ * Batched entry points
+ * ────────────────────
+ *  • getPoolsPage / getUserDashboard – pool state, pending rewards and user info
+ *    for many pools in one eth_call (the dashboard refresh).
+ *  • claimAll / stakeMany – one transaction across pools; each pool is brought
+ *    forward by a single _updatePool, and claimAll pays consecutive pools that
+ *    share a reward token with one transfer.
  */
 contract StakingPool is Ownable, ReentrancyGuard {
     using SafeERC20 for IERC20;
@@ -76,6 +84,27 @@ contract StakingPool is Ownable, ReentrancyGuard {
         uint256 rewardDebt;   // amountStaked × rewardPerTokenStored / 1e18 at last checkpoint
     }
 
+    /// @dev Read-only snapshot of a pool returned by the batched views.
+    struct PoolView {
+        uint256 poolId;
+        address stakingToken;
+        address rewardToken;
+        uint256 totalStaked;
+        uint256 rewardRate;
+        uint256 lastUpdateTime;
+        uint256 rewardPerTokenStored;
+        uint256 rewardPerToken;         // Accumulator as of block.timestamp
+        string  name;
+    }
+
+    /// @dev A user's position in one pool, as returned by getUserDashboard.
+    struct UserPosition {
+        uint256 poolId;
+        uint256 amountStaked;
+        uint256 rewardDebt;
+        uint256 pending;                // Same value as pendingReward(poolId, user)
+    }
+
     // ─── State ───────────────────────────────────────────────────────────────
 
     mapping(uint256 => Pool)                        public pools;
@@ -204,9 +233,6 @@ contract StakingPool is Ownable, ReentrancyGuard {
         Pool storage pool = pools[poolId];
         require(address(pool.rewardToken) != address(0), "StakingPool: pool not found");
 
-        _updatePool(poolId);
-        UserInfo storage user = userInfo[poolId][msg.sender];
-
         // Determine deposited amount before any state changes
         uint256 deposited;
         if (address(pool.stakingToken) == address(0)) {
@@ -220,6 +246,41 @@ contract StakingPool is Ownable, ReentrancyGuard {
             deposited = amount;
         }
 
+        _stake(poolId, deposited);
+    }
+
+    /**
+     * @notice Deposit into several pools in one transaction.
+     *
+     * @dev Unlike stake(), ETH pools take their amount from `amounts` as well;
+     *      msg.value must equal the sum of the ETH-pool amounts. Token pools
+     *      need the usual approvals beforehand.
+     *
+     * @param poolIds  Pools to stake in.
+     * @param amounts  Amount per pool (same order as poolIds), all > 0.
+     */
+    function stakeMany(uint256[] calldata poolIds, uint256[] calldata amounts)
+        external payable nonReentrant
+    {
+        require(poolIds.length == amounts.length, "StakingPool: length mismatch");
+
+        uint256 ethStaked;
+        for (uint256 i = 0; i < poolIds.length; ++i) {
+            Pool storage pool = pools[poolIds[i]];
+            require(address(pool.rewardToken) != address(0), "StakingPool: pool not found");
+            require(amounts[i] > 0,                           "StakingPool: amount must be > 0");
+            if (address(pool.stakingToken) == address(0)) ethStaked += amounts[i];
+            _stake(poolIds[i], amounts[i]);
+        }
+        require(ethStaked == msg.value, "StakingPool: ETH amount mismatch");
+    }
+
+    /// @dev Checkpoint the pool, pay the caller's pending reward and book `deposited`.
+    function _stake(uint256 poolId, uint256 deposited) internal {
+        Pool storage pool = pools[poolId];
+        _updatePool(poolId);
+        UserInfo storage user = userInfo[poolId][msg.sender];
+
         // Snapshot pending reward for existing stakers (before state update)
         uint256 pending = user.amountStaked > 0
             ? (user.amountStaked * pool.rewardPerTokenStored / 1e18) - user.rewardDebt
@@ -300,6 +361,47 @@ contract StakingPool is Ownable, ReentrancyGuard {
         emit RewardClaimed(msg.sender, poolId, pending);
     }
 
+    /**
+     * @notice Claim accrued rewards from several pools in one transaction.
+     *         Pools with nothing pending are skipped; reverts only if no pool
+     *         had anything to claim. Consecutive pools paying the same reward
+     *         token are settled with a single transfer.
+     */
+    function claimAll(uint256[] calldata poolIds) external nonReentrant {
+        IERC20  token;
+        uint256 owed;
+        uint256 total;
+
+        for (uint256 i = 0; i < poolIds.length; ++i) {
+            uint256 poolId = poolIds[i];
+            Pool storage pool = pools[poolId];
+            require(address(pool.rewardToken) != address(0), "StakingPool: pool not found");
+
+            UserInfo storage user = userInfo[poolId][msg.sender];
+            if (user.amountStaked == 0) continue;   // rewardDebt is 0 too: nothing pending
+
+            _updatePool(poolId);
+            uint256 pending = (user.amountStaked * pool.rewardPerTokenStored / 1e18) - user.rewardDebt;
+            if (pending == 0) continue;
+
+            // ── Effects ──────────────────────────────────────────────────────
+            user.rewardDebt = user.amountStaked * pool.rewardPerTokenStored / 1e18;
+            total += pending;
+            emit RewardClaimed(msg.sender, poolId, pending);
+
+            // ── Interactions: settle the previous token when it changes ──────
+            if (address(pool.rewardToken) != address(token)) {
+                if (owed > 0) token.safeTransfer(msg.sender, owed);
+                token = pool.rewardToken;
+                owed  = 0;
+            }
+            owed += pending;
+        }
+
+        require(total > 0, "StakingPool: nothing to claim");
+        token.safeTransfer(msg.sender, owed);
+    }
+
     // ─── View helpers ─────────────────────────────────────────────────────────
 
     /**
@@ -327,6 +429,66 @@ contract StakingPool is Ownable, ReentrancyGuard {
         return pools[poolId].name;
     }
 
+    /**
+     * @notice Returns up to `limit` pools starting after the first `offset`
+     *         (offset 0 → pool #1), plus the total pool count.
+     */
+    function getPoolsPage(uint256 offset, uint256 limit)
+        external view
+        returns (PoolView[] memory page, uint256 total)
+    {
+        total = poolCount;
+        uint256 n = offset < total ? total - offset : 0;
+        if (limit < n) n = limit;
+
+        page = new PoolView[](n);
+        for (uint256 i = 0; i < n; ++i) {
+            page[i] = _poolView(offset + i + 1);
+        }
+    }
+
+    /**
+     * @notice Pool state and the user's position in each of `poolIds` in one
+     *         call. An empty `poolIds` means every pool (1 … poolCount).
+     */
+    function getUserDashboard(address userAddr, uint256[] calldata poolIds)
+        external view
+        returns (PoolView[] memory poolViews, UserPosition[] memory positions)
+    {
+        uint256 n = poolIds.length == 0 ? poolCount : poolIds.length;
+        poolViews = new PoolView[](n);
+        positions = new UserPosition[](n);
+
+        for (uint256 i = 0; i < n; ++i) {
+            uint256 poolId = poolIds.length == 0 ? i + 1 : poolIds[i];
+            PoolView memory pv = _poolView(poolId);
+            UserInfo storage u = userInfo[poolId][userAddr];
+
+            poolViews[i] = pv;
+            positions[i] = UserPosition({
+                poolId:       poolId,
+                amountStaked: u.amountStaked,
+                rewardDebt:   u.rewardDebt,
+                pending:      (u.amountStaked * pv.rewardPerToken / 1e18) - u.rewardDebt
+            });
+        }
+    }
+
+    function _poolView(uint256 poolId) internal view returns (PoolView memory) {
+        Pool storage pool = pools[poolId];
+        return PoolView({
+            poolId:               poolId,
+            stakingToken:         address(pool.stakingToken),
+            rewardToken:          address(pool.rewardToken),
+            totalStaked:          pool.totalStaked,
+            rewardRate:           pool.rewardRate,
+            lastUpdateTime:       pool.lastUpdateTime,
+            rewardPerTokenStored: pool.rewardPerTokenStored,
+            rewardPerToken:       _currentRewardPerToken(poolId),
+            name:                 pool.name
+        });
+    }
+
     // ─── Safety ───────────────────────────────────────────────────────────────
 
     /// @dev Accept ETH sent directly (needed to receive ETH for ETH pools).
@@ -3,26 +3,44 @@
 
 """
 fix_assets_html.py
-Perbaiki tag <img> & URL icon di index.html:
+Perbaiki tag <img> & URL icon di semua file HTML:
 - Ubah URL polos dalam .profile-slide-asset-row menjadi <img ...>
 - Perbaiki src tanpa skema (000000?text=MOGA)
 - Hilangkan duplikasi URL placeholder
 - Pastikan class="profile-slide-asset-icon"
+
+Semua perbaikan dilakukan dalam SATU lintasan tokenizer per file (tanpa
+regex re.DOTALL berulang atas seluruh dokumen).  File yang isinya sama dengan
+hasil perbaikan terakhir (berdasarkan hash SHA-256) dilewati, dan file hanya
+ditulis ulang (beserta backup .bak) kalau memang ada perubahan.
+
+Usage:
+    python fix_assets_html.py                    # 4 file HTML, paralel
+    python fix_assets_html.py index.html --jobs 1
+    python fix_assets_html.py --check            # laporan saja, tidak menulis
+    python fix_assets_html.py --force            # abaikan cache hash
+    python patch_engine.py fix_assets_html       # digabung dengan skrip patch lain
 """
 
+import argparse
+import hashlib
+import json
 import re
-from pathlib import Path
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Tuple
 
-HTML_FILE = Path("index.html")
-BACKUP_FILE = Path("index.html.bak")
-
-if not HTML_FILE.exists():
-    raise SystemExit(f"File {HTML_FILE} tidak ditemukan. Jalankan dari folder yang berisi index.html")
+from patch_engine import Edit
 
-# Backup
-shutil.copy2(HTML_FILE, BACKUP_FILE)
-html = HTML_FILE.read_text(encoding="utf-8")
+HTML_FILES = [
+    Path("index.html"),
+    Path("game.html"),
+    Path("mogalandplumesimulator.html"),
+    Path("test.html"),
+]
+STATE_FILE = Path(__file__).resolve().parent / ".patch-index" / "fix_assets_html.json"
 
 KNOWN_ICON_URLS = {
     "https://plume.org/media-kit/plume-logomark-red.png": ("PLUME", "Plume Native"),
@@ -31,56 +49,187 @@ KNOWN_ICON_URLS = {
     "https://cryptologos.cc/logos/tether-usdt-logo.png?v=035": ("USDT", "Tether"),
 }
 
-def replace_bare_urls_in_asset_rows(text: str) -> str:
-    row_pattern = re.compile(r'(<div\s+class="profile-slide-asset-row"[^>]*>)(.*?)(</div>)', re.DOTALL)
-    def fix_row(m):
-        start, body, end = m.groups()
-        urls = re.findall(r'(https?://[^\s"<>\']+)', body)
-        new_body = body
-        for url in urls:
-            # skip kalau sudah jadi <img src="url">
-            if re.search(rf'<img[^>]+src=["\']{re.escape(url)}["\']', body):
+MOGA_PLACEHOLDER = 'https://via.placeholder.com/44/FFCC00/000000?text=MOGA'
+ICON_CLASS = "profile-slide-asset-icon"
+ROW_CLASS = "profile-slide-asset-row"
+
+# Placeholder MOGA: URL duplikat (pemicu DNS error), src berkutip tanpa skema,
+# dan src polos tanpa skema.  Duplikat harus di depan supaya menang.
+PLACEHOLDER_PATTERN = r"""
+      (?P<dup>https://via\.placeholder\.com/44/FFCC00/https://via\.placeholder\.com/44/FFCC00/000000\?text=MOGA)
+    | (?P<qph>(?P<q>["'])000000\?text=MOGA(?P=q))
+    | (?P<ph>(?<![a-zA-Z0-9/"'])000000\?text=MOGA(?![a-zA-Z0-9]))
+"""
+PLACEHOLDER_RE = re.compile(PLACEHOLDER_PATTERN, re.VERBOSE)
+
+# Satu pola gabungan: setiap token yang relevan ditemukan dalam satu lintasan.
+TOKEN_RE = re.compile(PLACEHOLDER_PATTERN + r"""
+    | (?P<img><img\b[^>]*>)
+    | (?P<div_open><div\b[^>]*>)
+    | (?P<div_close></div\s*>)
+    | (?P<url>(?<![="'/])https?://[^\s"<>']+)
+""", re.VERBOSE | re.IGNORECASE)
+CLASS_ATTR_RE = re.compile(r'\sclass="([^"]*)"', re.IGNORECASE)
+
+
+def _fix_placeholder(m: "re.Match[str]") -> str:
+    if m.group("qph"):
+        return f'"{MOGA_PLACEHOLDER}"'
+    return MOGA_PLACEHOLDER
+
+
+def _fix_img(tag: str) -> str:
+    """Perbaiki placeholder di dalam tag dan pastikan class icon ada."""
+    tag = PLACEHOLDER_RE.sub(_fix_placeholder, tag)
+    cm = CLASS_ATTR_RE.search(tag)
+    if cm is None:
+        return tag.replace("<img", f'<img class="{ICON_CLASS}"', 1)
+    if ICON_CLASS in cm.group(1).split():
+        return tag
+    value = f"{cm.group(1)} {ICON_CLASS}".strip()
+    return f"{tag[:cm.start(1)]}{value}{tag[cm.end(1):]}"
+
+
+def iter_fixes(text: str) -> Iterator[Edit]:
+    """Tokenize ``text`` sekali dan hasilkan setiap perbaikan sebagai Edit."""
+    # Kedalaman <div> di dalam asset-row; 0 berarti di luar row.
+    row_depth = 0
+    for m in TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        tok = m.group(0)
+        if kind == "div_open":
+            if row_depth:
+                row_depth += 1
+            else:
+                cm = CLASS_ATTR_RE.search(tok)
+                if cm and ROW_CLASS in cm.group(1).split():
+                    row_depth = 1
+            continue
+        if kind == "div_close":
+            row_depth = max(0, row_depth - 1)
+            continue
+        if kind == "img":
+            new = _fix_img(tok) if row_depth else PLACEHOLDER_RE.sub(_fix_placeholder, tok)
+        elif kind == "url":
+            if not row_depth:
                 continue
-            alt = KNOWN_ICON_URLS.get(url, ("Asset", ""))[0]
-            img_tag = f'<img src="{url}" alt="{alt}" class="profile-slide-asset-icon">'
             # ganti url polos dengan tag <img>
-            new_body = new_body.replace(url, img_tag)
-        return start + new_body + end
-    return row_pattern.sub(fix_row, text)
+            alt = KNOWN_ICON_URLS.get(tok, ("Asset", ""))[0]
+            new = f'<img src="{tok}" alt="{alt}" class="{ICON_CLASS}">'
+        else:
+            new = _fix_placeholder(m)
+        if new != tok:
+            yield Edit(m.start(), m.end(), new)
 
-html = replace_bare_urls_in_asset_rows(html)
 
-# Perbaiki src tanpa skema '000000?text=MOGA' -> placeholder absolut
-MOGA_PLACEHOLDER = 'https://via.placeholder.com/44/FFCC00/000000?text=MOGA'
-html = re.sub(r'(["\'])000000\?text=MOGA\1', f'"{MOGA_PLACEHOLDER}"', html)
-html = re.sub(r'(?<![a-zA-Z0-9])000000\?text=MOGA(?![a-zA-Z0-9])', MOGA_PLACEHOLDER, html)
-
-# Hilangkan duplikasi URL placeholder (yang memicu DNS error)
-dup_pattern = re.compile(
-    r'https://via\.placeholder\.com/44/FFCC00/https://via\.placeholder\.com/44/FFCC00/000000\?text=MOGA'
-)
-html = dup_pattern.sub(MOGA_PLACEHOLDER, html)
-
-# Pastikan setiap <img> di asset-row punya class profile-slide-asset-icon
-def ensure_icon_class(text: str) -> str:
-    def add_class(tag: str) -> str:
-        if 'class=' in tag:
-            if 'profile-slide-asset-icon' in tag:
-                return tag
-            return re.sub(r'class="([^"]*)"', r'class="\1 profile-slide-asset-icon"', tag, count=1)
-        return tag.replace('<img', '<img class="profile-slide-asset-icon"', 1)
-    def fix_row_imgs(m):
-        row_html = m.group(0)
-        imgs = re.findall(r'<img\b[^>]*>', row_html)
-        fixed = row_html
-        for img in imgs:
-            fixed = fixed.replace(img, add_class(img))
-        return fixed
-    pattern = re.compile(r'<div\s+class="profile-slide-asset-row"[^>]*>.*?</div>', re.DOTALL)
-    return pattern.sub(fix_row_imgs, text)
-
-html = ensure_icon_class(html)
-
-# Tulis kembali
-HTML_FILE.write_text(html, encoding="utf-8")
-print("Selesai ✅: index.html diperbaiki. Backup tersimpan sebagai index.html.bak")
+def fix_text(text: str) -> Tuple[str, int]:
+    """Kembalikan ``(teks_baru, jumlah_perbaikan)``."""
+    out: List[str] = []
+    pos = 0
+    count = 0
+    for edit in iter_fixes(text):
+        out.append(text[pos:edit.start])
+        out.append(edit.replacement)
+        pos = edit.end
+        count += 1
+    if not count:
+        return text, 0
+    out.append(text[pos:])
+    return "".join(out), count
+
+
+class AssetFix:
+    """Operasi patch_engine: jalankan tokenizer asset sebagai satu patch."""
+    required = False
+    skip_if = None
+
+    def describe(self) -> str:
+        return "asset row <img>/placeholder fixes"
+
+    def locate(self, text: str) -> List[Edit]:
+        return list(iter_fixes(text))
+
+
+PATCHES = [AssetFix()]
+
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def process_file(path: Path, known_clean: str = "", check: bool = False) -> dict:
+    """Perbaiki satu file; dijalankan di proses worker."""
+    t0 = time.perf_counter()
+    if not path.exists():
+        return {"file": str(path), "status": "missing", "rewrites": 0, "ms": 0.0, "sha": ""}
+    html = path.read_text(encoding="utf-8")
+    digest = sha256(html)
+    if digest == known_clean:
+        return {"file": str(path), "status": "unchanged", "rewrites": 0,
+                "ms": (time.perf_counter() - t0) * 1000, "sha": digest}
+
+    new_html, count = fix_text(html)
+    status = "clean"
+    if count:
+        status = "would fix" if check else "fixed"
+        if check:
+            digest = ""
+        else:
+            # Backup hanya kalau memang ada perubahan
+            shutil.copy2(path, path.with_name(path.name + ".bak"))
+            path.write_text(new_html, encoding="utf-8")
+            digest = sha256(new_html)
+    return {"file": str(path), "status": status, "rewrites": count,
+            "ms": (time.perf_counter() - t0) * 1000, "sha": digest}
+
+
+def _load_state() -> dict:
+    try:
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state: dict) -> None:
+    try:
+        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        STATE_FILE.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    except OSError as err:
+        print(f"[fix_assets] Cache hash tidak tersimpan: {err}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Perbaiki tag <img> & URL icon di file HTML.")
+    parser.add_argument("files", nargs="*", type=Path, default=HTML_FILES)
+    parser.add_argument("--jobs", type=int, default=0,
+                        help="jumlah proses paralel (default: satu per file)")
+    parser.add_argument("--check", action="store_true", help="laporan saja, tidak menulis")
+    parser.add_argument("--force", action="store_true", help="abaikan cache hash")
+    args = parser.parse_args(argv)
+
+    state = {} if args.force else _load_state()
+    keys = [str(p.resolve()) for p in args.files]
+    known = [state.get(k, "") for k in keys]
+    jobs = args.jobs or len(args.files)
+    t0 = time.perf_counter()
+    if jobs > 1 and len(args.files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(process_file, args.files, known,
+                                    [args.check] * len(args.files)))
+    else:
+        results = [process_file(p, k, args.check) for p, k in zip(args.files, known)]
+    total_ms = (time.perf_counter() - t0) * 1000
+
+    for key, r in zip(keys, results):
+        print(f"  {r['file']:<32} {r['status']:<10} {r['rewrites']:>4} perbaikan {r['ms']:8.1f} ms")
+        if r["sha"]:
+            state[key] = r["sha"]
+    if not args.check:
+        _save_state(state)
+    fixed = sum(r["rewrites"] for r in results)
+    print(f"Selesai ✅: {fixed} perbaikan di {len(results)} file ({total_ms:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
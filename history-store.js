@@ -0,0 +1,234 @@
+/**
+ * Mogaland – append-only transaction / trade history in IndexedDB
+ *
+ * Loaded by index.html and game.html as a plain script (global
+ * `HistoryStore`).  Replaces the per-user localStorage JSON blobs, which
+ * were re-serialized in full on every new entry and re-parsed every time a
+ * history panel opened.
+ *
+ * Database 'mogaland-history', one object store per log:
+ *   tx      – wallet activity of index.html (recordTransaction)
+ *   gameTx  – on-chain payments / rewards of game.html (saveTxRecord)
+ *   trades  – closed futures trades of the market section
+ * Records get an auto-increment `id` and carry `address`, `networkId`,
+ * `type` and `timestamp`; every store has the indexes
+ *   byAddress  [address, timestamp]
+ *   byNetwork  [address, networkId, timestamp]
+ *   byType     [address, type, timestamp]
+ * so a network or type tab is an index range, not a scan.
+ *
+ * page() walks an index newest-first with a cursor and returns `limit`
+ * records plus a `next` token ({ timestamp, id }) for the following page.
+ * There is no entry cap.  migrate() imports a legacy localStorage array
+ * once per key.  Without IndexedDB (private mode, old browsers) records
+ * are kept in memory for the session.
+ */
+
+(function (root) {
+  'use strict';
+
+  const DB_NAME = 'mogaland-history';
+  const DB_VERSION = 1;
+  const STORES = ['tx', 'gameTx', 'trades'];
+  const MIGRATED_PREFIX = 'historyMigrated_';
+
+  let dbPromise = null;
+  const memory = Object.fromEntries(STORES.map(s => [s, []]));
+  let memoryId = 0;
+
+  function open() {
+    if (!dbPromise) {
+      dbPromise = new Promise((resolve) => {
+        if (typeof indexedDB === 'undefined') return resolve(null);
+        const req = indexedDB.open(DB_NAME, DB_VERSION);
+        req.onupgradeneeded = () => {
+          const db = req.result;
+          STORES.forEach(name => {
+            if (db.objectStoreNames.contains(name)) return;
+            const os = db.createObjectStore(name, { keyPath: 'id', autoIncrement: true });
+            os.createIndex('byAddress', ['address', 'timestamp']);
+            os.createIndex('byNetwork', ['address', 'networkId', 'timestamp']);
+            os.createIndex('byType', ['address', 'type', 'timestamp']);
+          });
+        };
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => {
+          console.log('[History] IndexedDB unavailable, history kept in memory:', req.error);
+          resolve(null);
+        };
+      });
+    }
+    return dbPromise;
+  }
+
+  function normalize(record) {
+    return {
+      ...record,
+      address: String(record.address || '').toLowerCase(),
+      networkId: record.networkId || '',
+      type: record.type || '',
+      timestamp: typeof record.timestamp === 'number' ? record.timestamp : Date.now(),
+    };
+  }
+
+  /**
+   * Append records to `store` in one transaction.  Resolves with the
+   * records (ids assigned) once it commits; rejects if it fails (quota,
+   * constraint), in which case none of the records were stored.
+   */
+  async function append(store, records) {
+    const list = (Array.isArray(records) ? records : [records]).map(normalize);
+    if (!list.length) return list;
+    const db = await open();
+    if (!db) {
+      list.forEach(r => { r.id = ++memoryId; memory[store].push(r); });
+      return list;
+    }
+    return new Promise((resolve, reject) => {
+      const tx = db.transaction(store, 'readwrite');
+      const os = tx.objectStore(store);
+      list.forEach(r => { os.add(r).onsuccess = (e) => { r.id = e.target.result; }; });
+      tx.oncomplete = () => resolve(list);
+      tx.onerror = tx.onabort = () => {
+        console.warn('[History] Append failed:', tx.error);
+        reject(tx.error || new Error('IndexedDB transaction aborted'));
+      };
+    });
+  }
+
+  // Index name and key prefix for a query
+  function indexFor(query) {
+    const address = String(query.address || '').toLowerCase();
+    if (query.networkId) return ['byNetwork', [address, query.networkId]];
+    if (query.type) return ['byType', [address, query.type]];
+    return ['byAddress', [address]];
+  }
+
+  // Newer than the `next` token of the previous page?
+  function beforeToken(record, before) {
+    return !before || record.timestamp < before.timestamp ||
+      (record.timestamp === before.timestamp && record.id < before.id);
+  }
+
+  /**
+   * One page of `store`, newest first.
+   *   query: { address, networkId?, type?, before?, limit? }
+   * Resolves { items, next } – pass `next` as `before` for the following
+   * page; next is null on the last page.
+   */
+  async function page(store, query = {}) {
+    const limit = query.limit || 50;
+    const before = query.before || null;
+    const [indexName, prefix] = indexFor(query);
+    const db = await open();
+    if (!db) {
+      const items = memory[store]
+        .filter(r => r.address === prefix[0]
+          && (!query.networkId || r.networkId === query.networkId)
+          && (query.networkId || !query.type || r.type === query.type)
+          && beforeToken(r, before))
+        .sort((a, b) => b.timestamp - a.timestamp || b.id - a.id);
+      const pageItems = items.slice(0, limit);
+      return { items: pageItems, next: items.length > limit ? tokenOf(pageItems[pageItems.length - 1]) : null };
+    }
+    const upper = before ? before.timestamp : Infinity;
+    const range = IDBKeyRange.bound([...prefix, -Infinity], [...prefix, upper]);
+    return new Promise((resolve) => {
+      const items = [];
+      let more = false;
+      const tx = db.transaction(store, 'readonly');
+      const req = tx.objectStore(store).index(indexName).openCursor(range, 'prev');
+      req.onsuccess = () => {
+        const cursor = req.result;
+        if (!cursor) return;
+        const r = cursor.value;
+        if (!beforeToken(r, before)) return cursor.continue();
+        if (items.length === limit) { more = true; return; }
+        items.push(r);
+        cursor.continue();
+      };
+      tx.oncomplete = () => resolve({ items, next: more ? tokenOf(items[items.length - 1]) : null });
+      tx.onerror = tx.onabort = () => resolve({ items, next: null });
+    });
+  }
+
+  function tokenOf(record) {
+    return record ? { timestamp: record.timestamp, id: record.id } : null;
+  }
+
+  // Every record of `query` (no limit), newest first.
+  async function all(store, query = {}) {
+    return (await page(store, { ...query, limit: Infinity })).items;
+  }
+
+  async function clear(store, address) {
+    const addr = String(address || '').toLowerCase();
+    const db = await open();
+    if (!db) {
+      memory[store] = memory[store].filter(r => r.address !== addr);
+      return;
+    }
+    return new Promise((resolve) => {
+      const tx = db.transaction(store, 'readwrite');
+      const req = tx.objectStore(store).index('byAddress')
+        .openCursor(IDBKeyRange.bound([addr, -Infinity], [addr, Infinity]));
+      req.onsuccess = () => {
+        const cursor = req.result;
+        if (!cursor) return;
+        cursor.delete();
+        cursor.continue();
+      };
+      tx.oncomplete = tx.onerror = tx.onabort = () => resolve();
+    });
+  }
+
+  /**
+   * Import the JSON array stored under `localStorage[key]` into `store`
+   * once.  `toRecord(entry)` maps a legacy entry (null skips it).  With
+   * `keep` the localStorage copy stays (e.g. it is cloud-synced), otherwise
+   * it is removed after the import.  Only a committed import marks the key
+   * as migrated; after a failed one the legacy copy is left untouched and
+   * the next call tries again.  Resolves with the number of imported
+   * records (0 on failure).
+   */
+  const migrations = new Map();
+  function migrate(store, key, toRecord, keep = false) {
+    if (!migrations.has(key)) {
+      migrations.set(key, (async () => {
+        let raw = null;
+        try {
+          if (localStorage.getItem(MIGRATED_PREFIX + key)) return 0;
+          raw = localStorage.getItem(key);
+        } catch (_) { return 0; }
+        let entries = [];
+        try {
+          const parsed = raw ? JSON.parse(raw) : [];
+          if (Array.isArray(parsed)) entries = parsed;
+        } catch (e) {
+          console.warn('[History] Legacy history unreadable:', key, e);
+        }
+        // Legacy arrays are newest-first or oldest-first; ids follow time order
+        const records = entries.map(toRecord).filter(Boolean).sort((a, b) => a.timestamp - b.timestamp);
+        const db = await open();
+        if (records.length) {
+          try {
+            await append(store, records);
+          } catch (e) {
+            console.warn('[History] Import failed, legacy history kept:', key, e);
+            migrations.delete(key);
+            return 0;
+          }
+        }
+        if (!db) return records.length;      // in-memory only: import again next session
+        try {
+          localStorage.setItem(MIGRATED_PREFIX + key, '1');
+          if (!keep) localStorage.removeItem(key);
+        } catch (_) {}
+        return records.length;
+      })());
+    }
+    return migrations.get(key);
+  }
+
+  root.HistoryStore = { open, append, page, all, clear, migrate };
+})(typeof self !== 'undefined' ? self : this);
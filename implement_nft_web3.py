@@ -1,15 +1,10 @@
 #!/usr/bin/env python3
-import re
+import sys
 
-# Read the file
-with open('index.html', 'r', encoding='utf-8') as f:
-    content = f.read()
+from patch_engine import RegexSub, main
 
 # 1. Add NFT contract configuration and login method tracking after treasury config
-treasury_config_end = content.find('const GAS_FEE_USDC = 0.01; // 0.01 USDC per action')
-if treasury_config_end != -1:
-    insert_pos = content.find('\n', treasury_config_end) + 1
-    nft_config = '''    let treasuryUSDCBalance = 1000000; // 1M USDC starting balance
+NFT_CONFIG = '''    let treasuryUSDCBalance = 1000000; // 1M USDC starting balance
     
     // NFT Contract Configuration (Same as treasury for this implementation)
     const NFT_CONTRACT_ADDRESS = "0xa959f26847211f71A22aDb087EBe50E0743e7D66";
@@ -27,11 +22,9 @@ if treasury_config_end != -1:
     let socialConnected = false;
     
 '''
-    content = content[:insert_pos] + nft_config + content[insert_pos:]
-
 # 2. Update NFT staking variables section
-nft_vars_pattern = r'let stakedNFTs = 0;\s*let nftRewards = 0;\s*let selectedNFTs = new Set\(\);'
-nft_vars_replacement = '''let stakedNFTs = 0;
+NFT_VARS_PATTERN = r'let stakedNFTs = 0;\s*let nftRewards = 0;\s*let selectedNFTs = new Set\(\);'
+NFT_VARS_REPLACEMENT = '''let stakedNFTs = 0;
     let nftRewards = 0;
     let selectedNFTs = new Set();
     let userNFTs = []; // User's actual NFTs from wallet
@@ -45,11 +38,9 @@ nft_vars_replacement = '''let stakedNFTs = 0;
     let stakedNFTsData = []; // [{nftId, apy, stakedTime, rewards}]
     let lastRewardClaim = Date.now();'''
 
-content = re.sub(nft_vars_pattern, nft_vars_replacement, content)
-
 # 3. Update enterDashboard to track login method
-enter_dashboard_pattern = r'function enterDashboard\(method\) \{'
-enter_dashboard_replacement = '''function enterDashboard(method) {
+ENTER_DASHBOARD_PATTERN = r'function enterDashboard\(method\) \{'
+ENTER_DASHBOARD_REPLACEMENT = '''function enterDashboard(method) {
       loginMethod = method.toLowerCase();
       if (method === 'Wallet' || method === 'MetaMask' || method === 'OKX' || method === 'WalletConnect') {
         loginMethod = 'wallet';
@@ -61,10 +52,20 @@ enter_dashboard_replacement = '''function enterDashboard(method) {
       }
       console.log(`[Login] Method: ${loginMethod}, Wallet: ${walletConnected}`);'''
 
-content = re.sub(enter_dashboard_pattern, enter_dashboard_replacement, content)
-
-# Save the modified content
-with open('index.html', 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    RegexSub(r"const GAS_FEE_USDC = 0\.01; // 0\.01 USDC per action.*\n",
+             lambda m: m.group(0) + NFT_CONFIG, count=1,
+             label="NFT contract config after treasury config",
+             skip_if="const NFT_CONTRACT_ADDRESS ="),
+    RegexSub(NFT_VARS_PATTERN, NFT_VARS_REPLACEMENT,
+             label="NFT staking variables", skip_if="let userNFTs = [];"),
+    RegexSub(ENTER_DASHBOARD_PATTERN, ENTER_DASHBOARD_REPLACEMENT,
+             label="enterDashboard login tracking",
+             skip_if="loginMethod = method.toLowerCase();"),
+]
 
-print("Phase 1: Configuration and login tracking added")
+if __name__ == "__main__":
+    status = main([*sys.argv[1:], __file__])
+    if status == 0:
+        print("Phase 1: Configuration and login tracking added")
+    raise SystemExit(status)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+js_index.py
+JS-aware function-span index for the inline <script> blocks of an HTML file.
+
+The inline scripts are tokenized once.  Strings, template literals (including
+nested ``${...}``), regex literals and comments are skipped, so braces inside
+them never unbalance the count.  For every named function and every
+``[else] if (id === '...')`` section branch the index records three absolute
+offsets into the document and the nesting depth:
+
+    start       first character of the declaration (``async`` included)
+    body_open   the ``{`` opening the body
+    body_close  the matching ``}``
+    depth       brace nesting depth of the declaration (0 = top level of its script)
+
+``window.showSection = function(...)`` style assignments are indexed under
+the assigned name.  The index is persisted as JSON under ``.patch-index/``
+keyed by the SHA-256 of the document, so later patch runs look anchors up in
+O(1) instead of rescanning the file.
+
+Usage:
+    python js_index.py index.html
+    python js_index.py index.html --function claimNFTRewards --section nft
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CACHE_DIR = Path(__file__).resolve().parent / ".patch-index"
+CACHE_KEEP = 8          # newest index files kept in CACHE_DIR
+INDEX_VERSION = 3       # bump when the on-disk format or the scanner changes
+
+Span = Tuple[int, int, int, int]
+
+SCRIPT_RE = re.compile(r"<script\b([^>]*)>(.*?)</script\s*>", re.DOTALL | re.IGNORECASE)
+SRC_ATTR_RE = re.compile(r"\bsrc\s*=", re.IGNORECASE)
+
+TOKEN_RE = re.compile(r"""
+      (?P<ws>\s+)
+    | (?P<line_comment>//[^\n]*)
+    | (?P<block_comment>/\*.*?(?:\*/|\Z))
+    | (?P<string>'(?:[^'\\\n]|\\.)*'?|"(?:[^"\\\n]|\\.)*"?)
+    | (?P<ident>[A-Za-z_$][\w$]*)
+    | (?P<number>\.?\d[\w.]*)
+    | (?P<punct>=>|===|!==|==|!=|[{}()\[\];,.`/=]|[^\s\w])
+""", re.VERBOSE | re.DOTALL)
+REGEX_RE = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+TEMPLATE_CHUNK_RE = re.compile(r"(?:[^`\\$]|\\.|\$(?!\{))*", re.DOTALL)
+FUNCTION_NAME_RE = re.compile(r"\s*\*?\s*([A-Za-z_$][\w$]*)?")
+SECTION_RE = re.compile(r"(?:else\s+)?if\s*\(\s*id\s*===\s*'([^'\\]+)'\s*\)\s*\Z")
+
+# After these tokens a '/' starts a regex literal rather than a division.
+REGEX_AFTER_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+REGEX_AFTER_PUNCT = set("(,=:[!&|?{};+-*%<>~^") | {"=>", "===", "!==", "==", "!="}
+
+
+class JSIndex:
+    """Function and section spans of one document, looked up by name."""
+
+    def __init__(self, sha: str, functions: Dict[str, List[Span]],
+                 sections: Dict[str, List[Span]]):
+        self.sha = sha
+        self.functions = functions
+        self.sections = sections
+
+    def function(self, name: str) -> Optional[Span]:
+        spans = self.functions.get(name)
+        return tuple(spans[0]) if spans else None
+
+    def section(self, name: str) -> Optional[Span]:
+        spans = self.sections.get(name)
+        return tuple(spans[0]) if spans else None
+
+    def to_json(self) -> dict:
+        return {"version": INDEX_VERSION, "sha": self.sha,
+                "functions": self.functions, "sections": self.sections}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "JSIndex":
+        return cls(data["sha"], data["functions"], data["sections"])
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def inline_scripts(html: str) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` offsets of every inline <script> body."""
+    for m in SCRIPT_RE.finditer(html):
+        if not SRC_ATTR_RE.search(m.group(1)):
+            yield m.start(2), m.end(2)
+
+
+def iter_tokens(text: str, lo: int = 0, hi: Optional[int] = None) -> Iterator[Tuple[str, int, int]]:
+    """Yield ``(kind, start, end)`` for every JavaScript token in ``text[lo:hi]``.
+
+    ``kind`` is one of ws, line_comment, block_comment, string, template,
+    regex, ident, number or punct.  A template literal is yielded as one
+    ``template`` chunk per literal run: from the opening backtick (or the
+    ``}`` closing an interpolation) up to and including the next ``${`` or the
+    closing backtick, so the code inside ``${...}`` is tokenized normally.
+    """
+    hi = len(text) if hi is None else hi
+    template_depths: List[int] = []   # brace depth at each open ``${``
+    depth = 0
+    prev = None                        # previous significant token text
+    pos = lo
+    while pos < hi:
+        ch = text[pos]
+        if ch == "/" and (prev is None or prev in REGEX_AFTER_PUNCT
+                          or prev in REGEX_AFTER_KEYWORDS):
+            m = REGEX_RE.match(text, pos, hi)
+            if m and not text.startswith(("//", "/*"), pos):
+                yield "regex", pos, m.end()
+                prev = "/re/"
+                pos = m.end()
+                continue
+        if ch == "`" or (ch == "}" and template_depths and template_depths[-1] == depth):
+            if ch == "}":
+                template_depths.pop()
+            end = TEMPLATE_CHUNK_RE.match(text, pos + 1, hi).end()
+            if text.startswith("${", end):
+                template_depths.append(depth)
+                end += 2
+            else:
+                end = min(end + 1, hi)     # closing backtick (or end of script)
+            yield "template", pos, end
+            prev = "`tpl`"
+            pos = end
+            continue
+        m = TOKEN_RE.match(text, pos, hi)
+        kind = m.lastgroup
+        end = m.end()
+        if kind not in ("ws", "line_comment", "block_comment"):
+            prev = m.group()
+            if prev == "{":
+                depth += 1
+            elif prev == "}":
+                depth -= 1
+        yield kind, pos, end
+        pos = end
+
+
+def _scan(text: str, lo: int, hi: int, functions: Dict[str, List[Span]],
+          sections: Dict[str, List[Span]]) -> None:
+    """Tokenize ``text[lo:hi]`` as JavaScript and record brace-matched spans."""
+    # Each frame: (kind, name, start, body_open); kind is 'fn', 'section' or 'block'.
+    stack: List[Tuple[str, Optional[str], int, int]] = []
+    prev = None            # previous significant token text
+    prev2 = None           # the one before it
+    prev3 = None
+    pending = None         # [name, start, paren_depth, params_done]
+    paren_depth = 0
+
+    for kind, start, end in iter_tokens(text, lo, hi):
+        if kind in ("ws", "line_comment", "block_comment"):
+            continue
+        tok = "`tpl`" if kind == "template" else text[start:end]
+
+        if kind == "ident" and tok == "function":
+            nm = FUNCTION_NAME_RE.match(text, end, hi)
+            name = nm.group(1)
+            decl = start
+            if prev == "async":
+                decl = text.rfind("async", lo, start)
+            target = prev3 if prev == "async" and prev2 == "=" else prev2 if prev == "=" else None
+            if name is None and target and re.match(r"[A-Za-z_$]", target):
+                # ``window.name = [async] function(...)`` / ``const name = function(...)``
+                name = target
+                line_start = text.rfind("\n", lo, start) + 1
+                decl = line_start + len(text[line_start:start]) - len(text[line_start:start].lstrip())
+            if name:
+                pending = [name, decl, paren_depth, False]
+        elif tok == "(":
+            paren_depth += 1
+        elif tok == ")":
+            paren_depth -= 1
+            if pending and paren_depth == pending[2]:
+                pending[3] = True
+        elif tok == "{":
+            if pending and pending[3] and paren_depth == pending[2]:
+                stack.append(("fn", pending[0], pending[1], start))
+                pending = None
+            else:
+                sm = SECTION_RE.search(text, max(lo, start - 80), start)
+                if sm:
+                    stack.append(("section", sm.group(1), sm.start(), start))
+                else:
+                    stack.append(("block", None, start, start))
+        elif tok == "}":
+            if stack:
+                frame_kind, name, decl, body_open = stack.pop()
+                if frame_kind == "fn":
+                    functions.setdefault(name, []).append((decl, body_open, start, len(stack)))
+                elif frame_kind == "section":
+                    sections.setdefault(name, []).append((decl, body_open, start, len(stack)))
+        prev3, prev2, prev = prev2, prev, tok
+
+
+def build_index(html: str, sha: Optional[str] = None) -> JSIndex:
+    """Tokenize every inline script of ``html`` and return its index."""
+    functions: Dict[str, List[Span]] = {}
+    sections: Dict[str, List[Span]] = {}
+    for lo, hi in inline_scripts(html):
+        _scan(html, lo, hi, functions, sections)
+    return JSIndex(sha or content_hash(html), functions, sections)
+
+
+_memo: Dict[str, JSIndex] = {}
+
+
+def index_for(html: str, cache_dir: Optional[Path] = CACHE_DIR) -> JSIndex:
+    """Return the index of ``html``: from memory, from disk, or freshly built."""
+    sha = content_hash(html)
+    if sha in _memo:
+        return _memo[sha]
+    cache_file = cache_dir / f"{sha}.json" if cache_dir else None
+    index = None
+    if cache_file and cache_file.exists():
+        try:
+            data = json.loads(cache_file.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION and data.get("sha") == sha:
+                index = JSIndex.from_json(data)
+        except (OSError, ValueError, KeyError):
+            index = None
+    if index is None:
+        index = build_index(html, sha)
+        if cache_file:
+            _save(index, cache_file)
+    _memo[sha] = index
+    return index
+
+
+def _save(index: JSIndex, cache_file: Path) -> None:
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(json.dumps(index.to_json()), encoding="utf-8")
+        stale = sorted((p for p in cache_file.parent.glob("*.json") if len(p.stem) == 64),
+                       key=lambda p: p.stat().st_mtime)
+        for old in stale[:-CACHE_KEEP]:
+            old.unlink()
+    except OSError as err:
+        print(f"[js_index] Cache not written: {err}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Index function spans of inline scripts.")
+    parser.add_argument("file", type=Path, nargs="?", default=Path("index.html"))
+    parser.add_argument("--function", action="append", default=[], help="print span of function")
+    parser.add_argument("--section", action="append", default=[], help="print span of section")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the on-disk cache")
+    args = parser.parse_args(argv)
+
+    html = args.file.read_text(encoding="utf-8")
+    t0 = time.perf_counter()
+    index = build_index(html) if args.rebuild else index_for(html)
+    elapsed = time.perf_counter() - t0
+    print(f"{args.file}: {len(index.functions)} functions, {len(index.sections)} sections "
+          f"({elapsed * 1000:.1f} ms, sha {index.sha[:12]})")
+
+    for kind, names, lookup in (("function", args.function, index.function),
+                                ("section", args.section, index.section)):
+        for name in names:
+            span = lookup(name)
+            if span is None:
+                print(f"  {kind} {name}: not found")
+                continue
+            line = html.count("\n", 0, span[0]) + 1
+            end_line = html.count("\n", 0, span[2]) + 1
+            print(f"  {kind} {name}: lines {line}-{end_line} offsets {span}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,279 @@
+/**
+ * Mogaland – price-indexed liquidation engine
+ *
+ * Loaded by index.html as a plain script (global `LiquidationEngine`) and
+ * usable from Node (`module.exports`).
+ *
+ * A position's equity is  100 + dir × (price / entry − 1) × leverage × 100  %
+ * (dir = +1 long, −1 short), the same formula as calculatePositionEquity in
+ * index.html.  Equity is monotonic in price, so every position has a fixed
+ * liquidation price (equity = liquidationPct) and warning price
+ * (equity = warningPct), computed once when the position is added.
+ *
+ * Per symbol the engine keeps four sorted books:
+ *   longs  – falling prices cross them: sorted by threshold, highest first
+ *   shorts – rising prices cross them:  sorted by threshold, lowest first
+ * (one pair for liquidation, one for warnings).  tick(symbol, price) pops
+ * entries from the front of each book while they are crossed, so a tick
+ * costs O(log n) + O(crossings) instead of a scan over every position.
+ * The pop re-checks the exact equity formula, so the result is identical to
+ * a full scan with `equity <= liquidationPct`.
+ *
+ * Deterministic replay (Node):
+ *   node liquidation-engine.js                 # seeded synthetic tick tape
+ *   node liquidation-engine.js ticks.json      # { positions: [...], ticks: [[symbol, price], ...] }
+ * replays the tape through the engine and through a full scan and exits
+ * non-zero if the liquidation sequences (tick, position) differ.
+ */
+
+(function (root) {
+  'use strict';
+
+  function equityPercent(position, price) {
+    if (!position.entryPrice) return 100;
+    const pnl = (price - position.entryPrice) / position.entryPrice * position.leverage;
+    return 100 + (position.type === 'long' ? pnl : -pnl) * 100;
+  }
+
+  // Price at which `position` reaches `pct` % equity (null: never, e.g. no entry).
+  function thresholdPrice(position, pct) {
+    if (!position.entryPrice || !position.leverage) return null;
+    const move = (100 - pct) / 100 / position.leverage;
+    return position.entryPrice * (position.type === 'long' ? 1 - move : 1 + move);
+  }
+
+  // Index of the first entry that sorts after `price` (`desc`: highest first).
+  function insertionIndex(book, price, desc) {
+    let lo = 0, hi = book.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (desc ? book[mid].price >= price : book[mid].price <= price) lo = mid + 1;
+      else hi = mid;
+    }
+    return lo;
+  }
+
+  class LiquidationEngine {
+    /**
+     * options: { liquidationPct, warningPct, onLiquidate(position, price, equity),
+     *            onWarning(position, price, equity) }
+     */
+    constructor(options = {}) {
+      this.liquidationPct = options.liquidationPct ?? 15;
+      this.warningPct = options.warningPct ?? 30;
+      this.onLiquidate = options.onLiquidate || (() => {});
+      this.onWarning = options.onWarning || (() => {});
+      this.books = new Map();        // symbol → { liqLong, liqShort, warnLong, warnShort }
+      this.entries = new Map();      // position → { symbol, liq, warn }
+      this.stats = { ticks: 0, crossings: 0, liquidations: 0, warnings: 0 };
+    }
+
+    static symbolOf(position) {
+      return position.asset && position.asset.symbol;
+    }
+
+    book(symbol) {
+      let b = this.books.get(symbol);
+      if (!b) {
+        b = { liqLong: [], liqShort: [], warnLong: [], warnShort: [] };
+        this.books.set(symbol, b);
+      }
+      return b;
+    }
+
+    get size() {
+      return this.entries.size;
+    }
+
+    add(position) {
+      if (this.entries.has(position) || position.isSportsBet) return;
+      const symbol = LiquidationEngine.symbolOf(position);
+      const liqPrice = thresholdPrice(position, this.liquidationPct);
+      if (!symbol || liqPrice === null) return;
+      const b = this.book(symbol);
+      const long = position.type === 'long';
+      const liq = { price: liqPrice, position };
+      const liqBook = long ? b.liqLong : b.liqShort;
+      liqBook.splice(insertionIndex(liqBook, liqPrice, long), 0, liq);
+      let warn = null;
+      const warnPrice = thresholdPrice(position, this.warningPct);
+      if (warnPrice !== null && this.warningPct > this.liquidationPct) {
+        warn = { price: warnPrice, position };
+        const warnBook = long ? b.warnLong : b.warnShort;
+        warnBook.splice(insertionIndex(warnBook, warnPrice, long), 0, warn);
+      }
+      this.entries.set(position, { symbol, liq, warn });
+    }
+
+    remove(position) {
+      const e = this.entries.get(position);
+      if (!e) return;
+      this.entries.delete(position);
+      const b = this.books.get(e.symbol);
+      const long = position.type === 'long';
+      [[long ? b.liqLong : b.liqShort, e.liq], [long ? b.warnLong : b.warnShort, e.warn]].forEach(([book, entry]) => {
+        if (!entry) return;
+        const i = book.indexOf(entry);
+        if (i !== -1) book.splice(i, 1);
+      });
+      if (!b.liqLong.length && !b.liqShort.length && !b.warnLong.length && !b.warnShort.length) {
+        this.books.delete(e.symbol);
+      }
+    }
+
+    // Make the engine track exactly `positions` (after a reload or bulk change).
+    sync(positions) {
+      const live = new Set(positions);
+      [...this.entries.keys()].forEach(p => { if (!live.has(p)) this.remove(p); });
+      positions.forEach(p => this.add(p));
+    }
+
+    clear() {
+      this.books.clear();
+      this.entries.clear();
+    }
+
+    // Splice off and return the crossed front of `book` (`book` itself when none).
+    _popCrossed(book, price, pct) {
+      let n = 0;
+      while (n < book.length && equityPercent(book[n].position, price) <= pct) n++;
+      return n ? book.splice(0, n) : book;
+    }
+
+    /**
+     * Feed one price for `symbol`.  Fires onWarning / onLiquidate for every
+     * crossed position and returns { liquidated: [...], warned: [...] }.
+     */
+    tick(symbol, price) {
+      this.stats.ticks++;
+      const out = { liquidated: [], warned: [] };
+      const b = this.books.get(symbol);
+      if (!b || !(price > 0)) return out;
+      for (const book of [b.warnLong, b.warnShort]) {
+        const crossed = this._popCrossed(book, price, this.warningPct);
+        if (crossed === book) continue;
+        crossed.forEach(entry => {
+          const e = this.entries.get(entry.position);
+          if (e) e.warn = null;
+          out.warned.push(entry.position);
+        });
+      }
+      for (const book of [b.liqLong, b.liqShort]) {
+        const crossed = this._popCrossed(book, price, this.liquidationPct);
+        if (crossed === book) continue;
+        crossed.forEach(entry => {
+          // Already spliced from its book; remove() drops the warning entry
+          this.entries.get(entry.position).liq = null;
+          this.remove(entry.position);
+          out.liquidated.push(entry.position);
+        });
+      }
+      // Warnings for positions liquidated by the same tick are not reported
+      const gone = new Set(out.liquidated);
+      out.warned = out.warned.filter(p => !gone.has(p));
+      this.stats.crossings += out.warned.length + out.liquidated.length;
+      this.stats.warnings += out.warned.length;
+      this.stats.liquidations += out.liquidated.length;
+      out.warned.forEach(p => this.onWarning(p, price, equityPercent(p, price)));
+      out.liquidated.forEach(p => this.onLiquidate(p, price, equityPercent(p, price)));
+      return out;
+    }
+  }
+
+  LiquidationEngine.equityPercent = equityPercent;
+  LiquidationEngine.thresholdPrice = thresholdPrice;
+
+  // ── Deterministic replay ──────────────────────────────────────────────────
+
+  function mulberry32(seed) {
+    return function () {
+      seed |= 0; seed = seed + 0x6D2B79F5 | 0;
+      let t = Math.imul(seed ^ seed >>> 15, 1 | seed);
+      t = t + Math.imul(t ^ t >>> 7, 61 | t) ^ t;
+      return ((t ^ t >>> 14) >>> 0) / 4294967296;
+    };
+  }
+
+  // Seeded tape: random-walk ticks over a few symbols and positions opened near them.
+  function syntheticTape(seed = 42, symbols = 6, positions = 2000, ticks = 50000) {
+    const rand = mulberry32(seed);
+    const names = Array.from({ length: symbols }, (_, i) => `SYM${i}USD`);
+    const prices = names.map(() => 10 + rand() * 1000);
+    const tape = { positions: [], ticks: [] };
+    for (let i = 0; i < positions; i++) {
+      const s = Math.floor(rand() * symbols);
+      tape.positions.push({
+        id: i,
+        asset: { symbol: names[s] },
+        type: rand() < 0.5 ? 'long' : 'short',
+        leverage: [2, 5, 10, 20, 50, 100][Math.floor(rand() * 6)],
+        amount: 10 + Math.floor(rand() * 990),
+        entryPrice: prices[s] * (0.97 + rand() * 0.06),
+      });
+    }
+    for (let i = 0; i < ticks; i++) {
+      const s = Math.floor(rand() * symbols);
+      prices[s] *= 1 + (rand() - 0.5) * 0.004;
+      tape.ticks.push([names[s], prices[s]]);
+    }
+    return tape;
+  }
+
+  // Replay `tape` through the engine and through a full scan; returns both
+  // liquidation sequences as "tickIndex:positionId" strings plus timings.
+  function replay(tape, liquidationPct = 15, warningPct = 30) {
+    const now = () => (typeof performance !== 'undefined' ? performance.now() : Date.now());
+
+    const engineSeq = [];
+    let tickIndex = 0;
+    const engine = new LiquidationEngine({
+      liquidationPct, warningPct,
+      onLiquidate: (p) => engineSeq.push(`${tickIndex}:${p.id}`),
+    });
+    let t0 = now();
+    engine.sync(tape.positions);
+    tape.ticks.forEach(([symbol, price], i) => { tickIndex = i; engine.tick(symbol, price); });
+    const engineMs = now() - t0;
+
+    const scanSeq = [];
+    let open = tape.positions.slice();
+    t0 = now();
+    tape.ticks.forEach(([symbol, price], i) => {
+      open = open.filter(p => {
+        if (p.asset.symbol !== symbol || equityPercent(p, price) > liquidationPct) return true;
+        scanSeq.push(`${i}:${p.id}`);
+        return false;
+      });
+    });
+    const scanMs = now() - t0;
+    // Within one tick the order of liquidations is not significant
+    const order = (a, b) => {
+      const [ta, ia] = a.split(':').map(Number), [tb, ib] = b.split(':').map(Number);
+      return ta - tb || ia - ib;
+    };
+    engineSeq.sort(order);
+    scanSeq.sort(order);
+    return { engineSeq, scanSeq, engineMs, scanMs, stats: engine.stats };
+  }
+
+  LiquidationEngine.syntheticTape = syntheticTape;
+  LiquidationEngine.replay = replay;
+
+  if (typeof module !== 'undefined' && module.exports) {
+    module.exports = LiquidationEngine;
+    if (typeof require !== 'undefined' && require.main === module) {
+      const file = process.argv[2];
+      const tape = file ? JSON.parse(require('fs').readFileSync(file, 'utf8')) : syntheticTape();
+      const r = replay(tape);
+      const same = r.engineSeq.length === r.scanSeq.length && r.engineSeq.every((x, i) => x === r.scanSeq[i]);
+      console.log(`${tape.positions.length} positions, ${tape.ticks.length} ticks → ` +
+        `${r.engineSeq.length} liquidations (full scan: ${r.scanSeq.length})`);
+      console.log(`engine ${r.engineMs.toFixed(1)} ms, full scan ${r.scanMs.toFixed(1)} ms, ` +
+        `${r.stats.crossings} crossings`);
+      console.log(same ? 'replay OK: identical liquidation sequence' : 'replay MISMATCH');
+      process.exitCode = same ? 0 : 1;
+    }
+  } else {
+    root.LiquidationEngine = LiquidationEngine;
+  }
+})(typeof self !== 'undefined' ? self : this);
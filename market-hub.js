@@ -0,0 +1,414 @@
+/**
+ * Mogaland – shared market-data hub (SharedWorker)
+ *
+ * Served as /market-hub.js and started by every page with
+ * `new SharedWorker('/market-hub.js')`, so all open tabs of the site share
+ * one instance.  The hub keeps ONE multiplexed WebSocket per exchange and
+ * reference-counts stream subscriptions across tabs: the socket subscribes
+ * to a stream when its first reference appears and unsubscribes when the
+ * last one goes away.  Every message is fanned out once to each tab holding
+ * a reference.
+ *
+ * When a socket drops, the hub polls the exchange REST API for the
+ * subscribed streams (POLL_MS) and reconnects with jittered exponential
+ * back-off.  Polled payloads have the same shape as socket payloads, so
+ * pages never see the difference.  Browsers without SharedWorker may run
+ * this file as a dedicated Worker; it then serves a single tab.
+ *
+ * Page → hub
+ *   { type: 'sub',   exchange, stream }   add one reference
+ *   { type: 'unsub', exchange, stream }   drop one reference
+ *   { type: 'stats', id }                 reply { type: 'stats', id, stats }
+ *   { type: 'ping' }                      liveness, every PORT_PING_MS; reply { type: 'pong' }
+ *   { type: 'bye' }                       tab closing: drop all its references
+ * Hub → page
+ *   { type: 'data',   exchange, stream, payload }
+ *   { type: 'status', exchange, state }   state: connecting | open | polling
+ *   { type: 'reset' }                     tab was timed out: re-send its 'sub's
+ *   { type: 'pong' }                      answer to 'ping' (pages fall back without it)
+ *
+ * Streams use the exchange's own names:
+ *   binance  'btcusdt@aggTrade', 'btcusdt@kline_1m'   (USD-M futures)
+ *   bybit    'kline.1.BTCUSDT', 'tickers.BTCUSDT'      (V5 public linear)
+ * The payload is the Binance stream `data` object / the whole Bybit message.
+ *
+ * The 'rest' exchange has no socket: its topics are REST quotes polled
+ * every REST_POLL_MS, once for all tabs, while any tab holds a reference.
+ *   rest     'yahoo:AAPL'        → { price, prevClose, high, low, volume }
+ *            'coingecko:bitcoin' → { price, change24h }
+ */
+
+const POLL_MS          = 3000;    // REST polling interval while a socket is down
+const REST_POLL_MS     = 5000;    // polling interval of 'rest' topics
+const CORS_PROXY       = 'https://api.allorigins.win/raw?url=';   // as in index.html
+const BACKOFF_MIN_MS   = 1000;
+const BACKOFF_MAX_MS   = 60000;
+const LINGER_MS        = 5000;    // keep an unused socket briefly (tab reloads / navigation)
+const PORT_PING_MS     = 10000;   // pages ping this often…
+const PORT_TIMEOUT_MS  = 35000;   // …and are dropped after this much silence
+const RATE_WINDOW_S    = 10;      // message-rate window (seconds)
+
+const EXCHANGES = {
+  binance: {
+    url: 'wss://fstream.binance.com/stream',
+    subscribe:   (streams, id) => ({ method: 'SUBSCRIBE', params: streams, id }),
+    unsubscribe: (streams, id) => ({ method: 'UNSUBSCRIBE', params: streams, id }),
+    route: (msg) => (msg.stream && msg.data ? [msg.stream, msg.data] : null),
+    poll: pollBinance,
+  },
+  bybit: {
+    url: 'wss://stream.bybit.com/v5/public/linear',
+    subscribe:   (streams) => ({ op: 'subscribe', args: streams }),
+    unsubscribe: (streams) => ({ op: 'unsubscribe', args: streams }),
+    route: (msg) => (msg.topic && msg.data ? [msg.topic, msg] : null),
+    ping: { op: 'ping' },
+    pingMs: 20000,                // Bybit closes sockets without a ping every ~20 s
+    poll: pollBybit,
+  },
+  rest: {
+    pollOnly: true,
+    pollMs: REST_POLL_MS,
+    poll: pollRest,
+  },
+};
+
+const ports = new Set();          // { port, refs: Map<key, count>, lastSeen }
+const feeds = new Map();          // exchange → feed state (see feedFor)
+
+// ── REST polling fallbacks (payloads mimic the socket messages) ─────────────
+
+async function getJson(url) {
+  const res = await fetch(url);
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+  return res.json();
+}
+
+// Direct first, then through the CORS proxy (Yahoo sends no CORS headers)
+async function getJsonCors(url) {
+  try {
+    return await getJson(url);
+  } catch (_) {
+    return getJson(CORS_PROXY + encodeURIComponent(url));
+  }
+}
+
+async function pollRest(stream) {
+  const sep = stream.indexOf(':');
+  const source = stream.slice(0, sep);
+  const id = stream.slice(sep + 1);
+  if (source === 'yahoo') {
+    const j = await getJsonCors(`https://query1.finance.yahoo.com/v8/finance/chart/${encodeURIComponent(id)}?interval=1m&range=1d`);
+    const meta = j && j.chart && j.chart.result && j.chart.result[0] && j.chart.result[0].meta;
+    const price = meta && (meta.regularMarketPrice || meta.price);
+    if (!(price > 0)) return null;
+    return {
+      price,
+      prevClose: meta.previousClose || meta.chartPreviousClose || null,
+      high: meta.regularMarketDayHigh || null,
+      low: meta.regularMarketDayLow || null,
+      volume: meta.regularMarketVolume || null,
+    };
+  }
+  if (source === 'coingecko') {
+    const j = await getJsonCors(`https://api.coingecko.com/api/v3/simple/price?ids=${encodeURIComponent(id)}&vs_currencies=usd&include_24hr_change=true`);
+    const q = j && j[id];
+    return q && q.usd > 0 ? { price: q.usd, change24h: q.usd_24h_change || 0 } : null;
+  }
+  return null;
+}
+
+async function pollBinance(stream) {
+  const [sym, kind] = stream.split('@');
+  const symbol = sym.toUpperCase();
+  if (kind === 'aggTrade') {
+    const t = await getJson(`https://fapi.binance.com/fapi/v1/ticker/price?symbol=${symbol}`);
+    return { e: 'aggTrade', s: symbol, p: t.price, T: t.time || Date.now() };
+  }
+  if (kind && kind.startsWith('kline_')) {
+    const interval = kind.slice('kline_'.length);
+    const rows = await getJson(`https://fapi.binance.com/fapi/v1/klines?symbol=${symbol}&interval=${interval}&limit=1`);
+    const r = rows[rows.length - 1];
+    if (!r) return null;
+    return { e: 'kline', s: symbol, k: { t: r[0], o: r[1], h: r[2], l: r[3], c: r[4], v: r[5], i: interval } };
+  }
+  return null;
+}
+
+async function pollBybit(stream) {
+  const parts = stream.split('.');
+  if (parts[0] === 'kline') {
+    const [, interval, symbol] = parts;
+    const j = await getJson(`https://api.bybit.com/v5/market/kline?category=linear&symbol=${symbol}&interval=${interval}&limit=1`);
+    const r = j.result && j.result.list && j.result.list[0];
+    if (!r) return null;
+    return { topic: stream, data: [{ start: +r[0], open: r[1], high: r[2], low: r[3], close: r[4], volume: r[5], interval }] };
+  }
+  if (parts[0] === 'tickers') {
+    const j = await getJson(`https://api.bybit.com/v5/market/tickers?category=linear&symbol=${parts[1]}`);
+    const t = j.result && j.result.list && j.result.list[0];
+    return t ? { topic: stream, data: t } : null;
+  }
+  return null;
+}
+
+// ── Feed (one socket per exchange) ──────────────────────────────────────────
+
+function feedFor(exchange) {
+  let feed = feeds.get(exchange);
+  if (!feed) {
+    feed = {
+      exchange, cfg: EXCHANGES[exchange],
+      ws: null, state: 'idle', requestId: 0,
+      streams: new Map(),         // stream → { refs, msgs, lastMsgAt, pollErrors }
+      attempts: 0, reconnects: 0, backoffMs: 0,
+      reconnectTimer: null, pollTimer: null, pingTimer: null, lingerTimer: null,
+      msgs: 0, polled: 0, lastMsgAt: 0,
+      buckets: new Array(RATE_WINDOW_S).fill(0), bucketAt: 0,
+    };
+    feeds.set(exchange, feed);
+  }
+  return feed;
+}
+
+function setState(feed, state) {
+  if (feed.state === state) return;
+  feed.state = state;
+  broadcast(feed.exchange, null, { type: 'status', exchange: feed.exchange, state });
+}
+
+function countMessage(feed, stream) {
+  const now = Date.now();
+  const sec = Math.floor(now / 1000);
+  const gap = Math.min(RATE_WINDOW_S, sec - feed.bucketAt);
+  for (let i = 1; i <= gap; i++) feed.buckets[(feed.bucketAt + i) % RATE_WINDOW_S] = 0;
+  feed.bucketAt = sec;
+  feed.buckets[sec % RATE_WINDOW_S]++;
+  feed.msgs++;
+  feed.lastMsgAt = now;
+  const s = feed.streams.get(stream);
+  if (s) { s.msgs++; s.lastMsgAt = now; }
+}
+
+function deliver(feed, stream, payload) {
+  if (!feed.streams.has(stream)) return;   // late message for a dropped stream
+  countMessage(feed, stream);
+  broadcast(feed.exchange, stream, { type: 'data', exchange: feed.exchange, stream, payload });
+}
+
+function send(feed, msg) {
+  if (feed.ws && feed.ws.readyState === 1) feed.ws.send(JSON.stringify(msg));
+}
+
+function connect(feed) {
+  clearTimeout(feed.reconnectTimer);
+  feed.reconnectTimer = null;
+  if (feed.ws || !feed.streams.size) return;
+  if (feed.cfg.pollOnly) {
+    setState(feed, 'polling');
+    startPolling(feed);
+    return;
+  }
+  if (feed.state !== 'polling') setState(feed, 'connecting');
+  let ws;
+  try {
+    ws = new WebSocket(feed.cfg.url);
+  } catch (_) {
+    onSocketDown(feed);
+    return;
+  }
+  feed.ws = ws;
+  ws.onopen = () => {
+    feed.attempts = 0;
+    feed.backoffMs = 0;
+    stopPolling(feed);
+    if (feed.streams.size) send(feed, feed.cfg.subscribe([...feed.streams.keys()], ++feed.requestId));
+    if (feed.cfg.ping) {
+      clearInterval(feed.pingTimer);
+      feed.pingTimer = setInterval(() => send(feed, feed.cfg.ping), feed.cfg.pingMs);
+    }
+    setState(feed, 'open');
+  };
+  ws.onmessage = (event) => {
+    let msg;
+    try { msg = JSON.parse(event.data); } catch (_) { return; }
+    const routed = feed.cfg.route(msg);
+    if (routed) deliver(feed, routed[0], routed[1]);
+  };
+  ws.onerror = () => { try { ws.close(); } catch (_) {} };
+  ws.onclose = () => {
+    if (feed.ws !== ws) return;
+    feed.ws = null;
+    clearInterval(feed.pingTimer);
+    feed.pingTimer = null;
+    onSocketDown(feed);
+  };
+}
+
+// Socket lost (or never opened): poll REST and schedule a jittered reconnect.
+function onSocketDown(feed) {
+  if (!feed.streams.size) { setState(feed, 'idle'); return; }
+  setState(feed, 'polling');
+  startPolling(feed);
+  feed.attempts++;
+  feed.reconnects++;
+  const base = Math.min(BACKOFF_MAX_MS, BACKOFF_MIN_MS * 2 ** (feed.attempts - 1));
+  feed.backoffMs = Math.round(base * (0.5 + Math.random() * 0.5));
+  clearTimeout(feed.reconnectTimer);
+  feed.reconnectTimer = setTimeout(() => connect(feed), feed.backoffMs);
+}
+
+async function pollStream(feed, stream) {
+  const s = feed.streams.get(stream);
+  if (!s) return;
+  try {
+    const payload = await feed.cfg.poll(stream);
+    s.pollErrors = 0;
+    if (payload) { feed.polled++; deliver(feed, stream, payload); }
+  } catch (_) {
+    s.pollErrors++;
+  }
+}
+
+function startPolling(feed) {
+  if (feed.pollTimer) return;
+  const tick = () => Promise.all([...feed.streams.keys()].map(stream => pollStream(feed, stream)));
+  tick();
+  feed.pollTimer = setInterval(tick, feed.cfg.pollMs || POLL_MS);
+}
+
+function stopPolling(feed) {
+  clearInterval(feed.pollTimer);
+  feed.pollTimer = null;
+}
+
+function closeFeed(feed) {
+  stopPolling(feed);
+  clearTimeout(feed.reconnectTimer);
+  clearInterval(feed.pingTimer);
+  feed.reconnectTimer = feed.pingTimer = null;
+  const ws = feed.ws;
+  feed.ws = null;
+  if (ws) { try { ws.close(); } catch (_) {} }
+  feed.attempts = 0;
+  feed.backoffMs = 0;
+  setState(feed, 'idle');
+}
+
+function addStreamRef(exchange, stream) {
+  const feed = feedFor(exchange);
+  clearTimeout(feed.lingerTimer);
+  feed.lingerTimer = null;
+  let s = feed.streams.get(stream);
+  if (s) { s.refs++; return; }
+  feed.streams.set(stream, { refs: 1, msgs: 0, lastMsgAt: 0, pollErrors: 0 });
+  if (feed.state === 'open') send(feed, feed.cfg.subscribe([stream], ++feed.requestId));
+  else if (feed.pollTimer) pollStream(feed, stream);   // first value now, not on the next tick
+  else if (!feed.ws && !feed.reconnectTimer) connect(feed);
+}
+
+function dropStreamRef(exchange, stream) {
+  const feed = feeds.get(exchange);
+  const s = feed && feed.streams.get(stream);
+  if (!s || --s.refs > 0) return;
+  feed.streams.delete(stream);
+  if (feed.cfg.unsubscribe) send(feed, feed.cfg.unsubscribe([stream], ++feed.requestId));
+  if (!feed.streams.size) {
+    clearTimeout(feed.lingerTimer);
+    feed.lingerTimer = setTimeout(() => { if (!feed.streams.size) closeFeed(feed); }, LINGER_MS);
+  }
+}
+
+// ── Ports (one per tab) ─────────────────────────────────────────────────────
+
+function broadcast(exchange, stream, msg) {
+  ports.forEach(rec => {
+    if (stream === null
+        ? [...rec.refs.keys()].some(k => k.startsWith(exchange + '|'))
+        : rec.refs.has(`${exchange}|${stream}`)) {
+      rec.port.postMessage(msg);
+    }
+  });
+}
+
+function dropPort(rec) {
+  if (!ports.delete(rec)) return;
+  rec.refs.forEach((count, key) => {
+    const [exchange, stream] = key.split('|');
+    for (let i = 0; i < count; i++) dropStreamRef(exchange, stream);
+  });
+  rec.refs.clear();
+}
+
+function stats() {
+  const out = { ports: ports.size, exchanges: {} };
+  const sec = Math.floor(Date.now() / 1000);
+  feeds.forEach(feed => {
+    const recent = sec - feed.bucketAt < RATE_WINDOW_S ? feed.buckets.reduce((a, b) => a + b, 0) : 0;
+    out.exchanges[feed.exchange] = {
+      state: feed.state,
+      reconnects: feed.reconnects,
+      attempts: feed.attempts,
+      backoffMs: feed.backoffMs,
+      msgs: feed.msgs,
+      polled: feed.polled,
+      msgPerSec: +(recent / RATE_WINDOW_S).toFixed(2),
+      lastMsgAgoMs: feed.lastMsgAt ? Date.now() - feed.lastMsgAt : null,
+      streams: Object.fromEntries([...feed.streams].map(([stream, s]) =>
+        [stream, { refs: s.refs, msgs: s.msgs, pollErrors: s.pollErrors }])),
+    };
+  });
+  return out;
+}
+
+function addPort(port) {
+  const rec = { port, refs: new Map(), lastSeen: Date.now() };
+  ports.add(rec);
+  port.onmessage = (event) => {
+    const msg = event.data || {};
+    rec.lastSeen = Date.now();
+    if (!ports.has(rec) && msg.type !== 'bye') {
+      // Dropped after a timeout (e.g. a frozen background tab): its
+      // references are gone, so ask the page to subscribe again
+      ports.add(rec);
+      port.postMessage({ type: 'reset' });
+    }
+    const key = `${msg.exchange}|${msg.stream}`;
+    switch (msg.type) {
+      case 'sub':
+        if (!EXCHANGES[msg.exchange] || typeof msg.stream !== 'string') return;
+        rec.refs.set(key, (rec.refs.get(key) || 0) + 1);
+        addStreamRef(msg.exchange, msg.stream);
+        port.postMessage({ type: 'status', exchange: msg.exchange, state: feedFor(msg.exchange).state });
+        break;
+      case 'unsub': {
+        const count = rec.refs.get(key);
+        if (!count) return;
+        if (count > 1) rec.refs.set(key, count - 1); else rec.refs.delete(key);
+        dropStreamRef(msg.exchange, msg.stream);
+        break;
+      }
+      case 'ping':
+        port.postMessage({ type: 'pong' });
+        break;
+      case 'stats':
+        port.postMessage({ type: 'stats', id: msg.id, stats: stats() });
+        break;
+      case 'bye':
+        dropPort(rec);
+        break;
+    }
+  };
+  if (port.start) port.start();
+}
+
+// Tabs that vanish without 'bye' (crash, mobile kill) stop pinging.
+setInterval(() => {
+  const cutoff = Date.now() - PORT_TIMEOUT_MS;
+  [...ports].forEach(rec => { if (rec.lastSeen < cutoff) dropPort(rec); });
+}, PORT_PING_MS);
+
+if (typeof SharedWorkerGlobalScope !== 'undefined' && self instanceof SharedWorkerGlobalScope) {
+  self.onconnect = (event) => addPort(event.ports[0]);
+} else {
+  addPort(self);   // dedicated Worker: the page talks to the global scope directly
+}
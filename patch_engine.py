@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+patch_engine.py
+Shared single-pass patch engine for the index.html patch scripts.
+
+Every script (add_nft_functions.py, implement_nft_web3.py, update_nft_section.py,
+fix_assets_html.py) declares a module-level ``PATCHES`` list of operations
+instead of reading and rewriting index.html itself.  The engine loads the
+document once, locates every operation against that one copy, splices all
+resulting edits in a single pass and writes the file once.  Function and
+showSection-branch anchors are resolved through the cached JS-aware index in
+js_index.py, so braces inside strings, templates and regexes are ignored.
+
+Usage:
+    python patch_engine.py add_nft_functions update_nft_section
+    python patch_engine.py --check implement_nft_web3 add_nft_functions
+    python patch_engine.py --file game.html fix_assets_html
+
+``--check`` is a dry run: it reports which anchors matched, how many edits
+each operation produced and how long locating it took, without writing.
+"""
+
+import argparse
+import importlib
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+from js_index import index_for
+
+DEFAULT_FILE = Path("index.html")
+
+Repl = Union[str, Callable[["re.Match[str]"], str]]
+
+
+class PatchError(Exception):
+    """Raised when a required anchor is missing or two edits overlap."""
+
+
+@dataclass(frozen=True)
+class Edit:
+    """Replace ``text[start:end]`` with ``replacement``."""
+    start: int
+    end: int
+    replacement: str
+
+
+@dataclass
+class Document:
+    """One in-memory copy of the file being patched."""
+    path: Path
+    text: str
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Document":
+        path = Path(path)
+        if not path.exists():
+            raise SystemExit(f"File {path} not found. Run from the folder that contains it.")
+        return cls(path, path.read_text(encoding="utf-8"))
+
+
+# ── Anchor helpers ────────────────────────────────────────────────────────────
+
+def find_function(text: str, name: str) -> Optional[Tuple[int, int, int, int]]:
+    """Locate function ``name`` via the cached JS-aware index.
+
+    Returns ``(start, body_open, body_close, depth)`` or None when absent.
+    """
+    return index_for(text).function(name)
+
+
+def find_section(text: str, section: str) -> Optional[Tuple[int, int, int, int]]:
+    """Locate the ``else if (id === 'section') {...}`` branch of showSection."""
+    return index_for(text).section(section)
+
+
+def _regions(text: str, within: Optional[str], flags: int) -> List[Tuple[int, int]]:
+    if within is None:
+        return [(0, len(text))]
+    return [m.span() for m in re.finditer(within, text, flags)]
+
+
+# ── Operations ────────────────────────────────────────────────────────────────
+
+@dataclass
+class InsertAfterFunction:
+    """Insert ``code`` right after the closing brace of function ``name``."""
+    name: str
+    code: str
+    required: bool = True
+    skip_if: Optional[str] = None
+
+    def describe(self) -> str:
+        return f"insert after function {self.name}()"
+
+    def locate(self, text: str) -> List[Edit]:
+        span = find_function(text, self.name)
+        if span is None:
+            return []
+        end = span[2] + 1
+        return [Edit(end, end, self.code)]
+
+
+@dataclass
+class ReplaceFunctionBody:
+    """Replace everything between the braces of function ``name``."""
+    name: str
+    body: str
+    required: bool = True
+    skip_if: Optional[str] = None
+
+    def describe(self) -> str:
+        return f"replace body of {self.name}()"
+
+    def locate(self, text: str) -> List[Edit]:
+        span = find_function(text, self.name)
+        if span is None:
+            return []
+        return [Edit(span[1] + 1, span[2], self.body)]
+
+
+@dataclass
+class ReplaceSectionBody:
+    """Replace the body of the ``else if (id === 'section')`` branch."""
+    section: str
+    body: str
+    required: bool = True
+    skip_if: Optional[str] = None
+
+    def describe(self) -> str:
+        return f"replace showSection('{self.section}') branch"
+
+    def locate(self, text: str) -> List[Edit]:
+        span = find_section(text, self.section)
+        if span is None:
+            return []
+        return [Edit(span[1] + 1, span[2], self.body)]
+
+
+@dataclass
+class RegexSub:
+    """``re.sub`` semantics, optionally restricted to regions matching ``within``."""
+    pattern: str
+    repl: Repl
+    count: int = 0
+    flags: int = 0
+    within: Optional[str] = None
+    label: str = ""
+    required: bool = False
+    skip_if: Optional[str] = None
+
+    def describe(self) -> str:
+        return self.label or f"regex {self.pattern[:48]!r}"
+
+    def locate(self, text: str) -> List[Edit]:
+        rx = re.compile(self.pattern, self.flags)
+        edits: List[Edit] = []
+        seen = 0
+        for lo, hi in _regions(text, self.within, self.flags):
+            for m in rx.finditer(text, lo, hi):
+                new = self.repl(m) if callable(self.repl) else m.expand(self.repl)
+                if new != m.group(0):
+                    edits.append(Edit(m.start(), m.end(), new))
+                seen += 1
+                if self.count and seen >= self.count:
+                    return edits
+        return edits
+
+
+@dataclass
+class AttributeFix:
+    """Fix one attribute on every ``<tag>`` (optionally only inside ``within``).
+
+    ``fix`` receives the current attribute value (None when absent) and
+    returns the new value, or None to leave the tag untouched.
+    """
+    tag: str
+    attr: str
+    fix: Callable[[Optional[str]], Optional[str]]
+    within: Optional[str] = None
+    flags: int = re.DOTALL
+    label: str = ""
+    required: bool = False
+    skip_if: Optional[str] = None
+
+    def describe(self) -> str:
+        return self.label or f"fix <{self.tag} {self.attr}=…>"
+
+    def locate(self, text: str) -> List[Edit]:
+        tag_rx = re.compile(rf"<{re.escape(self.tag)}\b[^>]*>", re.IGNORECASE)
+        attr_rx = re.compile(rf'\s{re.escape(self.attr)}="([^"]*)"', re.IGNORECASE)
+        edits: List[Edit] = []
+        for lo, hi in _regions(text, self.within, self.flags):
+            for m in tag_rx.finditer(text, lo, hi):
+                tag = m.group(0)
+                am = attr_rx.search(tag)
+                old_value = am.group(1) if am else None
+                new_value = self.fix(old_value)
+                if new_value is None or new_value == old_value:
+                    continue
+                # Edit only the attribute itself so other operations may still
+                # touch sibling attributes of the same tag in the same pass.
+                if am:
+                    edits.append(Edit(m.start() + am.start(1), m.start() + am.end(1), new_value))
+                else:
+                    pos = m.start() + len(self.tag) + 1
+                    edits.append(Edit(pos, pos, f' {self.attr}="{new_value}"'))
+        return edits
+
+
+def add_class(token: str) -> Callable[[Optional[str]], Optional[str]]:
+    """AttributeFix helper: make sure ``class`` contains ``token``."""
+    def fix(value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return token
+        if token in value.split():
+            return None
+        return f"{value} {token}".strip()
+    return fix
+
+
+# ── Engine ────────────────────────────────────────────────────────────────────
+
+@dataclass
+class PatchResult:
+    op: object
+    edits: List[Edit] = field(default_factory=list)
+    seconds: float = 0.0
+    already_applied: bool = False
+
+    @property
+    def matched(self) -> bool:
+        return bool(self.edits)
+
+    @property
+    def status(self) -> str:
+        if self.already_applied:
+            return "done"
+        if self.matched:
+            return "ok"
+        return "MISS" if self.op.required else "skip"
+
+
+def plan(text: str, patches: Iterable[object]) -> List[PatchResult]:
+    """Locate every patch against the same, unmodified ``text``.
+
+    An operation whose ``skip_if`` marker is already present in the text is
+    reported as done and produces no edits, so re-running a script is a no-op.
+    """
+    results = []
+    for op in patches:
+        t0 = time.perf_counter()
+        if op.skip_if and op.skip_if in text:
+            results.append(PatchResult(op, [], time.perf_counter() - t0, True))
+            continue
+        edits = op.locate(text)
+        results.append(PatchResult(op, edits, time.perf_counter() - t0))
+    return results
+
+
+def apply(text: str, results: Sequence[PatchResult]) -> str:
+    """Splice every located edit into ``text`` in one left-to-right pass."""
+    tagged = sorted(
+        ((e, r.op) for r in results for e in r.edits),
+        key=lambda item: (item[0].start, item[0].end),
+    )
+    out: List[str] = []
+    pos = 0
+    prev_op = None
+    for edit, op in tagged:
+        if edit.start < pos:
+            raise PatchError(
+                f"Overlapping edits at offset {edit.start}: "
+                f"{op.describe()} vs {prev_op.describe()}"
+            )
+        out.append(text[pos:edit.start])
+        out.append(edit.replacement)
+        pos = edit.end
+        prev_op = op
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def report(results: Sequence[PatchResult], out=sys.stdout) -> None:
+    for r in results:
+        print(f"  [{r.status:<4}] {r.op.describe():<56} {len(r.edits):>4} edit(s) "
+              f"{r.seconds * 1000:8.2f} ms", file=out)
+
+
+def run(patches: Sequence[object], path: Union[str, Path] = DEFAULT_FILE,
+        check: bool = False) -> bool:
+    """Load ``path`` once, apply ``patches`` and write once.
+
+    Returns True when the file was (or, with ``check``, would be) changed.
+    """
+    doc = Document.load(path)
+    t0 = time.perf_counter()
+    results = plan(doc.text, patches)
+    missing = [r.op.describe() for r in results if r.status == "MISS"]
+    new_text = apply(doc.text, results)
+    elapsed = time.perf_counter() - t0
+
+    if check:
+        print(f"{doc.path}: {len(doc.text):,} chars, {len(results)} patch(es), "
+              f"{elapsed * 1000:.2f} ms total (dry run)")
+        report(results)
+    if missing:
+        raise PatchError(f"{doc.path}: anchor(s) not found: {', '.join(missing)}")
+
+    changed = new_text != doc.text
+    if changed and not check:
+        doc.path.write_text(new_text, encoding="utf-8")
+    return changed
+
+
+def load_patches(module_names: Iterable[str]) -> List[object]:
+    patches: List[object] = []
+    for name in module_names:
+        module = importlib.import_module(Path(name).stem)
+        patches.extend(module.PATCHES)
+    return patches
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("scripts", nargs="+",
+                        help="patch script modules whose PATCHES to apply, in order")
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE,
+                        help="document to patch (default: index.html)")
+    parser.add_argument("--check", action="store_true",
+                        help="dry run: report matched anchors and timings, write nothing")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    try:
+        changed = run(load_patches(args.scripts), args.file, check=args.check)
+    except PatchError as err:
+        print(f"❌ {err}", file=sys.stderr)
+        return 1
+    if not args.check:
+        print(f"{args.file}: {'patched' if changed else 'already up to date'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
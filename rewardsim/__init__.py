@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+"""
+rewardsim
+Reward / treasury solvency simulator for choosing rewardRate and the NFT
+APYs before a launch.  Needs NumPy.
+
+    rules.py       vectorized calculateNFTRewards, processGasFee and
+                   StakingPool accounting
+    montecarlo.py  population generator, daily treasury / pool curves,
+                   process-pool Monte Carlo
+    crosscheck.py  integer-exact StakingPool.sol port and JS formula ports
+                   to validate rules.py against
+
+Usage:
+    python -m rewardsim simulate --users 1000000 --paths 32   # ~2 GB per worker
+    python -m rewardsim crosscheck
+"""
+
+from .montecarlo import Scenario, run, simulate_path
+from .rules import (GAS_FEE_ETH, NFT_APYS, PoolCalls, PoolResult, nft_rewards,
+                    simulate_pool)
+
+__all__ = [
+    "GAS_FEE_ETH", "NFT_APYS", "PoolCalls", "PoolResult", "Scenario",
+    "nft_rewards", "run", "simulate_path", "simulate_pool",
+]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+python -m rewardsim
+Command line for the Monte Carlo run and the cross-check.
+
+Usage:
+    python -m rewardsim simulate --users 1000000 --paths 32
+    python -m rewardsim simulate --reward-rate 0.25 --apy Legendary=12 --csv curves.csv
+    python -m rewardsim crosscheck --users 5000 --sample 500
+
+``simulate`` prints the insolvency probabilities and p5/p50/p95 of the
+treasury and pool balances at a few checkpoints; ``--csv`` writes the full
+daily quantile curves.  A 1M-user path needs about 2 GB, so ``--workers``
+(default: CPU count) is lowered to the number of paths that fit in the
+available memory.  ``crosscheck`` exits non-zero on a mismatch.
+"""
+
+import argparse
+import csv
+import dataclasses
+import time
+from pathlib import Path
+
+from . import rules
+from .crosscheck import check
+from .montecarlo import Scenario, run
+
+CURVES = ("treasury", "pool", "gas_usd", "pool_usd")
+
+
+def scenario_arguments(parser: argparse.ArgumentParser) -> None:
+    """One --option per Scenario field (underscores become dashes)."""
+    for f in dataclasses.fields(Scenario):
+        if f.name == "nft_apys":
+            continue                    # --apy RARITY=APY
+        if f.name == "rarity_mix":
+            parser.add_argument("--rarity-mix", type=lambda v: tuple(float(x) for x in v.split(",")),
+                                default=f.default, help="Common,Rare,Epic,Legendary shares")
+            continue
+        parser.add_argument("--" + f.name.replace("_", "-"), type=type(f.default), default=f.default)
+
+
+def parse_apy(value: str):
+    rarity, _, apy = value.partition("=")
+    if rarity not in rules.NFT_APYS or not apy:
+        raise argparse.ArgumentTypeError(f"expected RARITY=APY with RARITY in {', '.join(rules.NFT_APYS)}")
+    return rarity, float(apy)
+
+
+def write_csv(path: Path, result) -> None:
+    quantiles = list(result["treasury"]["quantiles"])
+    with path.open("w", newline="", encoding="utf-8") as fh:
+        out = csv.writer(fh)
+        out.writerow(["day"] + [f"{c}_{q}" for c in CURVES for q in quantiles])
+        for day in result["days"]:
+            out.writerow([int(day)] + [f"{result[c]['quantiles'][q][day]:.6f}" for c in CURVES for q in quantiles])
+
+
+def simulate(args) -> int:
+    apys = dict(rules.NFT_APYS, **dict(args.apy))
+    fields = {f.name: getattr(args, f.name) for f in dataclasses.fields(Scenario) if f.name != "nft_apys"}
+    scenario = Scenario(nft_apys=tuple(apys[r] for r in rules.NFT_RARITIES), **fields)
+    t0 = time.perf_counter()
+    result = run(scenario, paths=args.paths, seed=args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    counts = ", ".join(f"{v:,} {k}" for k, v in result["counts"].items())
+    print(f"{args.paths} paths × {scenario.users:,} users × {scenario.days} days "
+          f"in {elapsed:.1f} s on {result['workers']} worker(s) (per path: {counts})")
+    print(f"APYs: {', '.join(f'{r} {a:g}%' for r, a in zip(rules.NFT_RARITIES, scenario.nft_apys))}; "
+          f"rewardRate {scenario.reward_rate:g} tokens/s")
+
+    checkpoints = sorted({scenario.days // 4, scenario.days // 2, 3 * scenario.days // 4, scenario.days})
+    for name, label in (("treasury", "USDC treasury"), ("pool", "StakingPool reward tokens")):
+        summary = result[name]
+        day = summary["median_insolvency_day"]
+        print(f"\n{label}: insolvency probability {summary['insolvency_probability']:.1%}"
+              + (f", median first day {day:.0f}" if day is not None else ""))
+        for d in checkpoints:
+            q = summary["quantiles"]
+            print(f"  day {d:>4}: p5 {q['p5'][d]:>16,.2f}  p50 {q['p50'][d]:>16,.2f}  p95 {q['p95'][d]:>16,.2f}")
+    print(f"\nGas fees to treasury wallet (USD, mean): {result['gas_usd']['final_mean']:,.2f}")
+    print(f"Pool payouts at market value (USD, mean): {result['pool_usd']['final_mean']:,.2f}")
+    if args.csv:
+        write_csv(args.csv, result)
+        print(f"Daily quantile curves written to {args.csv}")
+    return 0
+
+
+def crosscheck(args) -> int:
+    t0 = time.perf_counter()
+    report = check(users=args.users, days=args.days, reward_rate=args.reward_rate,
+                   sample=args.sample, seed=args.seed, rtol=args.rtol)
+    elapsed = time.perf_counter() - t0
+    err = report["max_rel_error"]
+    print(f"{report['calls']:,} pool calls from {report['stakers']:,} stakers, "
+          f"{report['sampled_users']} users sampled ({elapsed:.1f} s)")
+    print(f"  paid     reference {report['paid_reference']:,.6f}  vectorized {report['paid_vectorized']:,.6f}")
+    print(f"  pending  reference {report['pending_reference']:,.6f}  vectorized {report['pending_vectorized']:,.6f}")
+    print("  max relative error: " + ", ".join(f"{k} {v:.2e}" for k, v in err.items()))
+    print("crosscheck OK" if report["ok"] else f"crosscheck MISMATCH (rtol {args.rtol:g})")
+    return 0 if report["ok"] else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m rewardsim",
+                                     description="Reward / treasury solvency simulator.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sim = sub.add_parser("simulate", help="Monte Carlo treasury and pool curves")
+    scenario_arguments(sim)
+    sim.add_argument("--apy", type=parse_apy, action="append", default=[],
+                     help="override an NFT APY, e.g. Legendary=12")
+    sim.add_argument("--paths", type=int, default=32)
+    sim.add_argument("--workers", type=int, default=None, help="processes (default: CPU count; capped by available memory)")
+    sim.add_argument("--seed", type=int, default=0)
+    sim.add_argument("--csv", type=Path, default=None, help="write daily quantile curves")
+    sim.set_defaults(func=simulate)
+
+    chk = sub.add_parser("crosscheck", help="compare with the Solidity / JS formulas")
+    chk.add_argument("--users", type=int, default=2_000)
+    chk.add_argument("--days", type=int, default=120)
+    chk.add_argument("--reward-rate", type=float, default=0.5)
+    chk.add_argument("--sample", type=int, default=200)
+    chk.add_argument("--seed", type=int, default=1)
+    chk.add_argument("--rtol", type=float, default=1e-9)
+    chk.set_defaults(func=crosscheck)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+rewardsim/crosscheck.py
+Checks the vectorized rules against line-by-line ports of the originals.
+
+- StakingPoolReference is StakingPool.sol with Python integers: wei
+  amounts, 1e18-scaled rewardPerTokenStored and the same floor divisions
+  in _updatePool, _currentRewardPerToken, _earned, stake, unstake and
+  claimReward.
+- calculate_nft_rewards is calculateNFTRewards with its JS arithmetic
+  (milliseconds, days, APY / 365 / 100 × 100).
+
+check() draws a small population with the Monte Carlo generator, replays
+its pool call log through both StakingPoolReference and simulate_pool(),
+and compares every call's payout plus the final pending rewards of a
+sample of users.  The wei rounding of the contract (at most one wei per
+floor division) is far below the tolerance.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from .rules import (NFT_APYS, SECONDS_PER_DAY, WAD, PoolCalls, nft_rewards,
+                    simulate_pool)
+
+
+@dataclass
+class UserInfo:
+    amount_staked: int = 0
+    reward_debt: int = 0
+
+
+class StakingPoolReference:
+    """One StakingPool pool, integer-exact."""
+
+    def __init__(self, reward_rate_wei: int, start_time: int = 0):
+        self.reward_rate = reward_rate_wei
+        self.reward_per_token_stored = 0
+        self.last_update_time = start_time
+        self.total_staked = 0
+        self.users: Dict[int, UserInfo] = {}
+        self.paid = 0
+
+    def _user(self, user: int) -> UserInfo:
+        return self.users.setdefault(user, UserInfo())
+
+    def _update_pool(self, now: int) -> None:
+        if now <= self.last_update_time:
+            return
+        if self.total_staked == 0:
+            self.last_update_time = now
+            return
+        delta = now - self.last_update_time
+        self.reward_per_token_stored += (delta * self.reward_rate * WAD) // self.total_staked
+        self.last_update_time = now
+
+    def current_reward_per_token(self, now: int) -> int:
+        if self.total_staked == 0:
+            return self.reward_per_token_stored
+        delta = now - self.last_update_time if now > self.last_update_time else 0
+        return self.reward_per_token_stored + (delta * self.reward_rate * WAD) // self.total_staked
+
+    def earned(self, user: int, now: int) -> int:
+        u = self._user(user)
+        return u.amount_staked * self.current_reward_per_token(now) // WAD - u.reward_debt
+
+    def stake(self, user: int, amount: int, now: int) -> int:
+        self._update_pool(now)
+        u = self._user(user)
+        pending = (u.amount_staked * self.reward_per_token_stored // WAD - u.reward_debt
+                   if u.amount_staked > 0 else 0)
+        u.amount_staked += amount
+        self.total_staked += amount
+        u.reward_debt = u.amount_staked * self.reward_per_token_stored // WAD
+        self.paid += pending
+        return pending
+
+    def unstake(self, user: int, amount: int, now: int) -> int:
+        u = self._user(user)
+        if amount <= 0 or u.amount_staked < amount:
+            raise ValueError("StakingPool: insufficient staked")
+        self._update_pool(now)
+        pending = u.amount_staked * self.reward_per_token_stored // WAD - u.reward_debt
+        u.amount_staked -= amount
+        u.reward_debt = u.amount_staked * self.reward_per_token_stored // WAD
+        self.total_staked -= amount
+        self.paid += pending
+        return pending
+
+    def claim_reward(self, user: int, now: int) -> int:
+        """claimReward; returns 0 where the contract reverts ("nothing to claim")."""
+        u = self._user(user)
+        self._update_pool(now)
+        pending = u.amount_staked * self.reward_per_token_stored // WAD - u.reward_debt
+        if pending <= 0:
+            return 0
+        u.reward_debt = u.amount_staked * self.reward_per_token_stored // WAD
+        self.paid += pending
+        return pending
+
+
+def calculate_nft_rewards(apy: float, staked_ms: float, now_ms: float) -> float:
+    """calculateNFTRewards(stakedNFT) at Date.now() == now_ms."""
+    staked_duration = (now_ms - staked_ms) / (1000 * 60 * 60 * 24)
+    daily_rate = apy / 365 / 100
+    base_amount = 100
+    return staked_duration * daily_rate * base_amount
+
+
+def to_wei(tokens: np.ndarray) -> List[int]:
+    return [int(round(float(x) * 1e6)) * 10 ** 12 for x in tokens]
+
+
+def check(users: int = 2_000, days: int = 120, reward_rate: float = 0.5,
+          sample: int = 200, seed: int = 1, rtol: float = 1e-9) -> Dict:
+    """Compare simulate_pool() and nft_rewards() with the reference ports.
+
+    Call times are whole seconds and amounts are rounded to 1e-6 tokens so
+    both sides see identical inputs.  Returns a report dict; report['ok']
+    is False if any compared value differs by more than `rtol` (relative
+    to the largest payout).
+    """
+    from .montecarlo import Scenario, poisson_times
+
+    rng = np.random.default_rng(seed)
+    s = Scenario(users=users, days=days, reward_rate=reward_rate)
+    horizon = days * SECONDS_PER_DAY
+
+    stakers = np.flatnonzero(rng.random(users) < s.stake_share)
+    k = len(stakers)
+    amount = np.round(rng.lognormal(np.log(s.stake_mean) - 0.5, 1.0, k), 6)
+    stake_t = np.floor(rng.random(k) * horizon * 0.5)
+    leaves = rng.random(k) < s.unstake_share
+    leave_t = np.where(leaves, np.floor(stake_t + rng.random(k) * (horizon - stake_t)), horizon)
+    row, claim_t = poisson_times(rng, stake_t, horizon, s.pool_claim_days)
+    claim_t = np.floor(claim_t)
+    keep = claim_t < leave_t[row]
+    row, claim_t = row[keep], claim_t[keep]
+    out = np.flatnonzero(leaves)
+    calls = PoolCalls(
+        time=np.concatenate((stake_t, claim_t, leave_t[out])),
+        user=np.concatenate((stakers, stakers[row], stakers[out])),
+        delta=np.concatenate((amount, np.zeros(len(row)), -amount[out])),
+    )
+    vec = simulate_pool(calls, reward_rate, horizon)
+
+    # Exact replay in block order (time, then row)
+    rate_wei = int(round(reward_rate * 1e6)) * 10 ** 12
+    ref = StakingPoolReference(rate_wei)
+    order = np.lexsort((np.arange(len(calls)), calls.time))
+    delta_wei = to_wei(calls.delta)
+    exact = np.zeros(len(calls))
+    for i in order:
+        now, user, d = int(calls.time[i]), int(calls.user[i]), delta_wei[i]
+        if d > 0:
+            paid = ref.stake(user, d, now)
+        elif d < 0:
+            paid = ref.unstake(user, -d, now)
+        else:
+            paid = ref.claim_reward(user, now)
+        exact[i] = paid / WAD
+
+    scale = max(float(np.max(np.abs(exact))), 1.0)
+    call_err = float(np.max(np.abs(vec.payout - exact))) / scale
+
+    picked = rng.choice(stakers, size=min(sample, k), replace=False) if k else np.zeros(0, dtype=np.int64)
+    sel = np.isin(calls.user, picked)
+    per_user_vec = np.bincount(calls.user[sel], weights=vec.payout[sel], minlength=users)[picked]
+    per_user_ref = np.bincount(calls.user[sel], weights=exact[sel], minlength=users)[picked]
+    user_err = float(np.max(np.abs(per_user_vec - per_user_ref), initial=0.0)) / scale
+    pending_ref = sum(ref.earned(int(u), int(horizon)) for u in ref.users) / WAD
+    pending_err = abs(vec.unclaimed - pending_ref) / max(pending_ref, 1.0)
+
+    # calculateNFTRewards on random NFTs
+    rarities = list(NFT_APYS)
+    apy = np.array([NFT_APYS[rarities[i]] for i in rng.integers(0, len(rarities), sample)])
+    staked_s = rng.random(sample) * horizon
+    now_ms = float(horizon) * 1000.0
+    nft_ref = np.array([calculate_nft_rewards(a, now_ms - t * 1000.0, now_ms) for a, t in zip(apy, staked_s)])
+    nft_err = float(np.max(np.abs(nft_rewards(apy, staked_s) - nft_ref) / np.maximum(nft_ref, 1e-12), initial=0.0))
+
+    worst = max(call_err, user_err, pending_err, nft_err)
+    return {
+        "calls": len(calls),
+        "stakers": int(k),
+        "sampled_users": int(len(picked)),
+        "paid_reference": ref.paid / WAD,
+        "paid_vectorized": float(vec.payout.sum()),
+        "pending_reference": pending_ref,
+        "pending_vectorized": vec.unclaimed,
+        "max_rel_error": {"call": call_err, "user": user_err, "pending": pending_err, "nft": nft_err},
+        "ok": worst <= rtol,
+    }
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+rewardsim/montecarlo.py
+Monte Carlo treasury / reward-pool solvency over a simulated population.
+
+One path draws a whole population at once (every array is one row per
+user, NFT, trade or contract call) and returns daily curves:
+
+  treasury     USDC treasury (treasuryUSDCBalance): + opened positions
+               (transferToTreasury), − closed-position payouts and NFT reward
+               claims (transferFromTreasury)
+  gas_usd      GAS_FEE_ETH per paid action (processGasFee), valued on the
+               ETH price path; it goes to the treasury wallet, not the USDC
+               treasury, so it is reported separately
+  pool         reward tokens left in the StakingPool after its payouts
+  pool_usd     the pool payouts of the day valued on the reward-token path
+
+A path is insolvent on the first day a curve goes below zero: for the
+treasury that is the first transferFromTreasury that would be refused, for
+the pool the first safeTransfer that would revert.
+
+run() spreads the paths over a ProcessPoolExecutor; every path has its own
+seed (SeedSequence.spawn), so results do not depend on the worker count.
+A path holds its whole population in memory (about 2 KB per user for a
+365-day run), so the worker count is capped by path_bytes() against the
+available memory.
+"""
+
+import dataclasses
+import os
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .rules import (GAS_FEE_ETH, NFT_APYS, NFT_RARITIES, SECONDS_PER_DAY, PoolCalls,
+                    group_cumsum, group_starts, nft_claim_payouts, nft_daily_rate,
+                    simulate_pool)
+
+LEVERAGES = np.array([2, 5, 10, 20, 50, 100], dtype=np.float64)
+LIQUIDATION_PCT = 15.0           # LIQUIDATION_CONFIG: liquidate at 15 % equity
+LIQUIDATION_FEE_PCT = 5.0        # of the remaining equity, kept by the treasury
+MARKET_STEPS_PER_DAY = 24        # resolution of the traded asset's price path
+CALIBRATION_USERS = 20_000       # population of the path_bytes() probe
+RSS_OVERHEAD = 1.3               # peak RSS / traced NumPy peak of a worker
+
+
+@dataclass
+class Scenario:
+    """Launch parameters; every rate is per user and day unless noted."""
+    users: int = 100_000
+    days: int = 365
+    treasury_usdc: float = 100_000.0      # opening treasuryUSDCBalance
+    # StakingPool
+    reward_rate: float = 0.5              # reward tokens per second (pool.rewardRate / 1e18)
+    reward_fund: float = 20_000_000.0     # reward tokens deposited into the pool
+    reward_price: float = 0.05            # USD per reward token at day 0
+    reward_vol: float = 1.2               # annualized volatility of the reward token
+    stake_share: float = 0.3              # share of users who stake
+    stake_mean: float = 2_000.0           # mean stake (tokens, lognormal)
+    stake_days: float = 180.0             # stakes arrive uniformly over the first N days
+    pool_claim_days: float = 14.0         # mean days between claimReward calls
+    unstake_share: float = 0.25           # share of stakers who unstake before the end
+    # NFT staking (calculateNFTRewards)
+    nft_apys: Tuple[float, ...] = tuple(NFT_APYS.values())   # percent, NFT_RARITIES order
+    nfts_per_user: float = 0.5            # Poisson mean of staked NFTs per user
+    rarity_mix: Tuple[float, ...] = (0.6, 0.25, 0.1, 0.05)   # Common, Rare, Epic, Legendary
+    nft_claim_days: float = 14.0          # mean days between claimAllRewards calls
+    # Futures trading through the treasury
+    trades_per_day: float = 0.02          # positions opened per user and day
+    trade_size: float = 50.0              # mean position size (USDC, exponential)
+    hold_days: float = 1.0                # mean holding time (exponential)
+    market_vol: float = 0.8               # annualized volatility of the traded asset
+    market_drift: float = 0.0             # annualized drift of the traded asset
+    # Gas fees
+    eth_price: float = 3_000.0
+    eth_vol: float = 0.7
+    actions_per_day: float = 0.1          # other paid actions (besides claims)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class PathResult:
+    treasury: np.ndarray           # (days + 1,) balance at the end of each day
+    gas_usd: np.ndarray
+    pool: np.ndarray
+    pool_usd: np.ndarray
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def gbm(rng: np.random.Generator, start: float, vol: float, days: int,
+        drift: float = 0.0, per_day: int = 1) -> np.ndarray:
+    """Geometric Brownian motion path with `per_day` steps a day (days × per_day + 1 points)."""
+    dt = 1.0 / 365.0 / per_day
+    n = days * per_day
+    steps = (drift - 0.5 * vol * vol) * dt + vol * np.sqrt(dt) * rng.standard_normal(n)
+    return start * np.exp(np.concatenate(([0.0], np.cumsum(steps))))
+
+
+def poisson_times(rng: np.random.Generator, start: np.ndarray, end: float,
+                  mean_gap_days: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Poisson-process event times per row in [start, end).
+
+    Returns (row, time) grouped by row and ascending in time within a row,
+    without a sort: the count per row is Poisson, and the k times of a row
+    are the normalized running sums of k + 1 exponential gaps (the order
+    statistics of k uniforms).
+    """
+    span = np.maximum(end - start, 0.0)
+    count = rng.poisson(span / (mean_gap_days * SECONDS_PER_DAY))
+    row = np.repeat(np.arange(len(start)), count + 1)
+    first = group_starts(row)
+    gaps = group_cumsum(rng.standard_exponential(len(row)), first)
+    last = np.ones(len(row), dtype=bool)
+    last[:-1] = first[1:]
+    frac = gaps / np.repeat(gaps[last], count + 1)
+    keep = ~last
+    row = row[keep]
+    return row, start[row] + frac[keep] * span[row]
+
+
+def daily_sum(time: np.ndarray, value: np.ndarray, days: int) -> np.ndarray:
+    """Sum of `value` per day (index 1..days; day 0 is the opening balance)."""
+    day = np.minimum((time * (1.0 / SECONDS_PER_DAY)).astype(np.int64) + 1, days)
+    return np.bincount(day, weights=value, minlength=days + 1)
+
+
+def price_at(path: np.ndarray, time: np.ndarray, per_day: int = 1) -> np.ndarray:
+    """`path` (per_day points a day) linearly interpolated at `time` (seconds)."""
+    x = time * (per_day / SECONDS_PER_DAY)
+    i = np.minimum(x.astype(np.int64), len(path) - 2)
+    return path[i] + (x - i) * (path[i + 1] - path[i])
+
+
+def window_extrema(path: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Min and max of path[lo..hi] (inclusive) for arrays of windows.
+
+    Sparse table: log2(len) levels of power-of-two window extrema, so each
+    query is two lookups.  Empty windows (lo > hi) return +inf / -inf.
+    """
+    mins, maxs = [path], [path]
+    width = 1
+    while 2 * width <= len(path):
+        mins.append(np.minimum(mins[-1][:-width], mins[-1][width:]))
+        maxs.append(np.maximum(maxs[-1][:-width], maxs[-1][width:]))
+        width *= 2
+    empty = lo > hi
+    hi = np.where(empty, lo, hi)
+    level = np.floor(np.log2(hi - lo + 1)).astype(np.int64)
+    lo_min = np.empty(len(lo))
+    lo_max = np.empty(len(lo))
+    for k in np.unique(level):
+        sel = level == k
+        a, b = lo[sel], hi[sel] - (1 << k) + 1
+        lo_min[sel] = np.minimum(mins[k][a], mins[k][b])
+        lo_max[sel] = np.maximum(maxs[k][a], maxs[k][b])
+    return np.where(empty, np.inf, lo_min), np.where(empty, -np.inf, lo_max)
+
+
+def simulate_path(scenario: Scenario, seed) -> PathResult:
+    """One Monte Carlo path of `scenario`."""
+    s = scenario
+    rng = np.random.default_rng(seed)
+    horizon = float(s.days * SECONDS_PER_DAY)
+    counts = {}
+
+    # Price paths
+    eth = gbm(rng, s.eth_price, s.eth_vol, s.days)
+    reward_px = gbm(rng, s.reward_price, s.reward_vol, s.days)
+    market = gbm(rng, 1.0, s.market_vol, s.days, s.market_drift, MARKET_STEPS_PER_DAY)
+
+    # NFT staking rewards, paid from the treasury on claimAllRewards
+    nfts = rng.poisson(s.nfts_per_user, s.users)
+    holder = np.repeat(np.arange(s.users), nfts)
+    rarity = rng.choice(len(NFT_RARITIES), size=len(holder), p=np.asarray(s.rarity_mix) / sum(s.rarity_mix))
+    rate = np.bincount(holder, weights=nft_daily_rate(rarity, s.nft_apys), minlength=s.users)
+    holders = np.flatnonzero(nfts)
+    nft_start = np.zeros(s.users)
+    nft_start[holders] = rng.random(len(holders)) * horizon * 0.5
+    row, claim_t = poisson_times(rng, nft_start[holders], horizon, s.nft_claim_days)
+    claim_user = holders[row]
+    nft_paid = nft_claim_payouts(claim_t, claim_user, nft_start, rate)
+    counts["nfts"] = int(len(holder))
+    counts["nft_claims"] = int(len(claim_t))
+
+    # Futures positions: the stake goes to the treasury on open, the equity
+    # comes back on close.  A position whose equity reaches the liquidation
+    # threshold at any path point while open (or at close) is liquidated at
+    # the threshold, like the liquidation engine does on the first crossing.
+    n_trades = rng.poisson(s.trades_per_day * s.users * s.days)
+    open_t = rng.random(n_trades) * horizon
+    close_t = np.minimum(open_t + rng.exponential(s.hold_days * SECONDS_PER_DAY, n_trades), horizon - 1.0)
+    size = rng.exponential(s.trade_size, n_trades)
+    side = np.where(rng.random(n_trades) < 0.5, 1.0, -1.0)
+    lev = LEVERAGES[rng.integers(0, len(LEVERAGES), n_trades)]
+    entry = price_at(market, open_t, MARKET_STEPS_PER_DAY)
+    exit_px = price_at(market, close_t, MARKET_STEPS_PER_DAY)
+    step = SECONDS_PER_DAY / MARKET_STEPS_PER_DAY
+    low, high = window_extrema(market, np.ceil(open_t / step).astype(np.int64),
+                               np.floor(close_t / step).astype(np.int64))
+    worst = np.where(side > 0, np.minimum(low, exit_px), np.maximum(high, exit_px))
+    liquidated = 100.0 + side * (worst / entry - 1.0) * lev * 100.0 <= LIQUIDATION_PCT
+    equity = 100.0 + side * (exit_px / entry - 1.0) * lev * 100.0
+    back = np.where(liquidated,
+                    LIQUIDATION_PCT * (1.0 - LIQUIDATION_FEE_PCT / 100.0),
+                    equity) / 100.0 * size
+    counts["trades"] = int(n_trades)
+    counts["liquidations"] = int(liquidated.sum())
+
+    # StakingPool calls: stake, claimReward every few weeks, some unstakes
+    stakers = np.flatnonzero(rng.random(s.users) < s.stake_share)
+    k = len(stakers)
+    amount = rng.lognormal(np.log(s.stake_mean) - 0.5, 1.0, k)
+    stake_t = rng.random(k) * min(s.stake_days, s.days) * SECONDS_PER_DAY
+    leaves = rng.random(k) < s.unstake_share
+    leave_t = np.where(leaves, stake_t + rng.random(k) * (horizon - stake_t), horizon)
+    row, pool_claim_t = poisson_times(rng, stake_t, horizon, s.pool_claim_days)
+    keep = pool_claim_t < leave_t[row]
+    row, pool_claim_t = row[keep], pool_claim_t[keep]
+    out = np.flatnonzero(leaves)
+    calls = PoolCalls(
+        time=np.concatenate((stake_t, pool_claim_t, leave_t[out])),
+        user=np.concatenate((stakers, stakers[row], stakers[out])),
+        delta=np.concatenate((amount, np.zeros(len(row)), -amount[out])),
+    )
+    pool_res = simulate_pool(calls, s.reward_rate, horizon)
+    counts["pool_calls"] = int(len(calls))
+
+    # Gas fees: every claim plus the other paid actions
+    actions = rng.poisson(s.actions_per_day * s.users, s.days)
+    gas_day = np.zeros(s.days + 1)
+    gas_day[1:] = actions
+    gas_day += daily_sum(claim_t, np.ones(len(claim_t)), s.days)
+    gas_day += daily_sum(calls.time, np.ones(len(calls)), s.days)
+    gas_usd = np.cumsum(gas_day * GAS_FEE_ETH * eth)
+
+    flow = (daily_sum(open_t, size, s.days)
+            - daily_sum(close_t, back, s.days)
+            - daily_sum(claim_t, nft_paid, s.days))
+    flow[0] += s.treasury_usdc
+    treasury = np.cumsum(flow)
+
+    pool_day = daily_sum(calls.time, pool_res.payout, s.days)
+    pool = s.reward_fund - np.cumsum(pool_day)
+    return PathResult(treasury, gas_usd, pool, pool_day * reward_px, counts)
+
+
+def _run_chunk(scenario: Scenario, seeds: List[np.random.SeedSequence]) -> List[PathResult]:
+    return [simulate_path(scenario, seed) for seed in seeds]
+
+
+def first_negative_day(curves: np.ndarray) -> np.ndarray:
+    """Per path, the first day with a negative balance (-1: never)."""
+    neg = curves < 0
+    return np.where(neg.any(axis=1), neg.argmax(axis=1), -1)
+
+
+def summarize(curves: np.ndarray, quantiles=(0.05, 0.5, 0.95)) -> Dict:
+    first = first_negative_day(curves)
+    broke = first[first >= 0]
+    return {
+        "quantiles": {f"p{int(q * 100)}": np.quantile(curves, q, axis=0) for q in quantiles},
+        "insolvency_probability": float(np.mean(first >= 0)),
+        "median_insolvency_day": float(np.median(broke)) if len(broke) else None,
+        "final_mean": float(curves[:, -1].mean()),
+    }
+
+
+def path_bytes(scenario: Scenario) -> int:
+    """Estimated peak memory of one simulate_path() of `scenario`.
+
+    Every array is one row per user, NFT, trade or call, so the peak is
+    linear in the population: a path of CALIBRATION_USERS users is traced
+    and scaled up, with RSS_OVERHEAD for what tracemalloc does not see.
+    """
+    probe = dataclasses.replace(scenario, users=min(scenario.users, CALIBRATION_USERS))
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    simulate_path(probe, np.random.SeedSequence(0))
+    peak = tracemalloc.get_traced_memory()[1]
+    if not tracing:
+        tracemalloc.stop()
+    return int(peak * scenario.users / probe.users * RSS_OVERHEAD)
+
+
+def available_memory() -> Optional[int]:
+    """Bytes of memory available to new processes, None if unknown."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def max_workers(scenario: Scenario, workers: Optional[int], paths: int) -> int:
+    """`workers` (default: CPU count), at most `paths` and as many paths as fit in memory."""
+    workers = max(1, min(workers or os.cpu_count() or 1, paths))
+    if workers > 1:
+        free = available_memory()
+        if free is not None:
+            workers = max(1, min(workers, free // max(path_bytes(scenario), 1)))
+    return workers
+
+
+def run(scenario: Scenario, paths: int = 64, seed: int = 0,
+        workers: Optional[int] = None) -> Dict:
+    """Simulate `paths` paths of `scenario` on `workers` processes.
+
+    `workers` defaults to the CPU count and is capped by max_workers(), so
+    large populations run fewer paths at a time instead of running out of
+    memory.  Returns { 'days', 'treasury', 'pool', 'gas_usd', 'pool_usd',
+    'counts', 'workers' } where each curve entry is summarize() output.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(paths)
+    workers = max_workers(scenario, workers, paths)
+    chunks = [seeds[i::workers] for i in range(workers)]
+    if workers == 1:
+        results = _run_chunk(scenario, seeds)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_chunk, [scenario] * workers, chunks))
+        # Restore path order (chunk i holds paths i, i + workers, ...)
+        results = [None] * paths
+        for i, part in enumerate(parts):
+            results[i::workers] = part
+
+    def stack(name):
+        return np.vstack([getattr(r, name) for r in results])
+
+    return {
+        "days": np.arange(scenario.days + 1),
+        "treasury": summarize(stack("treasury")),
+        "pool": summarize(stack("pool")),
+        "gas_usd": summarize(stack("gas_usd")),
+        "pool_usd": summarize(np.cumsum(stack("pool_usd"), axis=1)),
+        "counts": {k: int(np.mean([r.counts[k] for r in results])) for k in results[0].counts},
+        "workers": workers,
+    }
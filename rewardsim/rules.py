@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+rewardsim/rules.py
+Vectorized NumPy versions of the reward and treasury rules of the app:
+
+- calculateNFTRewards (index.html): a staked NFT accrues
+  ``days × nftAPYs[rarity] / 365 / 100 × 100`` USDC, and claimAllRewards
+  pays the total out of the treasury (transferFromTreasury semantics:
+  the payout fails if the treasury is short).
+- processGasFee (index.html): every paid action sends GAS_FEE_ETH to the
+  treasury wallet.
+- StakingPool.sol: _updatePool / _currentRewardPerToken / _earned.  Every
+  stake, unstake and claimReward first brings rewardPerTokenStored
+  forward by ``timeDelta × rewardRate / totalStaked`` and then pays the
+  caller ``amountStaked × Δ rewardPerToken`` since their previous call.
+
+simulate_pool() evaluates a whole call log of one pool at once: one sort
+by time for the accumulator, one sort by user for the per-user deltas, so
+millions of calls cost a few array passes instead of a Python loop.  It
+works in token units with float64; crosscheck.py replays the same log
+through an exact wei-integer port of the contract.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+SECONDS_PER_DAY = 86_400
+WAD = 10 ** 18
+
+# index.html: nftAPYs / calculateNFTRewards / GAS_FEE_ETH
+NFT_APYS = {"Common": 5.0, "Rare": 10.0, "Epic": 15.0, "Legendary": 20.0}
+NFT_RARITIES = tuple(NFT_APYS)
+NFT_BASE_VALUE = 100.0          # USDC staked value assumed per NFT
+GAS_FEE_ETH = 0.00001
+
+
+def nft_rewards(apy, staked_seconds):
+    """calculateNFTRewards for arrays of APYs (percent) and staking durations."""
+    days = np.asarray(staked_seconds, dtype=np.float64) / SECONDS_PER_DAY
+    daily_rate = np.asarray(apy, dtype=np.float64) / 365.0 / 100.0
+    return days * daily_rate * NFT_BASE_VALUE
+
+
+def nft_daily_rate(rarity_index, apys=None):
+    """USDC accrued per day by NFTs of the given NFT_RARITIES indices.
+
+    `apys` (percent, in NFT_RARITIES order) overrides NFT_APYS.
+    """
+    table = np.asarray(apys if apys is not None else [NFT_APYS[r] for r in NFT_RARITIES], dtype=np.float64)
+    return table[np.asarray(rarity_index)] / 365.0 / 100.0 * NFT_BASE_VALUE
+
+
+def time_order(time: np.ndarray) -> np.ndarray:
+    """Row indices sorted by time; equal times keep row order (block order).
+
+    The unstable sort is several times faster on floats; the stable one is
+    only needed when there are ties.
+    """
+    order = np.argsort(time)
+    ordered = time[order]
+    if np.any(ordered[1:] == ordered[:-1]):
+        order = np.argsort(time, kind="stable")
+    return order
+
+
+def group_starts(keys: np.ndarray) -> np.ndarray:
+    """Boolean mask of the first row of each run of equal (sorted) keys."""
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return first
+
+
+def group_cumsum(values: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """Running sum of `values` that restarts at every `first` row."""
+    total = np.cumsum(values)
+    start = np.maximum.accumulate(np.where(first, np.arange(len(values)), 0))
+    return total - (total[start] - values[start])
+
+
+def previous_in_group(values: np.ndarray, first: np.ndarray, initial) -> np.ndarray:
+    """values[i - 1] within a group, `initial` (array or scalar) on first rows."""
+    prev = np.empty_like(values)
+    prev[1:] = values[:-1]
+    return np.where(first, initial, prev)
+
+
+@dataclass
+class PoolCalls:
+    """Call log of one StakingPool pool, one row per stake/unstake/claimReward.
+
+    time   seconds since addPool (the pool's first lastUpdateTime)
+    user   integer user index
+    delta  staked amount change in tokens: +stake, -unstake, 0 for a claim
+    """
+    time: np.ndarray
+    user: np.ndarray
+    delta: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
+@dataclass
+class PoolResult:
+    """simulate_pool() output; per-call arrays are in the input row order."""
+    payout: np.ndarray             # reward tokens transferred by each call
+    reward_per_token: np.ndarray   # rewardPerTokenStored after each call's _updatePool
+    total_staked: np.ndarray       # pool.totalStaked after each call
+    emitted: float                 # rewardRate × seconds with totalStaked > 0, up to end_time
+    unclaimed: float               # _earned summed over users at end_time
+
+
+def simulate_pool(calls: PoolCalls, reward_rate: float,
+                  end_time: Optional[float] = None) -> PoolResult:
+    """Replay `calls` through the StakingPool accounting, vectorized.
+
+    Calls at the same timestamp execute in row order, like transactions in
+    one block.  Unstakes are assumed valid (never more than the user's stake).
+    """
+    n = len(calls)
+    if not n:
+        empty = np.zeros(0)
+        return PoolResult(empty, empty, empty, 0.0, 0.0)
+    time = np.asarray(calls.time, dtype=np.float64)
+    by_time = time_order(time)
+    t = time[by_time]
+    d = np.asarray(calls.delta, dtype=np.float64)[by_time]
+
+    # _updatePool: accrue over the gap before each call at the supply left by
+    # the previous call; nothing accrues while the pool is empty.
+    supply = np.cumsum(d)
+    supply_before = supply - d
+    gap = np.diff(t, prepend=0.0)
+    step = np.zeros(n)
+    live = supply_before > 0
+    step[live] = gap[live] * reward_rate / supply_before[live]
+    rpt = np.cumsum(step)
+
+    # Each call pays amountStaked × (rpt now − rpt at the user's previous call);
+    # rewardDebt is exactly amountStaked × rpt at that previous call.
+    u = np.asarray(calls.user)[by_time]
+    by_user = np.argsort(u, kind="stable")
+    uu, rr, dd = u[by_user], rpt[by_user], d[by_user]
+    first = group_starts(uu)
+    staked_after = group_cumsum(dd, first)
+    staked_before = staked_after - dd
+    pay = staked_before * (rr - previous_in_group(rr, first, 0.0))
+
+    # Accrual after the last call, up to end_time
+    tail = max(float(end_time) - t[-1], 0.0) if end_time is not None else 0.0
+    emitted = float(np.sum(gap[live]) * reward_rate)
+    end_rpt = rpt[-1]
+    if supply[-1] > 0:
+        emitted += reward_rate * tail
+        end_rpt += reward_rate * tail / supply[-1]
+    last = np.ones(n, dtype=bool)
+    last[:-1] = uu[1:] != uu[:-1]
+    unclaimed = float(np.sum(staked_after[last] * (end_rpt - rr[last])))
+
+    payout = np.empty(n)
+    payout[by_time[by_user]] = pay
+    out_rpt = np.empty(n)
+    out_rpt[by_time] = rpt
+    out_supply = np.empty(n)
+    out_supply[by_time] = supply
+    return PoolResult(payout, out_rpt, out_supply, emitted, unclaimed)
+
+
+def nft_claim_payouts(claim_time: np.ndarray, claim_user: np.ndarray,
+                      stake_time: np.ndarray, daily_rate: np.ndarray) -> np.ndarray:
+    """Payout of each claimAllRewards call for NFT staking rewards.
+
+    claimNFTRewards resets every staked NFT's stakedTime to the claim time,
+    so a claim pays the user's summed daily rate over the time since their
+    previous claim (or since staking).  stake_time / daily_rate are per user.
+    """
+    ascending = claim_user[1:] > claim_user[:-1]
+    ascending |= (claim_user[1:] == claim_user[:-1]) & (claim_time[1:] >= claim_time[:-1])
+    if ascending.all():
+        order = np.arange(len(claim_time))      # already grouped (poisson_times)
+    else:
+        order = time_order(claim_time)
+        order = order[np.argsort(claim_user[order], kind="stable")]
+    cu = claim_user[order]
+    ct = claim_time[order]
+    first = group_starts(cu)
+    since = previous_in_group(ct, first, stake_time[cu])
+    payout = np.empty(len(claim_time))
+    payout[order] = daily_rate[cu] * (ct - since) / SECONDS_PER_DAY
+    return payout
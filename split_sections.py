@@ -0,0 +1,846 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+split_sections.py
+Build-time splitter that moves the heavy showSection branches of index.html
+into lazily loaded per-section scripts.
+
+Almost all dashboard code lives inside ``function startApp() { ... }``, so
+showSection and the section renderers are closure-locals, not globals.  A
+branch can therefore not simply be cut out into another <script>.  For every
+splittable section the splitter
+
+- moves the branch body, plus every startApp-level function that is only
+  referenced from that branch (transitively), into a module that registers
+  ``window.__sectionRenderers[id]``;
+- rewrites each identifier in the moved code that resolves to a startApp or
+  showSection binding into ``__scope.name``;
+- replaces the branch with ``renderSectionModule(id, content, {...})`` where
+  the object literal holds a getter (and setter for mutable bindings) per
+  routed name.  The accessors sit exactly where the branch used to be, so
+  every name resolves to the same binding as before.
+
+renderSectionModule / loadSectionModule (defined in index.html) show a
+loading skeleton, load the module on first use and prefetch it on hover.
+
+``window.name = function () {...}`` handlers and ``window.name = name``
+exports at startApp level move along when the section's markup is their only
+user.  Standalone scripts tagged ``<script data-lazy-module="id"
+data-lazy-entry="fnA,fnB">`` become modules too: the block is replaced by a
+small loader that defines stub ``window.fnA``/``fnB`` functions, loads the
+module on the first call (or on hover of an element whose onclick calls
+them) and forwards the call to the real function the module installs.
+
+The split is verified before anything is written and SplitError is raised
+(failing ``npm run build``) if it would change any section's bindings: the
+rewritten token stream must equal the original one with only the routed
+names replaced, the script-level globals must be unchanged, and the new code
+must still parse (``node --check`` when node is available).  Names shadowed
+inside the moved code are resolved with a lightweight scope analysis and
+left alone.  A section that uses ``this``/``arguments`` at branch level, or
+calls a routed function that depends on ``this``, is left inline and
+reported instead.
+
+Usage (normally called from build_assets.py):
+    python split_sections.py index.html          # dry-run report
+"""
+
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from js_index import build_index, inline_scripts, iter_tokens
+
+HOST_FUNCTION = "startApp"
+ROUTER_FUNCTION = "showSection"
+# First-paint sections are never lazy: they would only add a round trip.
+EAGER_SECTIONS = {"home", "swap"}
+SPLIT_MIN_BYTES = 8 * 1024
+MANIFEST_PLACEHOLDER = "const SECTION_MODULES = {};"
+MODULE_URL_PLACEHOLDER = "__SECTION_MODULE_URL_{}__"
+SCOPE_VAR = "__scope"
+
+DECL_KEYWORDS = {"let", "const", "var", "function", "class"}
+# A '{' after one of these tokens opens an object literal, not a block.
+EXPR_BEFORE_BRACE = set("(,=:[?!&|+-*%<>~^") | {"return", "===", "!==", "==", "!=", "`tpl`"}
+FUNCTION_DECL_RE = re.compile(r"(?:async\s+)?function\b")
+# ``name(...) {`` opens a method only after these tokens (object/class bodies).
+METHOD_PREFIX = {"{", ",", "}", ";", "get", "set", "async", "static"}
+LAZY_SCRIPT_RE = re.compile(r"<script\b(?P<attrs>[^>]*\bdata-lazy-module\s*=[^>]*)>(?P<body>.*?)</script\s*>",
+                            re.DOTALL | re.IGNORECASE)
+LAZY_ATTR_RE = re.compile(r"""\bdata-lazy-(module|entry)\s*=\s*["']([^"']*)["']""", re.IGNORECASE)
+LAZY_LOADER = """<script>
+    /* {entries}() → lazy module '{module}' – generated by split_sections.py */
+    (() => {{
+      const url = '{url}';
+      const entries = {names};
+      let loading = null;
+      const load = () => loading || (loading = new Promise((resolve, reject) => {{
+        const script = document.createElement('script');
+        script.src = url;
+        script.async = true;
+        script.onload = resolve;
+        script.onerror = () => {{ loading = null; reject(new Error('Failed to load module {module}')); }};
+        document.head.appendChild(script);
+      }}));
+      entries.forEach(name => {{
+        const stub = window[name] = function (...args) {{
+          return load().then(() => {{
+            if (window[name] !== stub) return window[name].apply(this, args);
+            throw new Error('Module {module} did not define ' + name);
+          }}).catch(err => console.error('[lazy module]', err));
+        }};
+      }});
+      ['pointerover', 'focusin', 'touchstart'].forEach(type => document.addEventListener(type, e => {{
+        const el = e.target && e.target.closest && e.target.closest('[onclick]');
+        if (el && entries.some(name => el.getAttribute('onclick').includes(name + '('))) load().catch(() => {{}});
+      }}, {{ passive: true }}));
+    }})();
+  </script>"""
+NOT_METHOD_NAMES = {"if", "for", "while", "switch", "catch", "with", "function", "return",
+                    "typeof", "await", "new", "delete", "void", "in", "of", "do", "else"}
+
+
+class SplitError(Exception):
+    """Raised when a split would change behaviour; fails the build."""
+
+
+@dataclass
+class Token:
+    kind: str
+    start: int
+    end: int
+    text: str
+
+
+@dataclass
+class SectionModule:
+    section: str
+    code: str
+    call: str
+    moved_functions: List[str] = field(default_factory=list)
+    scope_names: List[str] = field(default_factory=list)
+    entries: List[str] = field(default_factory=list)   # lazy scripts only
+
+
+def _tokens(text: str, lo: int, hi: int) -> List[Token]:
+    out = []
+    for kind, start, end in iter_tokens(text, lo, hi):
+        if kind in ("ws", "line_comment", "block_comment"):
+            continue
+        out.append(Token(kind, start, end, "`tpl`" if kind == "template" else text[start:end]))
+    return out
+
+
+def _closing(tokens: List[Token], i: int) -> int:
+    """Index of the token closing the bracket at ``tokens[i]``."""
+    pairs = {"(": ")", "[": "]", "{": "}"}
+    opener = tokens[i].text
+    depth = 0
+    for j in range(i, len(tokens)):
+        t = tokens[j].text
+        if t == opener:
+            depth += 1
+        elif t == pairs[opener]:
+            depth -= 1
+            if depth == 0:
+                return j
+    raise SplitError(f"Unbalanced {opener!r} at offset {tokens[i].start}")
+
+
+def _opening(tokens: List[Token], j: int) -> int:
+    pairs = {")": "(", "]": "[", "}": "{"}
+    closer = tokens[j].text
+    depth = 0
+    for i in range(j, -1, -1):
+        t = tokens[i].text
+        if t == closer:
+            depth += 1
+        elif t == pairs[closer]:
+            depth -= 1
+            if depth == 0:
+                return i
+    raise SplitError(f"Unbalanced {closer!r} at offset {tokens[j].start}")
+
+
+def _declarator_names(tokens: List[Token], i: int) -> List[str]:
+    """Names bound by the let/const/var declarator list starting at ``tokens[i]``.
+
+    Destructuring patterns are over-approximated: every identifier inside the
+    pattern counts as bound.
+    """
+    names: List[str] = []
+    nest = 0
+    expect = True
+    for j in range(i + 1, len(tokens)):
+        u = tokens[j]
+        if u.text in ("(", "[", "{"):
+            if expect and u.text in ("[", "{"):
+                names += [v.text for v in tokens[j + 1:_closing(tokens, j)] if v.kind == "ident"]
+            nest += 1
+            expect = False
+        elif u.text in (")", "]", "}"):
+            nest -= 1
+            if nest < 0:
+                break
+        elif nest == 0 and (u.text == ";" or (u.kind == "ident" and u.text in DECL_KEYWORDS)):
+            break
+        elif nest == 0 and u.text == ",":
+            expect = True
+        elif expect and u.kind == "ident":
+            names.append(u.text)
+            expect = False
+        elif expect:
+            expect = False
+    return names
+
+
+def _param_names(tokens: List[Token], open_i: int, close_i: int) -> List[str]:
+    """Binding identifiers of a parameter list; default values are skipped."""
+    names = []
+    depth = 0
+    for j in range(open_i + 1, close_i):
+        t = tokens[j]
+        if t.text in ("(", "[", "{"):
+            depth += 1
+        elif t.text in (")", "]", "}"):
+            depth -= 1
+        elif t.kind == "ident":
+            prev = tokens[j - 1].text
+            nxt = tokens[j + 1].text
+            if prev in ("(", ",", "...", "[", "{") or (depth and prev == ":"):
+                if not (depth and nxt == ":"):
+                    names.append(t.text)
+    return names
+
+
+def _is_function_decl(tokens: List[Token], i: int) -> bool:
+    """True when the ``function``/``class`` at ``tokens[i]`` is a declaration."""
+    k = i - 1
+    if k >= 0 and tokens[k].text == "async":
+        k -= 1
+    return k < 0 or tokens[k].text in (";", "{", "}", ")") or (
+        tokens[k].kind == "ident" and tokens[k].text in ("else", "export", "default"))
+
+
+def declared_names(tokens: List[Token], top_level_only: bool = False) -> Dict[str, str]:
+    """Names declared in ``tokens`` mapped to their keyword.
+
+    Covers let/const/var, function/class declarations, function, method and
+    arrow parameters and catch bindings (kind ``param``).  With
+    ``top_level_only`` only declarations at brace depth 0 are returned
+    (parameters are skipped).
+    """
+    names: Dict[str, str] = {}
+    depth = 0
+    for i, tok in enumerate(tokens):
+        t = tok.text
+        if t == "{":
+            depth += 1
+            continue
+        if t == "}":
+            depth -= 1
+            continue
+        if top_level_only and depth:
+            continue
+        if t in ("let", "const", "var") and tok.kind == "ident":
+            for name in _declarator_names(tokens, i):
+                names.setdefault(name, t)
+        elif t in ("function", "class") and tok.kind == "ident":
+            j = i + 1 + (i + 1 < len(tokens) and tokens[i + 1].text == "*")
+            if j < len(tokens) and tokens[j].kind == "ident" and tokens[j].text != "extends":
+                if _is_function_decl(tokens, i):
+                    names.setdefault(tokens[j].text, t)
+    if not top_level_only:
+        for scope in _scopes(tokens):
+            for name in scope.params:
+                names.setdefault(name, "param")
+    return names
+
+
+def free_identifiers(tokens: List[Token]) -> Set[str]:
+    """Identifier tokens that are not property names (``a.b``, ``{b: 1}``)."""
+    used = set()
+    for i, tok in enumerate(tokens):
+        if tok.kind != "ident":
+            continue
+        prev = tokens[i - 1].text if i else None
+        nxt = tokens[i + 1].text if i + 1 < len(tokens) else None
+        if prev in (".", "?."):
+            continue
+        if nxt == ":" and prev in ("{", ","):
+            continue
+        used.add(tok.text)
+    return used
+
+
+def _brace_kinds(tokens: List[Token]) -> List[Optional[str]]:
+    """For every token, 'object' if its innermost '{' opens an object literal."""
+    kinds: List[Optional[str]] = []
+    stack: List[str] = []
+    for i, tok in enumerate(tokens):
+        kinds.append(stack[-1] if stack else None)
+        if tok.text == "{":
+            prev = tokens[i - 1].text if i else None
+            stack.append("object" if prev in EXPR_BEFORE_BRACE else "block")
+        elif tok.text == "}" and stack:
+            stack.pop()
+    return kinds
+
+
+@dataclass
+class _Scope:
+    start: int                  # token index range, inclusive
+    end: int
+    function: bool              # var/function-scope boundary
+    arrow: bool = False         # arrows share this/arguments with their parent
+    decls: Set[str] = field(default_factory=set)
+    params: List[str] = field(default_factory=list)
+
+
+def _expression_end(tokens: List[Token], k: int) -> int:
+    """Last token of the expression starting at ``tokens[k]`` (arrow bodies)."""
+    depth = 0
+    for j in range(k, len(tokens)):
+        t = tokens[j].text
+        if t in ("(", "[", "{"):
+            depth += 1
+        elif t in (")", "]", "}"):
+            if depth == 0:
+                return j - 1
+            depth -= 1
+        elif depth == 0 and t in (",", ";"):
+            return j - 1
+    return len(tokens) - 1
+
+
+def _scopes(tokens: List[Token]) -> List[_Scope]:
+    """Approximate lexical scopes of a token stream.
+
+    The stream itself is the root (function) scope.  Blocks, for-heads,
+    catch clauses, functions, methods and arrows open nested scopes;
+    let/const/class/function bind in the innermost scope, var in the
+    innermost function scope.
+    """
+    n = len(tokens)
+    kinds = _brace_kinds(tokens)
+    root = _Scope(0, n - 1, True)
+    scopes = [root]
+    stack = [root]
+
+    def open_function(open_i: int, close_i: int, arrow: bool, name: Optional[str] = None) -> None:
+        body = close_i + 1
+        end = _closing(tokens, body) if body < n and tokens[body].text == "{" else _expression_end(tokens, body)
+        scope = _Scope(open_i, end, True, arrow)
+        scope.params = _param_names(tokens, open_i, close_i)
+        scope.decls.update(scope.params)
+        if name:
+            scope.decls.add(name)
+        scopes.append(scope)
+        stack.append(scope)
+
+    for i, tok in enumerate(tokens):
+        while len(stack) > 1 and i > stack[-1].end:
+            stack.pop()
+        t = tok.text
+        nxt = tokens[i + 1].text if i + 1 < n else None
+        if t == "{" and i + 1 < n and kinds[i + 1] == "block":
+            scope = _Scope(i, _closing(tokens, i), False)
+            scopes.append(scope)
+            stack.append(scope)
+        elif tok.kind != "ident":
+            if t == "=>":
+                prev = tokens[i - 1]
+                if prev.text == ")":
+                    open_i = _opening(tokens, i - 1)
+                    body_end = i + 1
+                    end = (_closing(tokens, body_end) if body_end < n and tokens[body_end].text == "{"
+                           else _expression_end(tokens, body_end))
+                    scope = _Scope(open_i, end, True, True)
+                    scope.params = _param_names(tokens, open_i, i - 1)
+                elif prev.kind == "ident":
+                    end = (_closing(tokens, i + 1) if nxt == "{" else _expression_end(tokens, i + 1))
+                    scope = _Scope(i - 1, end, True, True)
+                    scope.params = [prev.text]
+                else:
+                    continue
+                scope.decls.update(scope.params)
+                scopes.append(scope)
+                stack.append(scope)
+        elif t in ("let", "const", "var", "class", "function"):
+            if t in ("let", "const"):
+                stack[-1].decls.update(_declarator_names(tokens, i))
+            elif t == "var":
+                next(s for s in reversed(stack) if s.function).decls.update(_declarator_names(tokens, i))
+            else:
+                j = i + 1 + (nxt == "*")
+                name = None
+                if j < n and tokens[j].kind == "ident" and tokens[j].text != "extends":
+                    name = tokens[j].text
+                    j += 1
+                if name and _is_function_decl(tokens, i):
+                    stack[-1].decls.add(name)
+                    name = None         # a declaration's name is not rebound inside it
+                if t == "function" and j < n and tokens[j].text == "(":
+                    open_function(j, _closing(tokens, j), False, name)
+        elif t in ("for", "catch") and nxt == "(":
+            close = _closing(tokens, i + 1)
+            body = close + 1
+            end = _closing(tokens, body) if body < n and tokens[body].text == "{" else _expression_end(tokens, body)
+            scope = _Scope(i + 1, end, False)
+            if t == "catch":
+                scope.params = _param_names(tokens, i + 1, close)
+                scope.decls.update(scope.params)
+            scopes.append(scope)
+            stack.append(scope)
+        elif nxt == "(" and t not in NOT_METHOD_NAMES and i and tokens[i - 1].text not in (".", "?.", "function"):
+            close = _closing(tokens, i + 1)
+            if close + 1 < n and tokens[close + 1].text == "{" and tokens[i - 1].text in METHOD_PREFIX:
+                open_function(i + 1, close, False)
+    return scopes
+
+
+def rewrite(text: str, lo: int, hi: int, routed: Set[str]) -> Tuple[str, List[str], Set[str]]:
+    """Return ``text[lo:hi]`` with every reference to a ``routed`` name that is
+    not shadowed inside the code turned into ``__scope.name``, the expected
+    token stream and the set of names actually routed."""
+    tokens = _tokens(text, lo, hi)
+    kinds = _brace_kinds(tokens)
+    scopes = [s for s in _scopes(tokens) if s.decls & routed]
+    out: List[str] = []
+    expected: List[str] = []
+    used: Set[str] = set()
+    pos = lo
+    for i, tok in enumerate(tokens):
+        if tok.kind != "ident" or tok.text not in routed:
+            expected.append(tok.text)
+            continue
+        prev = tokens[i - 1].text if i else None
+        nxt = tokens[i + 1].text if i + 1 < len(tokens) else None
+        in_object = kinds[i] == "object"
+        if (prev in (".", "?.")
+                or (in_object and prev in ("{", ",", "get", "set", "async") and nxt in (":", "("))
+                or any(s.start <= i <= s.end and tok.text in s.decls for s in scopes)):
+            expected.append(tok.text)
+            continue
+        if in_object and prev in ("{", ",") and nxt in (",", "}"):
+            new = f"{tok.text}: {SCOPE_VAR}.{tok.text}"
+            expected += [tok.text, ":", SCOPE_VAR, ".", tok.text]
+        else:
+            new = f"{SCOPE_VAR}.{tok.text}"
+            expected += [SCOPE_VAR, ".", tok.text]
+        used.add(tok.text)
+        out.append(text[pos:tok.start])
+        out.append(new)
+        pos = tok.end
+    out.append(text[pos:hi])
+    return "".join(out), expected, used
+
+
+def _own_this(tokens: List[Token]) -> bool:
+    """True if ``this``/``arguments`` occur outside every non-arrow function."""
+    fns = [s for s in _scopes(tokens)[1:] if s.function and not s.arrow]
+    return any(t.text in ("this", "arguments") and not any(s.start <= i <= s.end for s in fns)
+               for i, t in enumerate(tokens))
+
+
+def _script_globals(html: str) -> Set[str]:
+    names: Set[str] = set()
+    for lo, hi in inline_scripts(html):
+        names |= set(declared_names(_tokens(html, lo, hi), top_level_only=True))
+    return names
+
+
+def _node_check(code: str, label: str) -> None:
+    node = shutil.which("node")
+    if not node:
+        return
+    with tempfile.NamedTemporaryFile("w", suffix=".js", delete=False, encoding="utf-8") as f:
+        f.write(code)
+        path = f.name
+    try:
+        res = subprocess.run([node, "--check", path], capture_output=True, text=True)
+    finally:
+        Path(path).unlink()
+    if res.returncode != 0:
+        raise SplitError(f"{label} does not parse:\n{res.stderr.strip()[:800]}")
+
+
+def _comment_spans(html: str) -> List[Tuple[int, int]]:
+    """``(start, end)`` of every comment in the inline scripts, in order."""
+    return [(start, end) for lo, hi in inline_scripts(html)
+            for kind, start, end in iter_tokens(html, lo, hi)
+            if kind in ("line_comment", "block_comment")]
+
+
+def _window_exports(html: str, host: Tuple[int, int, int, int], idx,
+                    host_fns: Dict[str, Tuple[int, int, int, int]]
+                    ) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, Tuple[int, int]]]:
+    """startApp-level ``window.name = ...`` statements.
+
+    Returns ``(window_fns, exports)``: the ``window.name = function () {...};``
+    handlers and the ``window.name = name;`` exports of startApp functions,
+    each as the ``(start, end)`` span of its whole statement.
+    """
+    window_fns: Dict[str, Tuple[int, int]] = {}
+    for name, spans in idx.functions.items():
+        sp = spans[0]
+        if (len(spans) == 1 and host[1] < sp[0] < host[2] and sp[3] == host[3] + 1
+                and name not in host_fns and name != ROUTER_FUNCTION
+                and re.match(r"window\.%s\s*=\s*(?:async\s+)?function\b" % re.escape(name), html[sp[0]:])):
+            end = sp[2] + 1
+            m = re.compile(r"[ \t]*;").match(html, end)
+            window_fns[name] = (sp[0], m.end() if m else end)
+    exports: Dict[str, Tuple[int, int]] = {}
+    tokens = _tokens(html, host[1] + 1, host[2])
+    depth = 0
+    for i, t in enumerate(tokens):
+        if t.text in ("{", "(", "["):
+            depth += 1
+        elif t.text in ("}", ")", "]"):
+            depth -= 1
+        elif (depth == 0 and t.text == "window" and i + 5 < len(tokens)
+              and (i == 0 or tokens[i - 1].text in (";", "}"))
+              and tokens[i + 1].text == "." and tokens[i + 3].text == "="
+              and tokens[i + 2].text == tokens[i + 4].text and tokens[i + 5].text == ";"
+              and tokens[i + 2].text in host_fns and tokens[i + 2].text not in exports):
+            exports[tokens[i + 2].text] = (t.start, tokens[i + 5].end)
+    return window_fns, exports
+
+
+def _accessors(names: List[str], kinds: Dict[str, str], indent: str) -> str:
+    parts = []
+    for name in names:
+        acc = f"get {name}() {{ return {name}; }}"
+        if kinds.get(name) != "const":
+            acc += f", set {name}(v) {{ {name} = v; }}"
+        parts.append(f"{indent}  {acc}")
+    return ",\n".join(parts)
+
+
+def split_page(html: str, min_bytes: int = SPLIT_MIN_BYTES,
+               eager: Set[str] = EAGER_SECTIONS) -> Tuple[str, Dict[str, SectionModule], List[str]]:
+    """Split ``html``; return ``(new_html, modules, report_lines)``.
+
+    Section branches are split first, then the ``data-lazy-module`` scripts.
+    """
+    html, modules, report = _split_sections(html, min_bytes, eager)
+    html, scripts, script_report = split_lazy_scripts(html)
+    clash = set(modules) & set(scripts)
+    if clash:
+        raise SplitError(f"lazy script id(s) clash with section modules: {sorted(clash)}")
+    return html, {**modules, **scripts}, report + script_report
+
+
+def split_lazy_scripts(html: str) -> Tuple[str, Dict[str, SectionModule], List[str]]:
+    """Replace every ``<script data-lazy-module>`` block with its loader."""
+    modules: Dict[str, SectionModule] = {}
+    report: List[str] = []
+    out: List[str] = []
+    pos = 0
+    for m in LAZY_SCRIPT_RE.finditer(html):
+        attrs = {k.lower(): v for k, v in LAZY_ATTR_RE.findall(m.group("attrs"))}
+        module = attrs.get("module", "")
+        entries = [e.strip() for e in attrs.get("entry", "").split(",") if e.strip()]
+        if not re.fullmatch(r"[\w-]+", module) or not entries:
+            raise SplitError(f"<script data-lazy-module> at offset {m.start()} needs an id and data-lazy-entry")
+        if module in modules:
+            raise SplitError(f"duplicate lazy script id {module!r}")
+        body = m.group("body")
+        missing = [e for e in entries if not re.search(r"\bwindow\.%s\s*=" % re.escape(e), body)]
+        if missing:
+            raise SplitError(f"lazy script {module!r} never assigns window.{', window.'.join(missing)}")
+        code = f"/* <script data-lazy-module=\"{module}\"> – generated by split_sections.py */\n{body.strip()}\n"
+        loader = LAZY_LOADER.format(module=module, entries="(), ".join(entries),
+                                    url=MODULE_URL_PLACEHOLDER.format(module),
+                                    names="[" + ", ".join(f"'{e}'" for e in entries) + "]")
+        _node_check(code, f"lazy script '{module}'")
+        _node_check(loader[len("<script>"):-len("</script>")], f"loader of lazy script '{module}'")
+        modules[module] = SectionModule(module, code, loader, entries=entries)
+        out += [html[pos:m.start()], loader]
+        pos = m.end()
+        report.append(f"{module}: {len(body) / 1024:.1f} KB script → lazy module "
+                      f"(loaded on first {'(), '.join(entries)}())")
+    out.append(html[pos:])
+    return "".join(out), modules, report
+
+
+def _split_sections(html: str, min_bytes: int,
+                    eager: Set[str]) -> Tuple[str, Dict[str, SectionModule], List[str]]:
+    """Move the showSection branches; return ``(new_html, modules, report_lines)``.
+
+    Pages without the showSection router or the SECTION_MODULES placeholder
+    are returned unchanged.
+    """
+    report: List[str] = []
+    if MANIFEST_PLACEHOLDER not in html:
+        return html, {}, ["no SECTION_MODULES placeholder – nothing split"]
+    idx = build_index(html)
+    host = idx.function(HOST_FUNCTION)
+    router = idx.function(ROUTER_FUNCTION)
+    if not host or not router or not (host[1] < router[0] < host[2]):
+        return html, {}, [f"{ROUTER_FUNCTION} not found inside {HOST_FUNCTION} – nothing split"]
+
+    host_tokens = _tokens(html, host[1] + 1, host[2])
+    host_decls = declared_names(host_tokens, top_level_only=True)
+    router_tokens = _tokens(html, router[1] + 1, router[2])
+    router_params = _tokens(html, router[0], router[1])
+    router_param_names = {t.text for t in router_params[router_params.index(
+        next(t for t in router_params if t.text == "(")):] if t.kind == "ident"}
+
+    # The branches form the tail of showSection: nothing may follow the
+    # if/else chain, otherwise a 'return' inside a moved branch would differ.
+    sections = sorted((sp for spans in idx.sections.values() for sp in spans
+                       if router[1] < sp[0] < router[2]), key=lambda sp: sp[0])
+    names_by_span = {tuple(sp): name for name, spans in idx.sections.items() for sp in spans}
+    if not sections:
+        return html, {}, ["showSection has no section branches – nothing split"]
+    tail = _tokens(html, sections[-1][2] + 1, router[2])
+    if tail and tail[0].text == "else":
+        tail = tail[_closing(tail, 1) + 1:] if tail[1].text == "{" else tail
+    if tail:
+        return html, {}, ["code follows the showSection if/else chain – nothing split"]
+
+    # startApp-level function declarations: movable candidates.
+    host_fns = {}
+    for name, spans in idx.functions.items():
+        sp = spans[0]
+        if (len(spans) == 1 and host[1] < sp[0] < host[2] and sp[3] == host[3] + 1
+                and FUNCTION_DECL_RE.match(html, sp[0]) and name != ROUTER_FUNCTION):
+            host_fns[name] = sp
+    # ``window.name = function () {...};`` handlers and ``window.name = name;``
+    # exports at startApp level.  They only serve onclick attributes, so they
+    # move with the section whose markup is their only user.
+    window_fns, exports = _window_exports(html, host, idx, host_fns)
+    # Exclusive end of the code moved for each unit.
+    unit_end = {name: sp[2] + 1 for name, sp in host_fns.items()}
+    unit_end.update({name: span[1] for name, span in window_fns.items()})
+    units = {**host_fns, **{name: idx.functions[name][0] for name in window_fns}}
+    fn_starts = sorted((sp[0], unit_end[name] - 1, name) for name, sp in units.items())
+    starts = [s for s, _, _ in fn_starts]
+    occurrences: Dict[str, List[int]] = {name: [] for name in units}
+    decl_pos = {name: re.compile(r"(?<![\w$])%s(?![\w$])" % re.escape(name)).search(html, sp[0]).start()
+                for name, sp in units.items()}
+    if units:
+        comments = _comment_spans(html)
+        comment_starts = [lo for lo, _ in comments]
+        word_re = re.compile(r"(?<![\w$])(?:%s)(?![\w$])" % "|".join(
+            sorted(map(re.escape, units), key=len, reverse=True)))
+        for m in word_re.finditer(html):
+            k = bisect_right(comment_starts, m.start()) - 1
+            if k >= 0 and m.start() < comments[k][1]:
+                continue
+            occurrences[m.group()].append(m.start())
+
+    def container(pos: int, chunk: Tuple[int, int]) -> str:
+        if chunk[0] <= pos < chunk[1]:
+            return "<chunk>"
+        k = bisect_right(starts, pos) - 1
+        if k >= 0 and pos <= fn_starts[k][1]:
+            return fn_starts[k][2]
+        for name, (lo, hi) in exports.items():
+            if lo <= pos < hi:
+                return name
+        return "<outside>"
+
+    def referenced(lo: int, hi: int) -> Set[str]:
+        """Units used by ``html[lo:hi]``: as identifiers, or by name from markup."""
+        names = {n for n in free_identifiers(_tokens(html, lo, hi)) if n in host_fns}
+        return names | {n for n in set(window_fns) | set(exports)
+                        if any(lo <= pos < hi for pos in occurrences[n])}
+
+    edits: List[Tuple[int, int, str]] = []
+    modules: Dict[str, SectionModule] = {}
+    moved_anywhere: Set[str] = set()
+
+    for sp in sections:
+        section = names_by_span[tuple(sp)]
+        chunk = (sp[1] + 1, sp[2])
+        if section in eager:
+            continue
+        chunk_tokens = _tokens(html, *chunk)
+        chunk_idents = free_identifiers(chunk_tokens)
+
+        # Functions only reachable from this chunk (fixed point).
+        moved = referenced(*chunk) - moved_anywhere
+        frontier = list(moved)
+        while frontier:
+            fn_sp = units[frontier.pop()]
+            for n in referenced(fn_sp[1] + 1, fn_sp[2]):
+                if n not in moved and n not in moved_anywhere:
+                    moved.add(n)
+                    frontier.append(n)
+        # Router bindings visible at the branch: its lexical declarations
+        # before the if/else chain plus hoisted var/function names from
+        # anywhere but this chunk.
+        router_rest = [t for t in router_tokens if not chunk[0] <= t.start < chunk[1]]
+        router_visible = {**declared_names(_tokens(html, router[1] + 1, sections[0][0]), True),
+                          **{n: k for n, k in declared_names(router_rest).items()
+                             if k in ("var", "function")},
+                          **{n: "param" for n in router_param_names}}
+        shadowed_by_router = set(router_visible) - set(host_fns)
+
+        # Drop functions referenced from anywhere else, and functions that
+        # need a startApp binding the router shadows (the accessors are
+        # created inside showSection), until nothing changes.
+        changed = True
+        while changed:
+            changed = False
+            for n in sorted(moved):
+                for pos in occurrences[n]:
+                    if pos == decl_pos[n]:
+                        continue
+                    where = container(pos, chunk)
+                    if where != "<chunk>" and where not in moved:
+                        break
+                else:
+                    if not rewrite(html, units[n][0], unit_end[n], shadowed_by_router)[2]:
+                        continue
+                moved.discard(n)
+                changed = True
+
+        parts = [(chunk[0], chunk[1])] + [(units[n][0], unit_end[n]) for n in moved]
+        size = sum(hi - lo for lo, hi in parts)
+        if size < min_bytes:
+            continue
+
+        candidates = (set(host_decls) | set(router_visible)) - moved
+        if _own_this(chunk_tokens):
+            report.append(f"{section}: left inline – uses this/arguments at branch level")
+            continue
+
+        routed: Set[str] = set()
+        pieces = []
+        for n in sorted(moved, key=lambda n: units[n][0]):
+            code, expected, used = rewrite(html, units[n][0], unit_end[n], candidates)
+            _verify_rewrite(code, expected, f"{section}/{n}")
+            pieces.append(code)
+            routed |= used
+        # Exports run when the module loads, before its first render.
+        pieces += [html[slice(*exports[n])] for n in sorted(moved & set(exports), key=lambda n: exports[n][0])]
+        body, expected, used = rewrite(html, chunk[0], chunk[1], candidates)
+        _verify_rewrite(body, expected, f"{section} branch")
+        routed |= used
+        # ``__scope.fn()`` calls fn with ``this === __scope``.
+        this_users = sorted(n for n in routed & set(host_fns)
+                            if _own_this(_tokens(html, host_fns[n][1] + 1, host_fns[n][2])))
+        if this_users:
+            report.append(f"{section}: left inline – routed function(s) use this: {', '.join(this_users)}")
+            continue
+        kinds = {**host_decls, **router_visible}
+        routed_sorted = sorted(routed)
+
+        module_code = (
+            f"/* showSection('{section}') – generated by split_sections.py */\n"
+            f"(window.__sectionRenderers = window.__sectionRenderers || {{}})['{section}'] = (function () {{\n"
+            f"  let {SCOPE_VAR};\n"
+            + "\n".join(pieces) +
+            f"\n  return function ({SCOPE_VAR}Arg) {{\n"
+            f"    {SCOPE_VAR} = {SCOPE_VAR}Arg;\n"
+            f"{body}\n"
+            f"  }};\n"
+            f"}})();\n"
+        )
+        indent = " " * 8
+        call = (f"\n{indent}renderSectionModule('{section}', content, {{\n"
+                f"{_accessors(routed_sorted, kinds, indent)}\n{indent}}});\n      ")
+        modules[section] = SectionModule(section, module_code, call, sorted(moved), routed_sorted)
+        moved_anywhere |= moved
+        edits.append((chunk[0], chunk[1], call))
+        for n in moved:
+            edits.append((units[n][0], unit_end[n], f"/* {n}() → section module '{section}' */"))
+            if n in exports:
+                edits.append((*exports[n], f"/* window.{n} → section module '{section}' */"))
+        report.append(f"{section}: {size / 1024:.1f} KB → lazy module "
+                      f"({len(moved)} function(s) moved, {len(routed)} name(s) routed)")
+
+    if not modules:
+        return html, {}, report or ["no section large enough to split"]
+
+    out: List[str] = []
+    pos = 0
+    for lo, hi, new in sorted(edits):
+        if lo < pos:
+            raise SplitError(f"Overlapping split edits at offset {lo}")
+        out.append(html[pos:lo])
+        out.append(new)
+        pos = hi
+    out.append(html[pos:])
+    new_html = "".join(out)
+
+    removed = [(lo, hi) for lo, hi, _ in edits]
+    inside = {name for name, spans in idx.functions.items()
+              if all(any(lo <= sp[0] < hi for lo, hi in removed) for sp in spans)}
+    _verify_split(html, new_html, modules, inside)
+    return new_html, modules, report
+
+
+def _verify_rewrite(code: str, expected: List[str], label: str) -> None:
+    got = [t.text for t in _tokens(code, 0, len(code))]
+    if got != expected:
+        k = next((i for i, (a, b) in enumerate(zip(got, expected)) if a != b), min(len(got), len(expected)))
+        raise SplitError(f"{label}: rewrite changed the token stream near token {k}: "
+                         f"{got[k:k + 6]} vs {expected[k:k + 6]}")
+
+
+def _verify_split(old_html: str, new_html: str, modules: Dict[str, SectionModule],
+                  moved: Set[str]) -> None:
+    if _script_globals(old_html) != _script_globals(new_html):
+        diff = _script_globals(old_html) ^ _script_globals(new_html)
+        raise SplitError(f"split changed script-level globals: {sorted(diff)[:10]}")
+    old_idx, new_idx = build_index(old_html), build_index(new_html)
+    if set(old_idx.functions) - moved != set(new_idx.functions):
+        raise SplitError("split changed the set of functions left in index.html: "
+                         f"{sorted((set(old_idx.functions) - moved) ^ set(new_idx.functions))[:10]}")
+    for m in modules.values():
+        depth = sum({"{": 1, "}": -1}.get(t.text, 0) for t in _tokens(m.code, 0, len(m.code)))
+        if depth:
+            raise SplitError(f"section module '{m.section}' has unbalanced braces")
+        _node_check(m.code, f"section module '{m.section}'")
+    for lo, hi in inline_scripts(new_html):
+        if hi - lo > SPLIT_MIN_BYTES:
+            _node_check(new_html[lo:hi], "index.html main script after split")
+
+
+def inject_manifest(html: str, urls: Dict[str, str]) -> str:
+    """Fill the SECTION_MODULES placeholder with ``{section: url}``.
+
+    Lazy-script modules get their URL written into their loader instead.
+    """
+    sections = {}
+    for k, v in urls.items():
+        placeholder = MODULE_URL_PLACEHOLDER.format(k)
+        if placeholder in html:
+            html = html.replace(placeholder, v)
+        else:
+            sections[k] = v
+    entries = ", ".join(f"'{k}': '{v}'" for k, v in sorted(sections.items()))
+    return html.replace(MANIFEST_PLACEHOLDER, f"const SECTION_MODULES = {{ {entries} }};", 1)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    page = Path(argv[0] if argv else "index.html")
+    html = page.read_text(encoding="utf-8")
+    try:
+        new_html, modules, report = split_page(html)
+    except SplitError as err:
+        print(f"❌ [split_sections] {err}", file=sys.stderr)
+        return 1
+    for line in report:
+        print(f"  {line}")
+    print(f"{page}: {len(html) / 1024:.1f} KB → {len(new_html) / 1024:.1f} KB inline, "
+          f"{sum(len(m.code) for m in modules.values()) / 1024:.1f} KB in "
+          f"{len(modules)} lazy module(s) (dry run)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
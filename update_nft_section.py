@@ -1,30 +1,10 @@
 #!/usr/bin/env python3
-import re
+import sys
 
-# Read the file
-with open('index.html', 'r', encoding='utf-8') as f:
-    content = f.read()
+from patch_engine import ReplaceSectionBody, main
 
-# Find and replace the entire NFT section content
-# Look for the NFT section rendering
-nft_section_start = content.find("else if (id === 'nft') {")
-if nft_section_start != -1:
-    # Find the end of this section (next else or closing brace)
-    brace_count = 0
-    pos = content.find('{', nft_section_start)
-    start_content = pos + 1
-    i = pos
-    while i < len(content):
-        if content[i] == '{':
-            brace_count += 1
-        elif content[i] == '}':
-            brace_count -= 1
-            if brace_count == 0:
-                end_content = i
-                break
-        i += 1
-    
-    new_nft_section = '''
+# Replaces the entire body of the NFT section rendering in showSection
+NEW_NFT_SECTION = '''
         loadUserNFTs(); // Load NFTs from wallet
         content.innerHTML = `
           <h2 style="text-align:center; margin:40px 0; color:#60a5fa;">NFT Staking</h2>
@@ -93,12 +73,14 @@ if nft_section_start != -1:
             ⛽ Gas Fee: ${GAS_FEE_USDC} USDC per transaction | APY varies by NFT rarity
           </p>
         `;'''
-    
-    # Replace the content between braces
-    content = content[:start_content] + new_nft_section + content[end_content:]
 
-# Save
-with open('index.html', 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    ReplaceSectionBody("nft", NEW_NFT_SECTION,
+                       skip_if="loadUserNFTs(); // Load NFTs from wallet"),
+]
 
-print("NFT section UI updated with Web3 integration")
+if __name__ == "__main__":
+    status = main([*sys.argv[1:], __file__])
+    if status == 0:
+        print("NFT section UI updated with Web3 integration")
+    raise SystemExit(status)
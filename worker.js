@@ -10,15 +10,24 @@
  *   GET /api/new-tokens            – Newest pools on Base via GeckoTerminal
  *   GET /api/token/:address        – Token detail (price, volume, liquidity)
  *   GET /api/ohlcv/:poolAddress    – OHLCV candles for a pool (for live chart)
- *   GET /api/user-data/:address    – Load persisted user data from KV
- *   PUT /api/user-data/:address    – Save persisted user data to KV
+ *   GET /api/snapshot              – Batched prices / tokens / pools / OHLCV
+ *   GET /api/user-data/:address    – Load persisted user data from KV (ETag / ?since= delta)
+ *   PUT /api/user-data/:address    – Merge-patch persisted user data in KV (If-Match)
+ *   POST /api/login-history        – Record a login event (buffered, written in batches)
+ *   GET /api/login-history         – Latest login events (?address=0x… or ?method=email)
  *
  * All other paths → forwarded to static assets (Pages handles the response).
  *
+ * Market-data routes are served through a Cache API edge cache with
+ * stale-while-revalidate, request coalescing and 429 back-off (see
+ * cachedUpstream); the X-Edge-Cache response header reports HIT / STALE / MISS.
+ *
  * NOTE: No private keys are stored or used here. All on-chain transactions
  * (buy/sell swaps) are signed client-side via the user's wallet (MetaMask /
  * WalletConnect). This worker is a CORS proxy only.
  *
+ * Load test locally (KV / cache / upstream stand-ins): node bench-worker.js
+ *
  * KV Namespaces (bind via Cloudflare dashboard or wrangler.toml):
  *   LOGIN_HISTORY_KV – login history records
  *   USER_DATA_KV     – per-user portfolio / staking data
@@ -31,7 +40,7 @@ const TWITTER_CLIENT_ID   = 'OE85S0o0eDlLQ2lRWlIycEkyOGM6MTpjaQ';
 const CORS_HEADERS = {
   'Access-Control-Allow-Origin': '*',
   'Access-Control-Allow-Methods': 'GET, PUT, POST, OPTIONS',
-  'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+  'Access-Control-Allow-Headers': 'Content-Type, Authorization, If-Match, If-None-Match',
   'Content-Type': 'application/json',
 };
 const ETH_ADDRESS_RE = /^0x[0-9a-fA-F]{40}$/;
@@ -43,42 +52,529 @@ const USER_DATA_TTL = 60 * 60 * 24 * 180;
 const USER_DATA_MAX_BYTES = 256 * 1024;
 // Maximum login-history method string length
 const METHOD_MAX_LEN = 50;
+// Login history: events are buffered per isolate and written in batches
+const LOGIN_HISTORY_TTL   = 60 * 60 * 24 * 90;  // batch key TTL: 90 days
+const LOGIN_HISTORY_MAX   = 20;     // events returned by GET
+const LOGIN_FLUSH_MS      = 1000;   // buffer window before a batch write
+const LOGIN_BUFFER_MAX    = 200;    // buffered events that force an early flush
+const LOGIN_COMPACT_AFTER = 8;      // batch keys per owner before a flush compacts them
+const LOGIN_READ_CHUNK    = 4;      // batch keys fetched per round by GET
+const LOGIN_OWNERS_MAX    = 10000;  // owners tracked per isolate for compaction checks
+const LOGIN_TS_MAX        = 1e13;   // inverted-timestamp base (ms, year 2286)
 // Cache-Control TTLs for proxied market data (seconds)
 const CACHE_TTL_MARKETS = 60;   // trending / new pools: refresh every 60 s
 const CACHE_TTL_TOKEN   = 120;  // token detail: refresh every 2 min
 const CACHE_TTL_OHLCV   = 30;   // OHLCV candles: refresh every 30 s
 
+// Batched /api/snapshot limits and per-part TTLs (seconds)
+const COINGECKO_BASE        = 'https://api.coingecko.com/api/v3';
+const BYBIT_TICKERS_URL     = 'https://api.bybit.com/v5/market/tickers?category=linear';
+const BINANCE_FUTURES_PRICE = 'https://fapi.binance.com/fapi/v1/ticker/price';
+const CACHE_TTL_COINS       = 60;   // CoinGecko simple prices
+const CACHE_TTL_TICKERS     = 15;   // exchange last prices
+const SNAPSHOT_MAX_ADDRESSES = 30;  // GeckoTerminal multi endpoints accept up to 30
+const SNAPSHOT_MAX_OHLCV     = 8;   // pool × timeframe series per snapshot
+const SNAPSHOT_MAX_FALLBACK  = 10;  // per-symbol Binance calls when Bybit lacks prices
+const SNAPSHOT_MAX_IDS       = 100; // CoinGecko ids / exchange symbols per snapshot
+const OHLCV_TIMEFRAMES = ['minute', 'hour', 'day'];
+const COINGECKO_ID_RE  = /^[a-z0-9-]{1,64}$/;
+const SYMBOL_RE        = /^[A-Z0-9]{2,20}$/;
+
+// Worker-side edge cache for proxied market data (Workers Cache API).
+// Entries stay in the cache for CACHE_TTL_* + CACHE_STALE_WINDOW seconds; past
+// the TTL they are served stale while one background fetch revalidates them.
+const EDGE_CACHE_ORIGIN  = 'https://edge-cache.internal'; // synthetic cache-key origin
+const CACHE_STALE_WINDOW = 300;  // serve stale up to 5 min past the TTL
+const BACKOFF_MIN        = 15;   // first pause after a 429 without Retry-After (s)
+const BACKOFF_MAX        = 300;  // longest pause between upstream attempts (s)
+
+// Per-isolate state: concurrent misses for the same key share one upstream
+// fetch, and a 429 pauses every call to that upstream host until it expires.
+const upstreamInflight = new Map();
+const upstreamBackoff = new Map();   // host → { until, secs }
+
 /**
- * Fetch a GeckoTerminal endpoint and return a Response with CORS headers.
- * Adds the Accept header required by their API.
- * @param {string} path  GeckoTerminal API path
- * @param {object} env   Worker env bindings
- * @param {number} [cacheTtl=60]  Cache-Control max-age in seconds
+ * Normalise an upstream URL into a cache key (query params sorted, so
+ * `?a=1&b=2` and `?b=2&a=1` share one entry).
+ * @param {string} upstreamUrl  absolute upstream URL
+ */
+function upstreamCacheKey(upstreamUrl) {
+  const url = new URL(upstreamUrl);
+  url.searchParams.sort();
+  return `${EDGE_CACHE_ORIGIN}/${url.host}${url.pathname}${url.search}`;
+}
+
+function backoffRemaining(host, now = Date.now()) {
+  const state = upstreamBackoff.get(host);
+  return state && now < state.until ? Math.ceil((state.until - now) / 1000) : 0;
+}
+
+/**
+ * Call an upstream JSON API once.  Resolves to { ok, status, body, retryAfter }
+ * and never throws; a 429 arms the back-off for that host.
+ */
+async function fetchUpstream(upstreamUrl, headers) {
+  const host = new URL(upstreamUrl).host;
+  try {
+    const upstreamRes = await fetch(upstreamUrl, { headers });
+    if (upstreamRes.status === 429) {
+      const state = upstreamBackoff.get(host) || { until: 0, secs: 0 };
+      const retryAfter = parseInt(upstreamRes.headers.get('Retry-After') || '', 10);
+      state.secs = Math.min(Math.max(state.secs * 2, BACKOFF_MIN), BACKOFF_MAX);
+      const pause = isNaN(retryAfter) ? state.secs : Math.min(retryAfter, BACKOFF_MAX);
+      state.until = Date.now() + pause * 1000;
+      upstreamBackoff.set(host, state);
+      return { ok: false, status: 429, body: null, retryAfter: pause };
+    }
+    if (!upstreamRes.ok) {
+      return { ok: false, status: upstreamRes.status, body: null, retryAfter: 0 };
+    }
+    upstreamBackoff.delete(host);
+    const data = await upstreamRes.json();
+    return { ok: true, status: 200, body: JSON.stringify(data), retryAfter: 0 };
+  } catch (err) {
+    console.error(`[edge-cache] Upstream fetch failed for ${host}:`, err);
+    return { ok: false, status: 502, body: null, retryAfter: 0 };
+  }
+}
+
+/**
+ * Fetch `upstreamUrl` and store a successful result in the edge cache.
+ * Concurrent calls for the same key share a single upstream request.
+ */
+function refreshUpstream(upstreamUrl, headers, key, cacheTtl, cache, ctx) {
+  if (upstreamInflight.has(key)) return upstreamInflight.get(key);
+  const pending = (async () => {
+    const result = await fetchUpstream(upstreamUrl, headers);
+    if (result.ok && cache) {
+      const stored = new Response(result.body, {
+        headers: {
+          'Content-Type': 'application/json',
+          'Cache-Control': `public, max-age=${cacheTtl + CACHE_STALE_WINDOW}`,
+          'X-Cache-Stored-At': String(Date.now()),
+        },
+      });
+      const put = cache.put(key, stored).catch(err => console.error('[edge-cache] Cache put failed:', err));
+      if (ctx) ctx.waitUntil(put); else await put;
+    }
+    return result;
+  })().finally(() => upstreamInflight.delete(key));
+  upstreamInflight.set(key, pending);
+  return pending;
+}
+
+/**
+ * Read an upstream JSON API through the edge cache.
+ *
+ * Fresh entries (younger than cacheTtl) are returned as HIT.  Entries within
+ * CACHE_STALE_WINDOW past the TTL are returned as STALE immediately while a
+ * coalesced background fetch (ctx.waitUntil) refreshes them.  Misses wait for
+ * the upstream fetch (MISS).  While the host is backing off after a 429 no
+ * upstream call is made: stale data is served without revalidation and misses
+ * fail with status 429 and `retryAfter`.
+ * Resolves to { ok, status, body, cacheState, age, retryAfter }.
+ * @param {string} upstreamUrl  absolute upstream URL
+ * @param {object} headers      request headers for the upstream call
+ * @param {number} cacheTtl     freshness in seconds
+ * @param {object} [ctx]        Worker execution context (for waitUntil)
  */
-async function proxyGecko(path, env, cacheTtl = CACHE_TTL_MARKETS) {
+async function cachedUpstream(upstreamUrl, headers, cacheTtl, ctx) {
+  const cache = typeof caches !== 'undefined' ? caches.default : null;
+  const key = upstreamCacheKey(upstreamUrl);
+  const host = new URL(upstreamUrl).host;
+  const now = Date.now();
+
+  const cached = cache ? await cache.match(key) : null;
+  if (cached) {
+    const storedAt = Number(cached.headers.get('X-Cache-Stored-At')) || 0;
+    const age = Math.max(0, Math.floor((now - storedAt) / 1000));
+    const body = await cached.text();
+    if (age < cacheTtl) return { ok: true, status: 200, body, cacheState: 'HIT', age, retryAfter: 0 };
+    if (!backoffRemaining(host, now)) {
+      const revalidate = refreshUpstream(upstreamUrl, headers, key, cacheTtl, cache, ctx);
+      if (ctx) ctx.waitUntil(revalidate);
+    }
+    return { ok: true, status: 200, body, cacheState: 'STALE', age, retryAfter: 0 };
+  }
+
+  const wait = backoffRemaining(host, now);
+  if (wait) return { ok: false, status: 429, body: null, cacheState: 'MISS', age: 0, retryAfter: wait };
+
+  const result = await refreshUpstream(upstreamUrl, headers, key, cacheTtl, cache, ctx);
+  return { ...result, cacheState: 'MISS', age: 0 };
+}
+
+function geckoHeaders(env) {
   const headers = { Accept: 'application/json;version=20230302' };
   if (env && env.GECKOTERMINAL_API_KEY) {
     headers['Authorization'] = `Bearer ${env.GECKOTERMINAL_API_KEY}`;
   }
+  return headers;
+}
 
-  const upstreamRes = await fetch(`${GECKO_BASE}${path}`, { headers });
-  if (!upstreamRes.ok) {
-    return new Response(
-      JSON.stringify({ error: `Upstream error: ${upstreamRes.status}` }),
-      { status: upstreamRes.status, headers: CORS_HEADERS }
-    );
-  }
-  const data = await upstreamRes.json();
-  return new Response(JSON.stringify(data), {
+function cachedJsonResponse(body, cacheTtl, cacheState, age = 0) {
+  return new Response(body, {
     headers: {
       ...CORS_HEADERS,
-      'Cache-Control': `public, max-age=${cacheTtl}, s-maxage=${cacheTtl}`,
+      'Cache-Control': `public, max-age=${Math.max(cacheTtl - age, 0)}, s-maxage=${cacheTtl}`,
+      'Access-Control-Expose-Headers': 'X-Edge-Cache, Age',
+      'X-Edge-Cache': cacheState,
+      'Age': String(age),
     },
   });
 }
 
+/**
+ * Fetch a GeckoTerminal endpoint through the edge cache and return a
+ * Response with CORS headers and X-Edge-Cache (HIT / STALE / MISS).
+ * @param {string} path  GeckoTerminal API path
+ * @param {object} env   Worker env bindings
+ * @param {number} [cacheTtl=60]  freshness / Cache-Control max-age in seconds
+ * @param {object} [ctx]  Worker execution context (for waitUntil)
+ */
+async function proxyGecko(path, env, cacheTtl = CACHE_TTL_MARKETS, ctx) {
+  const result = await cachedUpstream(`${GECKO_BASE}${path}`, geckoHeaders(env), cacheTtl, ctx);
+  if (!result.ok) {
+    const headers = { ...CORS_HEADERS, 'X-Edge-Cache': result.cacheState };
+    if (result.retryAfter) headers['Retry-After'] = String(result.retryAfter);
+    return new Response(
+      JSON.stringify({ error: `Upstream error: ${result.status}` }),
+      { status: result.status, headers }
+    );
+  }
+  return cachedJsonResponse(result.body, cacheTtl, result.cacheState, result.age);
+}
+
+/** Split a comma-separated query param into unique, validated, capped items. */
+function listParam(url, name, re, max, normalise = v => v) {
+  const raw = url.searchParams.get(name);
+  if (!raw) return [];
+  const items = raw.split(',').map(v => normalise(v.trim())).filter(v => re.test(v));
+  return [...new Set(items)].slice(0, max);
+}
+
+function compactPool(item) {
+  const a = (item && item.attributes) || {};
+  return {
+    address: a.address,
+    name: a.name,
+    priceUsd: Number(a.base_token_price_usd) || null,
+    change24h: Number(a.price_change_percentage && a.price_change_percentage.h24) || 0,
+    volume24h: Number(a.volume_usd && a.volume_usd.h24) || 0,
+    liquidityUsd: Number(a.reserve_in_usd) || 0,
+    fdvUsd: Number(a.fdv_usd) || null,
+  };
+}
+
+function compactToken(item) {
+  const a = (item && item.attributes) || {};
+  return {
+    address: a.address,
+    name: a.name,
+    symbol: a.symbol,
+    priceUsd: Number(a.price_usd) || null,
+    volume24h: Number(a.volume_usd && a.volume_usd.h24) || 0,
+    liquidityUsd: Number(a.total_reserve_in_usd) || 0,
+    marketCapUsd: Number(a.market_cap_usd) || null,
+    fdvUsd: Number(a.fdv_usd) || null,
+  };
+}
+
+/**
+ * GET /api/snapshot – every market-data part the dashboard needs, in one
+ * request.  Query params (all optional, comma-separated):
+ *   coins=bitcoin,ethereum          CoinGecko ids → { id: { usd, change24h } }
+ *   symbols=BTCUSDT,ETHUSDT         exchange last prices (Bybit, Binance fallback)
+ *   tokens=0x…,0x…                  Base token details (GeckoTerminal multi)
+ *   pools=0x…,0x…                   Base pool details (GeckoTerminal multi)
+ *   timeframes=hour,day [&limit=24] OHLCV for every pool × timeframe
+ *   markets=trending,new            trending / newest Base pools
+ * Parts are fetched in parallel through the edge cache.  Each part reports its
+ * own ttl, cache state and age; failed parts are listed under `errors` so the
+ * client can fall back for just those.
+ */
+async function handleSnapshot(url, env, ctx) {
+  const coins = listParam(url, 'coins', COINGECKO_ID_RE, SNAPSHOT_MAX_IDS, v => v.toLowerCase()).sort();
+  const symbols = listParam(url, 'symbols', SYMBOL_RE, SNAPSHOT_MAX_IDS, v => v.toUpperCase()).sort();
+  const tokens = listParam(url, 'tokens', ETH_ADDRESS_RE, SNAPSHOT_MAX_ADDRESSES, v => v.toLowerCase()).sort();
+  const pools = listParam(url, 'pools', ETH_ADDRESS_RE, SNAPSHOT_MAX_ADDRESSES, v => v.toLowerCase()).sort();
+  const timeframes = listParam(url, 'timeframes', /^[a-z]+$/, OHLCV_TIMEFRAMES.length, v => v.toLowerCase())
+    .filter(tf => OHLCV_TIMEFRAMES.includes(tf));
+  const markets = listParam(url, 'markets', /^(trending|new)$/, 2, v => v.toLowerCase());
+  const limitParam = parseInt(url.searchParams.get('limit') || String(DEFAULT_OHLCV_LIMIT), 10);
+  const limit = Math.min(isNaN(limitParam) ? DEFAULT_OHLCV_LIMIT : limitParam, MAX_OHLCV_LIMIT);
+
+  const gecko = geckoHeaders(env);
+  const jobs = {};   // part name → Promise<{ ttl, cache, age, data }>
+  const load = async (upstreamUrl, headers, ttl, pick) => {
+    const res = await cachedUpstream(upstreamUrl, headers, ttl, ctx);
+    if (!res.ok) throw new Error(`Upstream error: ${res.status}`);
+    return { ttl, cache: res.cacheState, age: res.age, data: pick(JSON.parse(res.body)) };
+  };
+
+  if (coins.length) {
+    jobs.coins = load(
+      `${COINGECKO_BASE}/simple/price?ids=${coins.join(',')}&vs_currencies=usd&include_24hr_change=true`,
+      { Accept: 'application/json' }, CACHE_TTL_COINS,
+      raw => Object.fromEntries(Object.entries(raw || {}).map(([id, d]) =>
+        [id, { usd: d.usd, change24h: d.usd_24h_change || 0 }])),
+    );
+  }
+  if (symbols.length) {
+    jobs.tickers = (async () => {
+      const wanted = new Set(symbols);
+      const prices = {};
+      let part = null;
+      try {
+        part = await load(BYBIT_TICKERS_URL, { Accept: 'application/json' }, CACHE_TTL_TICKERS, raw => raw);
+        const list = (part.data && part.data.retCode === 0 && part.data.result && part.data.result.list) || [];
+        list.forEach(t => {
+          const price = parseFloat(t.lastPrice);
+          if (wanted.has(t.symbol) && price > 0) prices[t.symbol] = price;
+        });
+      } catch (err) {
+        console.log('[snapshot] Bybit tickers unavailable:', err.message);
+      }
+      // Binance Futures fallback: /fapi/v1/ticker/price only takes `symbol`
+      // (without it every futures pair comes back), so one call per pair,
+      // capped to keep the snapshot within the subrequest budget
+      const missing = symbols.filter(sym => !prices[sym]).slice(0, SNAPSHOT_MAX_FALLBACK);
+      const futures = await Promise.all(missing.map(sym => load(
+        `${BINANCE_FUTURES_PRICE}?symbol=${sym}`,
+        { Accept: 'application/json' }, CACHE_TTL_TICKERS, raw => raw,
+      ).catch(() => null)));
+      futures.forEach(fut => {
+        const t = fut && fut.data;
+        const price = t ? parseFloat(t.price) : 0;
+        if (t && wanted.has(t.symbol) && price > 0) prices[t.symbol] = price;
+        part = part || fut;
+      });
+      if (!Object.keys(prices).length) throw new Error('No exchange prices available');
+      return { ttl: CACHE_TTL_TICKERS, cache: part ? part.cache : 'MISS', age: part ? part.age : 0, data: prices };
+    })();
+  }
+  if (tokens.length) {
+    jobs.tokens = load(`${GECKO_BASE}/networks/base/tokens/multi/${tokens.join(',')}`, gecko, CACHE_TTL_TOKEN,
+      raw => (raw.data || []).map(compactToken));
+  }
+  if (pools.length) {
+    jobs.pools = load(`${GECKO_BASE}/networks/base/pools/multi/${pools.join(',')}`, gecko, CACHE_TTL_MARKETS,
+      raw => (raw.data || []).map(compactPool));
+    const series = pools.flatMap(pool => timeframes.map(tf => [pool, tf])).slice(0, SNAPSHOT_MAX_OHLCV);
+    if (series.length) {
+      jobs.ohlcv = Promise.all(series.map(([pool, tf]) => load(
+        `${GECKO_BASE}/networks/base/pools/${pool}/ohlcv/${tf}?limit=${limit}&currency=usd`, gecko, CACHE_TTL_OHLCV,
+        raw => (raw.data && raw.data.attributes && raw.data.attributes.ohlcv_list) || [],
+      ).then(part => [`${pool}:${tf}`, part]))).then(entries => ({
+        ttl: CACHE_TTL_OHLCV,
+        cache: entries.every(([, p]) => p.cache === 'HIT') ? 'HIT' : entries.some(([, p]) => p.cache === 'MISS') ? 'MISS' : 'STALE',
+        age: Math.max(...entries.map(([, p]) => p.age)),
+        data: Object.fromEntries(entries.map(([k, p]) => [k, p.data])),
+      }));
+    }
+  }
+  markets.forEach(kind => {
+    const endpoint = kind === 'trending' ? 'trending_pools' : 'new_pools';
+    jobs[kind] = load(`${GECKO_BASE}/networks/base/${endpoint}?page=1&include=base_token,quote_token`, gecko,
+      CACHE_TTL_MARKETS, raw => (raw.data || []).map(compactPool));
+  });
+
+  const names = Object.keys(jobs);
+  if (!names.length) {
+    return new Response(JSON.stringify({ error: 'Nothing requested' }), { status: 400, headers: CORS_HEADERS });
+  }
+  const settled = await Promise.allSettled(names.map(name => jobs[name]));
+  const parts = {};
+  const errors = {};
+  settled.forEach((r, i) => {
+    if (r.status === 'fulfilled') parts[names[i]] = r.value;
+    else errors[names[i]] = r.reason && r.reason.message ? r.reason.message : 'failed';
+  });
+  const ttl = Math.min(...Object.values(parts).map(p => Math.max(p.ttl - p.age, 0)), CACHE_TTL_MARKETS);
+  return new Response(JSON.stringify({ ok: true, ts: Date.now(), parts, errors }), {
+    headers: { ...CORS_HEADERS, 'Cache-Control': `public, max-age=${Object.keys(parts).length ? ttl : 0}` },
+  });
+}
+
+/**
+ * Apply an RFC 7386 JSON merge patch: objects merge recursively, `null`
+ * deletes a key, everything else (arrays included) replaces the target.
+ */
+function applyMergePatch(target, patch) {
+  if (!patch || typeof patch !== 'object' || Array.isArray(patch)) return patch;
+  const out = target && typeof target === 'object' && !Array.isArray(target) ? { ...target } : {};
+  for (const [key, value] of Object.entries(patch)) {
+    if (value === null) delete out[key];
+    else out[key] = applyMergePatch(out[key], value);
+  }
+  return out;
+}
+
+/**
+ * Read a user-data record.  Records are stored as
+ * `{ v, keys: { key: versionLastChanged }, data, updatedAt }`; older flat
+ * payloads written before versioning are upgraded on read as version 1.
+ */
+async function readUserRecord(kv, addr) {
+  const stored = await kv.get(addr, { type: 'json' });
+  if (!stored) return { v: 0, keys: {}, data: {}, updatedAt: 0 };
+  if (typeof stored.v === 'number' && stored.data && stored.keys) return stored;
+  const data = { ...stored };
+  delete data.updatedAt;
+  return { v: 1, keys: Object.fromEntries(Object.keys(data).map(k => [k, 1])), data, updatedAt: stored.updatedAt || 0 };
+}
+
+/*
+ * Write-behind login history.
+ *
+ * A POST only appends the event to an isolate-local buffer; one flush per
+ * LOGIN_FLUSH_MS (kept alive with ctx.waitUntil) writes each owner's
+ * buffered events as a new key
+ *   login:<owner>:<LOGIN_TS_MAX − newest ts, zero-padded>:<isolate>-<seq>
+ * so a login never reads KV, concurrent logins never overwrite each other
+ * and the busy `method:email` / `method:x` owners spread over many keys.
+ * The inverted timestamp makes KV list() return the newest batches first.
+ *
+ * GET is read-only: it fetches the newest batches in rounds of
+ * LOGIN_READ_CHUNK and stops once no unread batch can hold a newer event
+ * (a batch key carries the timestamp of its newest event), plus the
+ * pre-batch array under the bare owner key.  Compaction runs in the flush
+ * instead: on an isolate's first write for an owner and every
+ * LOGIN_COMPACT_AFTER-th after it, an owner with more than
+ * LOGIN_COMPACT_AFTER batches gets them merged into one and the read ones
+ * deleted.
+ */
+const loginBuffer = new Map();       // owner → [entry]
+const loginWrites = new Map();       // owner → batches written by this isolate
+let loginBuffered = 0;
+let loginFlush = null;
+let loginWriter = null;              // per-isolate id prefix, set on first use
+let loginSeq = 0;
+
+function loginId() {
+  if (!loginWriter) loginWriter = crypto.randomUUID().slice(0, 8);
+  return `${loginWriter}-${++loginSeq}`;
+}
+
+function loginBatchKey(owner, newestTs) {
+  const inverted = String(Math.max(LOGIN_TS_MAX - newestTs, 0)).padStart(14, '0');
+  return `login:${owner}:${inverted}:${loginId()}`;
+}
+
+// Timestamp of the newest event in a batch (owners may contain ':')
+function loginBatchNewest(name) {
+  const parts = name.split(':');
+  return LOGIN_TS_MAX - Number(parts[parts.length - 2]);
+}
+
+// Newest LOGIN_HISTORY_MAX distinct events of `lists`, newest first
+function mergeLoginEvents(lists) {
+  const seen = new Set();
+  return lists.flat()
+    .filter(e => e && typeof e.ts === 'number')
+    .filter(e => {
+      // Concurrent compactions can store an event twice; pre-batch entries have no id
+      const id = e.id || `${e.ts}|${e.method}|${e.address}`;
+      return !seen.has(id) && seen.add(id);
+    })
+    .sort((a, b) => b.ts - a.ts || String(b.id || '').localeCompare(String(a.id || ''), 'en', { numeric: true }))
+    .slice(0, LOGIN_HISTORY_MAX);
+}
+
+/**
+ * Merge an owner's batches into one when it has more than
+ * LOGIN_COMPACT_AFTER of them.  Only keys that were read are deleted, so
+ * batches written meanwhile survive.
+ */
+async function compactLoginHistory(kv, owner) {
+  const listed = await kv.list({ prefix: `login:${owner}:`, limit: LOGIN_COMPACT_AFTER * 4 });
+  const keys = listed.keys.map(k => k.name);
+  if (keys.length <= LOGIN_COMPACT_AFTER) return;
+  const [legacy, ...batches] = await Promise.all([
+    kv.get(owner, { type: 'json' }),
+    ...keys.map(name => kv.get(name, { type: 'json' })),
+  ]);
+  const stored = mergeLoginEvents([...batches, Array.isArray(legacy) ? legacy : []]).reverse();
+  if (stored.length) {
+    await kv.put(loginBatchKey(owner, stored[stored.length - 1].ts), JSON.stringify(stored),
+      { expirationTtl: LOGIN_HISTORY_TTL });
+  }
+  await Promise.all([...keys, ...(legacy ? [owner] : [])].map(name => kv.delete(name)));
+}
+
+async function flushLoginHistory(env) {
+  loginFlush = null;
+  const batches = [...loginBuffer];
+  loginBuffer.clear();
+  loginBuffered = 0;
+  await Promise.all(batches.map(async ([owner, entries]) => {
+    const newest = entries.reduce((m, e) => Math.max(m, e.ts), 0);
+    try {
+      await env.LOGIN_HISTORY_KV.put(loginBatchKey(owner, newest),
+        JSON.stringify(entries.slice(-LOGIN_HISTORY_MAX)), { expirationTtl: LOGIN_HISTORY_TTL });
+    } catch (err) {
+      console.error('[login-history] Batch write failed:', owner, err);
+      return;
+    }
+    if (loginWrites.size >= LOGIN_OWNERS_MAX && !loginWrites.has(owner)) loginWrites.clear();
+    const written = (loginWrites.get(owner) || 0) + 1;
+    loginWrites.set(owner, written);
+    if (written % LOGIN_COMPACT_AFTER !== 1) return;
+    try {
+      await compactLoginHistory(env.LOGIN_HISTORY_KV, owner);
+    } catch (err) {
+      console.error('[login-history] Compaction failed:', owner, err);
+    }
+  }));
+}
+
+function queueLogin(env, ctx, owner, entry) {
+  const list = loginBuffer.get(owner) || [];
+  list.push({ ...entry, id: loginId() });
+  loginBuffer.set(owner, list);
+  loginBuffered++;
+  if (loginBuffered >= LOGIN_BUFFER_MAX) {
+    ctx.waitUntil(flushLoginHistory(env));
+    return;
+  }
+  if (!loginFlush) {
+    loginFlush = new Promise(resolve => setTimeout(resolve, LOGIN_FLUSH_MS))
+      .then(() => (loginBuffered ? flushLoginHistory(env) : undefined));
+  }
+  ctx.waitUntil(loginFlush);
+}
+
+/**
+ * Newest LOGIN_HISTORY_MAX events of `owner`, newest first, including
+ * events still buffered in this isolate.  Read-only: never writes KV.
+ */
+async function readLoginHistory(env, owner) {
+  const kv = env.LOGIN_HISTORY_KV;
+  const [listed, legacy] = await Promise.all([
+    kv.list({ prefix: `login:${owner}:`, limit: LOGIN_COMPACT_AFTER * 4 }),
+    kv.get(owner, { type: 'json' }),
+  ]);
+  const keys = listed.keys.map(k => k.name);
+  const lists = [loginBuffer.get(owner) || [], Array.isArray(legacy) ? legacy : []];
+  let merged = mergeLoginEvents(lists);
+  for (let i = 0; i < keys.length; i += LOGIN_READ_CHUNK) {
+    // Keys are newest first: stop once the next batch cannot hold a newer event
+    if (merged.length >= LOGIN_HISTORY_MAX && merged[merged.length - 1].ts >= loginBatchNewest(keys[i])) break;
+    lists.push(...await Promise.all(keys.slice(i, i + LOGIN_READ_CHUNK).map(name => kv.get(name, { type: 'json' }))));
+    merged = mergeLoginEvents(lists);
+  }
+  return merged;
+}
+
+const userDataETag = version => `"v${version}"`;
+
+function parseETagVersion(header) {
+  const m = header && header.match(/"v(\d+)"/);
+  return m ? parseInt(m[1], 10) : null;
+}
+
 export default {
-  async fetch(request, env) {
+  async fetch(request, env, ctx) {
     const url = new URL(request.url);
     const path = url.pathname;
 
@@ -90,13 +586,19 @@ export default {
     // ── GET /api/live-markets ──────────────────────────────────────────────
     // Trending pools on Base mainnet (price, volume, liquidity, price change)
     if (path === '/api/live-markets') {
-      return proxyGecko('/networks/base/trending_pools?page=1&include=base_token,quote_token', env, CACHE_TTL_MARKETS);
+      return proxyGecko('/networks/base/trending_pools?page=1&include=base_token,quote_token', env, CACHE_TTL_MARKETS, ctx);
     }
 
     // ── GET /api/new-tokens ───────────────────────────────────────────────
     // Newest pools on Base mainnet – great for "just launched" feed
     if (path === '/api/new-tokens') {
-      return proxyGecko('/networks/base/new_pools?page=1&include=base_token,quote_token', env, CACHE_TTL_MARKETS);
+      return proxyGecko('/networks/base/new_pools?page=1&include=base_token,quote_token', env, CACHE_TTL_MARKETS, ctx);
+    }
+
+    // ── GET /api/snapshot ─────────────────────────────────────────────────
+    // Coin prices, exchange tickers, token/pool details and OHLCV in one call
+    if (path === '/api/snapshot' && request.method === 'GET') {
+      return handleSnapshot(url, env, ctx);
     }
 
     // ── GET /api/token/:address ───────────────────────────────────────────
@@ -104,7 +606,7 @@ export default {
     const tokenMatch = path.match(/^\/api\/token\/([^/]+)$/);
     if (tokenMatch && ETH_ADDRESS_RE.test(tokenMatch[1])) {
       const address = tokenMatch[1].toLowerCase();
-      return proxyGecko(`/networks/base/tokens/${address}?include=top_pools`, env, CACHE_TTL_TOKEN);
+      return proxyGecko(`/networks/base/tokens/${address}?include=top_pools`, env, CACHE_TTL_TOKEN, ctx);
     }
 
     // ── GET /api/ohlcv/:poolAddress ───────────────────────────────────────
@@ -119,6 +621,7 @@ export default {
         `/networks/base/pools/${poolAddr}/ohlcv/${timeframe}?limit=${limit}&currency=usd`,
         env,
         CACHE_TTL_OHLCV,
+        ctx,
       );
     }
 
@@ -126,6 +629,8 @@ export default {
     // Records a login event. Uses LOGIN_HISTORY_KV when the KV namespace is
     // bound via the Cloudflare dashboard; gracefully no-ops when it is not.
     // This avoids the need for a [[kv_namespaces]] placeholder in wrangler.toml.
+    // The event is buffered and written with the isolate's next batch (see
+    // queueLogin), so the response does not wait for KV.
     if (path === '/api/login-history' && request.method === 'POST') {
       try {
         const body = await request.json();
@@ -138,12 +643,9 @@ export default {
         const entry = { method: String(method).slice(0, METHOD_MAX_LEN), address: safeAddress, ts: Date.now() };
 
         if (env.LOGIN_HISTORY_KV) {
-          // KV key per wallet address (or 'email'/'x' for non-wallet logins)
-          const kvKey = safeAddress || `method:${entry.method.toLowerCase()}`;
-          const existing = await env.LOGIN_HISTORY_KV.get(kvKey, { type: 'json' });
-          const history = Array.isArray(existing) ? existing : [];
-          history.unshift(entry);
-          await env.LOGIN_HISTORY_KV.put(kvKey, JSON.stringify(history.slice(0, 20)), { expirationTtl: 60 * 60 * 24 * 90 });
+          // Owner per wallet address (or 'email'/'x' for non-wallet logins)
+          const owner = safeAddress || `method:${entry.method.toLowerCase()}`;
+          queueLogin(env, ctx, owner, entry);
         }
 
         return new Response(JSON.stringify({ ok: true }), { headers: CORS_HEADERS });
@@ -153,9 +655,35 @@ export default {
       }
     }
 
+    // ── GET /api/login-history?address=0x… | ?method=email ────────────────
+    // Newest login events of one owner, merged from its batch keys.
+    if (path === '/api/login-history' && request.method === 'GET') {
+      const address = url.searchParams.get('address');
+      const method = url.searchParams.get('method');
+      let owner = null;
+      if (address && ETH_ADDRESS_RE.test(address)) owner = address.toLowerCase();
+      else if (!address && method) owner = `method:${method.slice(0, METHOD_MAX_LEN).toLowerCase()}`;
+      if (!owner) {
+        return new Response(JSON.stringify({ error: 'address or method is required' }), { status: 400, headers: CORS_HEADERS });
+      }
+      if (!env.LOGIN_HISTORY_KV) {
+        return new Response(JSON.stringify({ ok: true, entries: [], kvUnavailable: true }), { headers: CORS_HEADERS });
+      }
+      try {
+        const entries = await readLoginHistory(env, owner);
+        return new Response(JSON.stringify({ ok: true, entries }), { headers: CORS_HEADERS });
+      } catch (err) {
+        console.error('[login-history GET] KV error:', err);
+        return new Response(JSON.stringify({ error: 'KV read failed' }), { status: 500, headers: CORS_HEADERS });
+      }
+    }
+
     // ── GET /api/user-data/:address ───────────────────────────────────────
     // Load persisted user portfolio / staking data from KV.
     // Falls back gracefully when USER_DATA_KV namespace is not configured.
+    // Versioned: responds 304 to a matching If-None-Match, and with
+    // ?since=<version> returns only the keys changed after that version
+    // (deleted keys come back as null).
     const userDataMatch = path.match(/^\/api\/user-data\/([^/]+)$/);
     if (userDataMatch && request.method === 'GET') {
       const rawAddr = userDataMatch[1];
@@ -168,8 +696,23 @@ export default {
         return new Response(JSON.stringify({ ok: true, data: null, kvUnavailable: true }), { headers: CORS_HEADERS });
       }
       try {
-        const stored = await env.USER_DATA_KV.get(addr, { type: 'json' });
-        return new Response(JSON.stringify({ ok: true, data: stored || null }), { headers: CORS_HEADERS });
+        const record = await readUserRecord(env.USER_DATA_KV, addr);
+        const headers = { ...CORS_HEADERS, ETag: userDataETag(record.v), 'Access-Control-Expose-Headers': 'ETag' };
+        if (record.v && parseETagVersion(request.headers.get('If-None-Match')) === record.v) {
+          return new Response(null, { status: 304, headers });
+        }
+        const since = parseInt(url.searchParams.get('since') || '', 10);
+        if (!record.v) {
+          return new Response(JSON.stringify({ ok: true, data: null, version: 0 }), { headers });
+        }
+        if (!isNaN(since) && since > 0 && since <= record.v) {
+          const data = {};
+          for (const [key, changedAt] of Object.entries(record.keys)) {
+            if (changedAt > since) data[key] = key in record.data ? record.data[key] : null;
+          }
+          return new Response(JSON.stringify({ ok: true, data, version: record.v, full: false }), { headers });
+        }
+        return new Response(JSON.stringify({ ok: true, data: record.data, version: record.v, full: true }), { headers });
       } catch (err) {
         console.error('[user-data GET] KV error:', err);
         return new Response(JSON.stringify({ error: 'KV read failed' }), { status: 500, headers: CORS_HEADERS });
@@ -179,6 +722,12 @@ export default {
     // ── PUT /api/user-data/:address ───────────────────────────────────────
     // Save persisted user portfolio / staking data to KV.
     // Falls back gracefully when USER_DATA_KV namespace is not configured.
+    // The body is a JSON merge patch (a full payload from older clients is
+    // simply a patch touching every key).  With If-Match the patch is only
+    // applied to that version; otherwise 412 returns the current version so
+    // the client can pull the delta and retry.  A patch that changes nothing
+    // is not written to KV.  KV is eventually consistent, so If-Match is a
+    // best-effort guard between devices, not a lock.
     if (userDataMatch && request.method === 'PUT') {
       const rawAddr = userDataMatch[1];
       if (!ETH_ADDRESS_RE.test(rawAddr) && !/^0x[0-9a-f]{40,}$/i.test(rawAddr)) {
@@ -193,10 +742,41 @@ export default {
         if (body.length > USER_DATA_MAX_BYTES) {
           return new Response(JSON.stringify({ error: 'Payload too large' }), { status: 413, headers: CORS_HEADERS });
         }
-        // Validate JSON before storing
-        JSON.parse(body);
-        await env.USER_DATA_KV.put(addr, body, { expirationTtl: USER_DATA_TTL });
-        return new Response(JSON.stringify({ ok: true }), { headers: CORS_HEADERS });
+        const patch = JSON.parse(body);
+        if (!patch || typeof patch !== 'object' || Array.isArray(patch)) {
+          return new Response(JSON.stringify({ error: 'Patch must be a JSON object' }), { status: 400, headers: CORS_HEADERS });
+        }
+        delete patch.updatedAt;
+        const record = await readUserRecord(env.USER_DATA_KV, addr);
+        const headers = { ...CORS_HEADERS, 'Access-Control-Expose-Headers': 'ETag' };
+        const expected = parseETagVersion(request.headers.get('If-Match'));
+        if (expected !== null && expected !== record.v) {
+          return new Response(JSON.stringify({ error: 'Version conflict', version: record.v }),
+            { status: 412, headers: { ...headers, ETag: userDataETag(record.v) } });
+        }
+
+        const version = record.v + 1;
+        const data = { ...record.data };
+        const changed = [];
+        for (const [key, value] of Object.entries(patch)) {
+          const next = value === null ? undefined : applyMergePatch(data[key], value);
+          if (JSON.stringify(next) === JSON.stringify(data[key])) continue;
+          if (next === undefined) delete data[key]; else data[key] = next;
+          changed.push(key);
+        }
+        if (!changed.length) {
+          return new Response(JSON.stringify({ ok: true, version: record.v, changed: [] }),
+            { headers: { ...headers, ETag: userDataETag(record.v) } });
+        }
+        const keys = { ...record.keys };
+        changed.forEach(key => { keys[key] = version; });
+        const next = JSON.stringify({ v: version, keys, data, updatedAt: Date.now() });
+        if (next.length > USER_DATA_MAX_BYTES) {
+          return new Response(JSON.stringify({ error: 'Payload too large' }), { status: 413, headers: CORS_HEADERS });
+        }
+        await env.USER_DATA_KV.put(addr, next, { expirationTtl: USER_DATA_TTL });
+        return new Response(JSON.stringify({ ok: true, version, changed }),
+          { headers: { ...headers, ETag: userDataETag(version) } });
       } catch (err) {
         console.error('[user-data PUT] Error:', err);
         return new Response(JSON.stringify({ error: 'Save failed' }), { status: 500, headers: CORS_HEADERS });